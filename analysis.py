@@ -0,0 +1,836 @@
+import numpy as np
+
+from learn_computer_graphics import profiling
+from learn_computer_graphics import quantiles
+from learn_computer_graphics import winding
+from learn_computer_graphics.core import MeshArrays
+from learn_computer_graphics.curvature import vertex_curvature
+
+#Analyses working on core.MeshArrays
+#They do not use bpy, so they run the same in Blender, in batch processing and in CI
+
+#Default merge distance, the same as in Blender's remove_doubles
+MERGE_DISTANCE = 0.0001
+
+#Number of rays cast from every face while looking for interior faces
+#and part of them which has to leave the object to make the face visible
+INTERIOR_SAMPLES = 32
+INTERIOR_VISIBILITY = 0.05
+
+#Faces tested together in one batch of rays
+INTERIOR_CHUNK = 4096
+
+#Colors painted for each curvature level
+#green - littlest values of curvature, yellow, orange, red - biggest values
+CURVATURE_COLORS = np.array([
+    (0, 1.0, 0, 1.0),
+    (1.0, 1.0, 0, 1.0),
+    (1.0, 0.5, 0, 1.0),
+    (1.0, 0, 0, 1.0),
+], dtype=np.float32)
+
+#Upper bounds of green, yellow, orange and red curvature levels
+CURVATURE_THRESHOLDS = (0.3, 0.7, 1.2, 2)
+
+#Percentiles of curvature magnitude used as automatic thresholds of the levels:
+#half of the edges is green, the next 45 % yellow, 4 % orange and the top 1 % red
+CURVATURE_LEVEL_PERCENTILES = (50, 95, 99, 100)
+
+
+####################################################
+#Replicated vertices
+
+#Neighbour cells checked for every vertex: its own cell and 13 cells of one half-space
+#The other 13 neighbours are checked from their side, so every pair is found once
+_HALF_NEIGHBOURS = np.array([
+    (dx, dy, dz)
+    for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+    if (dx, dy, dz) > (0, 0, 0)
+], dtype=np.int64)
+
+#Cells with more vertices are checked for vertices at the same position first
+CROWDED_CELL = 64
+
+#Candidate pairs of vertices compared at once, it bounds memory of crowded cells
+DUPLICATE_BATCH = 1 << 20
+
+
+#Function describes cells of sorted keys: first vertex, key and number of vertices of every cell
+def _grid_cells(sorted_keys):
+    cell_start = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    return cell_start, sorted_keys[cell_start], np.diff(np.r_[cell_start, len(sorted_keys)])
+
+
+#Function numbers candidate pairs of cell pairs with given numbers of candidates
+#Yields cell pair and index inside it of every candidate, about DUPLICATE_BATCH at once:
+#cell pair holding a multiple of the batch size goes alone and is split when it is larger
+def _candidate_batches(pairs):
+    ends = np.cumsum(pairs)
+    cuts = np.searchsorted(ends, np.arange(DUPLICATE_BATCH, int(ends[-1]), DUPLICATE_BATCH))
+    cuts = np.unique(np.r_[0, cuts, cuts + 1, len(pairs)].clip(0, len(pairs)))
+    for low, high in zip(cuts[:-1], cuts[1:]):
+        if high - low == 1 and pairs[low] > DUPLICATE_BATCH:
+            for start in range(0, int(pairs[low]), DUPLICATE_BATCH):
+                index = np.arange(start, min(start + DUPLICATE_BATCH, int(pairs[low])), dtype=np.int64)
+                yield np.full(len(index), low), index
+            continue
+        part = pairs[low:high]
+        part_ends = np.cumsum(part)
+        yield low + np.repeat(np.arange(len(part)), part), np.arange(int(part_ends[-1])) - np.repeat(part_ends - part, part)
+
+
+#Function finds pairs of vertices lying not further than distance, enough to join them into clusters
+#Uniform grid with cell size equal to distance, every cell gets one integer key
+#Keys of neighbour cells differ by a constant, so lookups of sorted keys stay sorted
+#Every returned pair is close, but not every close pair is returned: vertices at the same position
+#in a crowded cell are paired only with the first of them, other pairs of crowded cells only
+#when they join different clusters; candidates are compared in batches
+def duplicate_pairs(verts, distance=MERGE_DISTANCE):
+    empty = np.zeros(0, dtype=np.int64)
+    if len(verts) < 2 or distance <= 0:
+        return empty, empty
+
+    co = verts.astype(np.float64)
+    cells = np.floor(co / distance).astype(np.int64)
+    cells -= cells.min(axis=0) - 1
+    size = cells.max(axis=0) + 2
+    if np.prod(size.astype(np.float64)) >= 2.0 ** 62:
+        raise ValueError("Merge distance is too small for the size of the mesh")
+    strides = np.array([size[1] * size[2], size[2], 1], dtype=np.int64)
+    keys = cells @ strides
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    cell_start, cell_keys, cell_count = _grid_cells(sorted_keys)
+
+    first = []
+    second = []
+    crowded = np.repeat(cell_count > CROWDED_CELL, cell_count)
+    if crowded.any():
+        #Copies of a position are paired with its first vertex and left out of the grid
+        dense = order[crowded]
+        _, group, inverse = np.unique(co[dense], axis=0, return_index=True, return_inverse=True)
+        copy = np.ones(len(dense), dtype=bool)
+        copy[group] = False
+        first.append(dense[group[inverse.reshape(-1)[copy]]])
+        second.append(dense[copy])
+        keep = np.ones(len(order), dtype=bool)
+        keep[np.flatnonzero(crowded)[copy]] = False
+        order = order[keep]
+        sorted_keys = sorted_keys[keep]
+        cell_start, cell_keys, cell_count = _grid_cells(sorted_keys)
+
+    labels = None
+    for offset in [np.zeros(3, dtype=np.int64)] + list(_HALF_NEIGHBOURS):
+        #Find occupied neighbour cell of every occupied cell
+        neighbour_keys = cell_keys + int(offset @ strides)
+        neighbour = np.minimum(np.searchsorted(cell_keys, neighbour_keys), len(cell_keys) - 1)
+        found = np.flatnonzero(cell_keys[neighbour] == neighbour_keys)
+        if len(found) == 0:
+            continue
+
+        #Every vertex of the cell is paired with every vertex of the neighbour cell
+        n1 = cell_count[found]
+        n2 = cell_count[neighbour[found]]
+        pairs = n1 * n2
+        start1 = cell_start[found]
+        start2 = cell_start[neighbour[found]]
+        crowded = np.maximum(n1, n2) > CROWDED_CELL
+        for cell_pair, index in _candidate_batches(pairs):
+            a = start1[cell_pair] + index // n2[cell_pair]
+            b = start2[cell_pair] + index % n2[cell_pair]
+
+            #In its own cell every pair is seen twice
+            if not offset.any():
+                keep = a < b
+                a = a[keep]
+                b = b[keep]
+                cell_pair = cell_pair[keep]
+            i = order[a]
+            j = order[b]
+            d = co[i] - co[j]
+            close = np.einsum('ij,ij->i', d, d) <= distance * distance
+            i = i[close]
+            j = j[close]
+
+            #Crowded cells give many more pairs than vertices, their pairs are kept only
+            #when they join two clusters: every cluster is hooked to one smaller cluster
+            #at once, so the kept pairs form a forest, until no pair joins clusters
+            joining = crowded[cell_pair[close]]
+            if joining.any():
+                if labels is None:
+                    labels = np.arange(len(verts), dtype=np.int64)
+                left = i[joining]
+                right = j[joining]
+                i = [i[~joining]]
+                j = [j[~joining]]
+                while len(left):
+                    low = np.minimum(labels[left], labels[right])
+                    high = np.maximum(labels[left], labels[right])
+                    apart = low != high
+                    left = left[apart]
+                    right = right[apart]
+                    _, once = np.unique(high[apart], return_index=True)
+                    i.append(left[once])
+                    j.append(right[once])
+                    labels = _cluster_labels(len(verts), left[once], right[once], labels)
+                i = np.concatenate(i)
+                j = np.concatenate(j)
+            first.append(i)
+            second.append(j)
+
+    i = np.concatenate(first) if first else empty
+    j = np.concatenate(second) if second else empty
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+#Function joins pairs into clusters (connected components)
+#Returns smallest vertex index of the cluster for every vertex
+#Roots of both ends of every pair are hooked to the smaller root,
+#pointer jumping then makes every label point to its root again
+#Labels of earlier pairs can be given, they have to point to their roots
+def _cluster_labels(nr_verts, i, j, labels=None):
+    labels = np.arange(nr_verts, dtype=np.int64) if labels is None else labels.copy()
+    while len(i):
+        root_i = labels[i]
+        root_j = labels[j]
+        apart = root_i != root_j
+        if not apart.any():
+            break
+        i = i[apart]
+        j = j[apart]
+        np.minimum.at(labels, np.maximum(root_i[apart], root_j[apart]), np.minimum(root_i[apart], root_j[apart]))
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
+
+
+#Function finds vertices lying closer than distance
+#Returns index of vertex every vertex should be merged into
+def duplicate_vertices(mesh, distance=MERGE_DISTANCE):
+    i, j = duplicate_pairs(mesh.verts, distance)
+    return _cluster_labels(mesh.nr_verts, i, j).astype(np.int32)
+
+
+#Function describes clusters of replicated vertices without changing the mesh
+#Cluster is identified by its smallest vertex index (representative)
+#Spread is the diagonal of the cluster's bounding box
+def duplicate_clusters(mesh, distance=MERGE_DISTANCE):
+    targets = duplicate_vertices(mesh, distance)
+    profiling.count("vertices tested", mesh.nr_verts)
+    merged = targets != np.arange(mesh.nr_verts)
+    representatives, members = np.unique(targets[merged], return_counts=True)
+
+    spread = np.zeros(len(representatives))
+    if len(representatives):
+        in_cluster = np.flatnonzero(merged | np.isin(np.arange(mesh.nr_verts), representatives))
+        cluster = np.searchsorted(representatives, targets[in_cluster])
+        co = mesh.verts[in_cluster].astype(np.float64)
+        lowest = np.full((len(representatives), 3), np.inf)
+        highest = np.full((len(representatives), 3), -np.inf)
+        np.minimum.at(lowest, cluster, co)
+        np.maximum.at(highest, cluster, co)
+        spread = np.linalg.norm(highest - lowest, axis=1)
+
+    return {
+        "targets": targets,
+        "representatives": representatives.astype(np.int32),
+        "sizes": (members + 1).astype(np.int32),
+        "spread": spread,
+        "removed": int(np.count_nonzero(merged)),
+    }
+
+
+#Function merges every vertex into its target, like Blender's weld
+#Loops collapsed into the previous loop of their face are removed
+#and faces left with less than 3 loops are removed
+#Returns new mesh, vertex indices keep order of the remaining vertices
+def welded(mesh, targets):
+    keep = targets == np.arange(mesh.nr_verts)
+    new_index = np.cumsum(keep) - 1
+    face_verts = new_index[targets[mesh.face_verts]].astype(np.int32)
+    loose_edges = new_index[targets[mesh.loose_edges]]
+    loose_edges = loose_edges[loose_edges[:, 0] != loose_edges[:, 1]]
+    if mesh.nr_faces == 0:
+        return MeshArrays(mesh.verts[keep], mesh.face_offsets, face_verts, loose_edges=loose_edges)
+
+    keep_loop = face_verts != face_verts[mesh.loop_prev]
+    sizes = np.add.reduceat(keep_loop.astype(np.int32), mesh.face_offsets[:-1])
+    #Face of one repeated vertex keeps no loop at all
+    sizes[mesh.face_sizes == 0] = 0
+    keep_face = sizes >= 3
+    keep_loop &= keep_face[mesh.loop_faces]
+    offsets = np.zeros(np.count_nonzero(keep_face) + 1, dtype=np.int32)
+    np.cumsum(sizes[keep_face], out=offsets[1:])
+    return MeshArrays(mesh.verts[keep], offsets, face_verts[keep_loop], loose_edges=loose_edges)
+
+
+#Function finds given faces of the mesh in other mesh with the same vertices, e.g. the mesh
+#welded in arrays and the same mesh welded by Blender, faces are equal when they have
+#the same set of vertices, faces missing in other mesh are left out
+#Returns sorted indices of the faces in other mesh
+def matching_faces(mesh, other, faces):
+    faces = np.asarray(faces, dtype=np.int64)
+    #Vertices of every face sorted, so loops can start anywhere
+    sorted_verts = mesh.face_verts[np.lexsort((mesh.face_verts, mesh.loop_faces))]
+    other_verts = other.face_verts[np.lexsort((other.face_verts, other.loop_faces))]
+    found = []
+    #Faces of one size are compared as rows
+    for size in np.unique(mesh.face_sizes[faces]):
+        wanted = faces[mesh.face_sizes[faces] == size]
+        candidates = np.flatnonzero(other.face_sizes == size)
+        rows = np.concatenate([other_verts[other.face_offsets[candidates][:, None] + np.arange(size)],
+                               sorted_verts[mesh.face_offsets[wanted][:, None] + np.arange(size)]])
+        _, inverse = np.unique(rows, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        owner = np.full(len(rows), -1, dtype=np.int64)
+        owner[inverse[:len(candidates)]] = candidates
+        match = owner[inverse[len(candidates):]]
+        found.append(match[match >= 0])
+    return np.unique(np.concatenate(found or [np.zeros(0, dtype=np.int64)])).astype(np.int32)
+
+
+####################################################
+#Gaps in mesh
+
+#Function finds edges used by only one face - borders of holes
+def boundary_edges(mesh):
+    return np.flatnonzero(mesh.edge_face_count == 1).astype(np.int32)
+
+
+#Function finds vertices of edges which are not shared by exactly two faces
+#The same vertices are selected by Blender's select_non_manifold
+def non_manifold_vertices(mesh):
+    edges = mesh.edges[mesh.edge_face_count != 2]
+    return np.unique(edges).astype(np.int32)
+
+
+#Function chains boundary edges into closed loops (holes)
+#Boundary edges are chained through fans of faces around their vertices (see chain_boundary),
+#so faces do not need consistent orientation
+#Returns CSR arrays: loop_offsets (H + 1) and ordered loop_verts
+def boundary_loops(mesh):
+    loops = np.flatnonzero(mesh.edge_face_count[mesh.loop_edges] == 1)
+    if len(loops) == 0:
+        return np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    ends = np.stack([loops, mesh.loop_next[loops]], axis=1)
+
+    #Corners of faces at vertices of boundary edges, with edges on both sides of the corner
+    at_boundary = np.zeros(mesh.nr_verts, dtype=bool)
+    at_boundary[mesh.face_verts[ends]] = True
+    corners = np.flatnonzero(at_boundary[mesh.face_verts])
+    corner_edges = np.stack([mesh.loop_edges[corners], mesh.loop_edges[mesh.loop_prev[corners]]], axis=1)
+    fans = corner_fans(mesh.face_verts[corners], corner_edges, mesh.edge_face_count)
+    edge_verts = mesh.face_verts[ends]
+    edge_fans = fans[np.searchsorted(corners, ends)]
+
+    #Faces turned against most faces of their component are turned back here (see _flip_states),
+    #so edges of holes touching in one vertex are paired by their direction
+    forward = mesh.face_verts < mesh.face_verts[mesh.loop_next]
+    shared = mesh.edge_face_count == 2
+    if np.any(np.bincount(mesh.loop_edges, weights=forward, minlength=mesh.nr_edges)[shared] != 1):
+        flip, labels = _flip_states(mesh)[:2]
+        minority = np.bincount(labels, weights=flip, minlength=mesh.nr_faces) * 2 > np.bincount(labels, minlength=mesh.nr_faces)
+        turned = (flip == 1) != minority[labels]
+        turned = turned[mesh.loop_faces[loops]]
+        edge_verts[turned] = edge_verts[turned, ::-1]
+        edge_fans[turned] = edge_fans[turned, ::-1]
+    return chain_boundary(edge_verts, edge_fans)
+
+
+#Function groups corners of vertices into fans, like fan_labels, for some corners only
+#corner_edges (C, 2) are edges on both sides of every corner, edge_count numbers of faces of edges
+#Corners of one vertex sharing an edge of two faces are in one fan, whatever orientation faces have
+#Returns label of every corner, the smallest corner index of its fan
+def corner_fans(corner_verts, corner_edges, edge_count):
+    nr_corners = len(corner_verts)
+    sides = corner_edges.T.reshape(-1).astype(np.int64)
+    corners = np.tile(np.arange(nr_corners), 2)
+    shared = np.asarray(edge_count[sides]) == 2
+    sides = sides[shared]
+    corners = corners[shared]
+    keys = corner_verts[corners].astype(np.int64) * (int(sides.max(initial=0)) + 1) + sides
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    corners = corners[order]
+    joined = keys[1:] == keys[:-1]
+    return _cluster_labels(nr_corners, corners[:-1][joined], corners[1:][joined])
+
+
+#Function chains boundary edges into loops
+#edge_verts (B, 2) are vertices of every boundary edge in direction of its face,
+#edge_fans (B, 2) fans of its face at both vertices (see corner_fans)
+#Both boundary edges of a fan continue one another; a vertex with more fans (holes touching
+#in one vertex) pairs the edge coming into one fan with the edge going out of the next fan
+#Loops are walked through these pairs, in both directions, and the walk going along the face
+#of the smallest edge of the loop is kept; chains stopped by edges of more than two faces
+#are walked there and back
+#Returns CSR arrays: loop_offsets (H + 1) and ordered loop_verts
+def chain_boundary(edge_verts, edge_fans):
+    nr_ends = 2 * len(edge_verts)
+    if nr_ends == 0:
+        return np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    #End 2 * b is the first, 2 * b + 1 the second vertex of edge b
+    ends = np.arange(nr_ends)
+    vertex = np.asarray(edge_verts).reshape(-1)
+    fan = np.asarray(edge_fans).reshape(-1)
+
+    #Ends of every vertex ordered by fan, the end going out of the fan first
+    by_vertex = np.lexsort((ends & 1, fan, vertex))
+    sorted_vertex = vertex[by_vertex]
+    group_start = np.searchsorted(sorted_vertex, sorted_vertex, side='left')
+    group_size = np.searchsorted(sorted_vertex, sorted_vertex, side='right') - group_start
+    position = ends - group_start
+    paired = np.maximum(group_size - group_size % 2, 1)
+    other = np.where(position % 2 == 1, position + 1, position - 1) % paired
+    other = np.where(position < group_size - group_size % 2, other, position)
+    partner = np.empty(nr_ends, dtype=np.int64)
+    partner[by_vertex] = by_vertex[group_start + other]
+
+    #Walk coming to an end continues along the partner edge to its other end
+    succ = partner ^ 1
+
+    #Every loop is labelled with its smallest end (pointer doubling)
+    label = ends.copy()
+    jump = succ.copy()
+    for _ in range(int(np.ceil(np.log2(nr_ends))) + 1):
+        label = np.minimum(label, label[jump])
+        jump = jump[jump]
+    keep = ((label & 1) == 1) | (label == label[ends ^ 1])
+
+    #Distance of every end to the end of its loop (list ranking)
+    #Loop is cut before the end with the loop's label
+    last = label[succ] == succ
+    jump = np.where(last, ends, succ)
+    rank = (~last).astype(np.int64)
+    for _ in range(int(np.ceil(np.log2(nr_ends))) + 1):
+        rank = rank + rank[jump]
+        jump = jump[jump]
+
+    #Every end gives the vertex the walk came from
+    kept = ends[keep]
+    order = kept[np.lexsort((-rank[kept], label[kept]))]
+    loop_starts = np.flatnonzero(np.r_[True, label[order][1:] != label[order][:-1]])
+    loop_offsets = np.r_[loop_starts, len(order)].astype(np.int32)
+    return loop_offsets, vertex[order ^ 1].astype(np.int32)
+
+
+#Function describes every hole of the mesh
+#Area is the length of the vector area of the boundary loop
+def holes(mesh):
+    return hole_stats(mesh.verts, *boundary_loops(mesh))
+
+
+#Function measures holes given by boundary loops
+def hole_stats(verts, loop_offsets, loop_verts):
+    nr_holes = len(loop_offsets) - 1
+    vertex_count = np.diff(loop_offsets)
+    if nr_holes == 0:
+        empty = np.zeros(0)
+        return {"loop_offsets": loop_offsets, "loop_verts": loop_verts, "vertex_count": vertex_count,
+                "perimeter": empty, "area": empty, "centroid": np.zeros((0, 3))}
+
+    #Next vertex of every loop vertex
+    following = np.arange(1, len(loop_verts) + 1)
+    following[loop_offsets[1:] - 1] = loop_offsets[:-1]
+    p = verts[loop_verts].astype(np.float64)
+    q = p[following]
+
+    starts = loop_offsets[:-1]
+    perimeter = np.add.reduceat(np.linalg.norm(q - p, axis=1), starts)
+    area = 0.5 * np.linalg.norm(np.add.reduceat(np.cross(p, q), starts, axis=0), axis=1)
+    centroid = np.add.reduceat(p, starts, axis=0) / vertex_count[:, None]
+    return {"loop_offsets": loop_offsets, "loop_verts": loop_verts, "vertex_count": vertex_count,
+            "perimeter": perimeter, "area": area, "centroid": centroid}
+
+
+####################################################
+#Topology
+
+#Edges not longer than DEGENERATE_DISTANCE have zero length,
+#faces with area not larger than its square have zero area
+DEGENERATE_DISTANCE = 1e-6
+
+#Categories of topology_audit, edges are indices to mesh.edges except wire edges,
+#which are indices to mesh.loose_edges
+TOPOLOGY_CATEGORIES = ('boundary_edges', 'multi_face_edges', 'bowtie_verts', 'wire_edges',
+                       'isolated_verts', 'zero_area_faces', 'zero_length_edges')
+
+
+#Function pairs two loops of every edge shared by exactly two faces
+#same tells if both loops go along the edge in the same direction
+#(neighbour faces with inconsistent orientation)
+def shared_edge_loops(mesh):
+    by_edge = np.argsort(mesh.loop_edges, kind='stable')
+    shared = mesh.edge_face_count[mesh.loop_edges[by_edge]] == 2
+    a, b = by_edge[shared].reshape(-1, 2).T
+    return a, b, mesh.face_verts[a] == mesh.face_verts[b]
+
+
+#Function groups faces around every vertex into fans
+#Corners (loops) of a vertex are joined through edges shared by exactly two faces,
+#corners of one fan get the same label (smallest loop index of the fan)
+def fan_labels(mesh):
+    a, b, same = shared_edge_loops(mesh)
+    next_a = mesh.loop_next[a]
+    next_b = mesh.loop_next[b]
+    i = np.concatenate([a, next_a])
+    j = np.concatenate([np.where(same, b, next_b), np.where(same, next_b, b)])
+    return _cluster_labels(mesh.nr_loops, i, j)
+
+
+#Function classifies non-manifold and degenerate elements of the mesh
+#Returns indices of elements of every category (see TOPOLOGY_CATEGORIES)
+#Bowtie vertices have more than one fan of faces, this includes vertices
+#of edges used by more than two faces
+def topology_audit(mesh, distance=DEGENERATE_DISTANCE):
+    count = mesh.edge_face_count
+    labels = fan_labels(mesh)
+    roots = labels == np.arange(mesh.nr_loops)
+    fans = np.bincount(mesh.face_verts[roots], minlength=mesh.nr_verts)
+
+    used = np.zeros(mesh.nr_verts, dtype=bool)
+    used[mesh.face_verts] = True
+    used[mesh.loose_edges.ravel()] = True
+
+    #Loose edges repeating an edge of a face are not wire edges
+    keys = mesh.edges[:, 0].astype(np.int64) * max(mesh.nr_verts, 1) + mesh.edges[:, 1]
+    loose = np.sort(mesh.loose_edges, axis=1).astype(np.int64)
+    wire = ~np.isin(loose[:, 0] * max(mesh.nr_verts, 1) + loose[:, 1], keys)
+
+    d = mesh.verts[mesh.edges[:, 1]].astype(np.float64) - mesh.verts[mesh.edges[:, 0]]
+    length = np.sqrt(np.einsum('ij,ij->i', d, d))
+    profiling.count("edges processed", mesh.nr_edges)
+    return {
+        "boundary_edges": np.flatnonzero(count == 1).astype(np.int32),
+        "multi_face_edges": np.flatnonzero(count > 2).astype(np.int32),
+        "bowtie_verts": np.flatnonzero(fans > 1).astype(np.int32),
+        "wire_edges": np.flatnonzero(wire).astype(np.int32),
+        "isolated_verts": np.flatnonzero(~used).astype(np.int32),
+        "zero_area_faces": np.flatnonzero(mesh.face_areas <= distance * distance).astype(np.int32),
+        "zero_length_edges": np.flatnonzero(length <= distance).astype(np.int32),
+    }
+
+
+#Function counts elements of every category of topology_audit
+def topology_counts(audit):
+    return {name: int(len(audit[name])) for name in TOPOLOGY_CATEGORIES}
+
+
+####################################################
+#Orientation
+
+#Function propagates orientation by breadth-first search over faces sharing manifold edges,
+#starting from one face of every connected component: neighbour using the shared edge
+#in the same direction gets the opposite flip state
+#Returns flip state of every face (1 - turned against the first face of its component),
+#component label of every face and neighbour faces with their same flags
+def _flip_states(mesh):
+    a, b, same = shared_edge_loops(mesh)
+    first = mesh.loop_faces[a]
+    second = mesh.loop_faces[b]
+    keep = first != second
+    first, second, same = first[keep], second[keep], same[keep]
+    labels = _cluster_labels(mesh.nr_faces, first, second)
+
+    #Adjacency in both directions as CSR
+    source = np.concatenate([first, second])
+    order = np.argsort(source, kind='stable')
+    target = np.concatenate([second, first])[order]
+    change = np.concatenate([same, same])[order].astype(np.int8)
+    starts = np.searchsorted(source[order], np.arange(mesh.nr_faces + 1))
+
+    #Every face is in the frontier once
+    flip = np.full(mesh.nr_faces, -1, dtype=np.int8)
+    frontier = np.flatnonzero(labels == np.arange(mesh.nr_faces))
+    flip[frontier] = 0
+    while len(frontier):
+        counts = starts[frontier + 1] - starts[frontier]
+        links = np.repeat(starts[frontier] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        parents = np.repeat(frontier, counts)
+        new = flip[target[links]] < 0
+        faces, found = np.unique(target[links[new]], return_index=True)
+        flip[faces] = flip[parents[new][found]] ^ change[links[new][found]]
+        frontier = faces
+    profiling.count("faces oriented", mesh.nr_faces)
+    return flip, labels, first, second, same
+
+
+#Function orients faces consistently and outwards (see _flip_states)
+#Component is turned outwards when its signed volume is negative
+#Returns faces to flip and description of every component
+def orient_faces(mesh):
+    flip, labels, first, second, same = _flip_states(mesh)
+
+    #Components where some neighbours cannot agree (e.g. Moebius strip)
+    conflict = (flip[first] ^ flip[second]) != same
+    roots, component = np.unique(labels, return_inverse=True)
+    component = component.reshape(-1)
+    nr_components = len(roots)
+    non_orientable = np.unique(component[first[conflict]])
+
+    #Signed volume of every component measured from its center
+    sizes = np.bincount(component, minlength=nr_components)
+    centroids = mesh.face_centroids.astype(np.float64)
+    center = np.stack([np.bincount(component, weights=centroids[:, axis], minlength=nr_components)
+                       for axis in range(3)], axis=1) / np.maximum(sizes, 1)[:, None]
+    vector_area = mesh.face_normals.astype(np.float64) * mesh.face_areas[:, None]
+    cone = np.einsum('ij,ij->i', vector_area, centroids - center[component]) / 3
+    volume = np.bincount(component, weights=np.where(flip == 1, -cone, cone), minlength=nr_components)
+    outward = volume >= 0
+    flip = (flip == 1) != ~outward[component]
+
+    return {
+        "flip": np.flatnonzero(flip).astype(np.int32),
+        "component": component.astype(np.int32),
+        "component_faces": sizes.astype(np.int32),
+        "component_flipped": np.bincount(component[flip], minlength=nr_components).astype(np.int32),
+        "component_volume": np.abs(volume),
+        "non_orientable": non_orientable.astype(np.int32),
+    }
+
+
+#Function reverses loops of given faces, first loop of every face stays first
+#Returns new mesh
+def flipped(mesh, faces):
+    flip = np.zeros(mesh.nr_faces, dtype=bool)
+    flip[faces] = True
+    loops = np.arange(mesh.nr_loops)
+    start = mesh.face_offsets[:-1][mesh.loop_faces]
+    size = mesh.face_sizes[mesh.loop_faces]
+    source = np.where(flip[mesh.loop_faces], start + (size - (loops - start)) % size, loops)
+    return MeshArrays(mesh.verts, mesh.face_offsets, mesh.face_verts[source], loose_edges=mesh.loose_edges)
+
+
+####################################################
+#Interior faces
+
+#Function returns directions spread evenly over the sphere (Fibonacci lattice)
+#Every direction lies in its own stratum of equal area, jitter moves it inside the stratum
+def stratified_directions(samples, rng=None):
+    i = np.arange(samples) + 0.5
+    if rng is not None:
+        i = i + rng.uniform(-0.5, 0.5, samples)
+    z = 1 - 2 * i / samples
+    angle = np.pi * (3 - np.sqrt(5)) * np.arange(samples)
+    if rng is not None:
+        angle = angle + rng.uniform(0, 2 * np.pi)
+    r = np.sqrt(np.maximum(0, 1 - z * z))
+    return np.stack([r * np.cos(angle), r * np.sin(angle), z], axis=1)
+
+
+#Function returns random rotation matrices (from uniformly distributed quaternions)
+def _random_rotations(count, rng):
+    q = rng.normal(size=(count, 4))
+    q /= np.linalg.norm(q, axis=1)[:, None]
+    w, x, y, z = q.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=1),
+    ], axis=1)
+
+
+#Function finds faces whose all edges are shared by more than two faces
+#The same faces are selected by Blender's select_interior_faces
+def interior_candidates(mesh):
+    if mesh.nr_faces == 0:
+        return np.zeros(0, dtype=np.int32)
+    shared = mesh.edge_face_count[mesh.loop_edges] > 2
+    all_shared = np.logical_and.reduceat(shared, mesh.face_offsets[:-1])
+    return np.flatnonzero(all_shared).astype(np.int32)
+
+
+#Function finds interior faces which cannot be seen from outside of the object
+#From every candidate face rays are cast in stratified directions over the whole sphere
+#against the object's own BVH, so other objects and camera position do not matter
+#Face is visible when at least visibility part of its rays leave the object
+#ray_cast(origins, directions, min_distance) can replace the array BVH,
+#it returns index of hit face or triangle for every ray (-1 when nothing is hit)
+#Faces are tested in chunks, progress(done_part) is called after every chunk
+def interior_faces(mesh, samples=INTERIOR_SAMPLES, visibility=INTERIOR_VISIBILITY, faces=None, seed=0, ray_cast=None,
+                   chunk_size=INTERIOR_CHUNK, progress=None):
+    candidates = interior_candidates(mesh) if faces is None else np.asarray(faces, dtype=np.int32)
+    if len(candidates) == 0:
+        return candidates
+
+    #Every face gets randomly rotated set of stratified directions
+    #Fixed seed keeps results repeatable, also when chunk size changes
+    rng = np.random.default_rng(seed)
+    rotations = _random_rotations(len(candidates), rng)
+    sphere = stratified_directions(samples, rng)
+
+    #Hits closer than tiny part of the object size are the face itself
+    lowest, highest = mesh.bounds()
+    min_distance = 1e-6 * max(float(np.linalg.norm(highest - lowest)), 1e-12)
+
+    escaped = np.zeros(len(candidates))
+    for start in range(0, len(candidates), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        directions = np.einsum('fij,sj->fsi', rotations[chunk], sphere).reshape(-1, 3)
+        origins = np.repeat(mesh.face_centroids[candidates[chunk]].astype(np.float64), samples, axis=0)
+        if ray_cast is None:
+            _, hit = mesh.bvh.ray_cast(origins, directions, min_distance, any_hit=True)
+        else:
+            hit = ray_cast(origins, directions, min_distance)
+
+        profiling.count("rays cast", len(origins))
+
+        #Visibility voting
+        escaped[chunk] = (np.asarray(hit) < 0).reshape(-1, samples).mean(axis=1)
+        if progress is not None:
+            progress(min(start + chunk_size, len(candidates)) / len(candidates))
+    return candidates[escaped < visibility]
+
+
+####################################################
+#Curvature
+
+#Function calculates curvature of every edge at once
+#edges is (E, 2) array of vertex indices
+def edge_curvature(co, normals, edges):
+    p1 = co[edges[:, 0]]
+    p2 = co[edges[:, 1]]
+    n1 = normals[edges[:, 0]]
+    n2 = normals[edges[:, 1]]
+
+    #Curvature is difference of normals projected on the edge
+    #Zero length edges get zero curvature instead of dividing by zero
+    d = p2 - p1
+    length = np.sqrt(np.einsum('ij,ij->i', d, d))
+    curvature = np.einsum('ij,ij->i', n2 - n1, d)
+    return np.divide(curvature, length, out=np.zeros_like(curvature), where=length > 0)
+
+
+#Function assigns color level to every edge
+#0 - green, 1 - yellow, 2 - orange, 3 - red
+#Values above the last threshold stay green like before
+#(thresholds derived by curvature_thresholds end with infinity, so no value is above them)
+def curvature_levels(curvature, thresholds=CURVATURE_THRESHOLDS):
+    magnitude = np.abs(curvature)
+    levels = np.searchsorted(np.asarray(thresholds), magnitude, side='left')
+    levels[levels == len(thresholds)] = 0
+    return levels
+
+
+#Function reduces edge levels to loop levels
+#Every loop takes the biggest level of the two face edges meeting at its corner
+def loop_levels(edge_levels, loop_edges, loop_prev):
+    return np.maximum(edge_levels[loop_edges], edge_levels[loop_edges[loop_prev]])
+
+
+#Function calculates count, mean, minimal, maximal curvature and its percentiles (p1 to p99)
+def curvature_stats(curvature):
+    return quantiles.summary(curvature)
+
+
+#Function derives thresholds of curvature levels from percentiles of curvature magnitude
+#magnitude_percentiles are percentiles CURVATURE_LEVEL_PERCENTILES of the absolute values,
+#the last threshold is infinite, percentile 100 of a sketch can be below the largest magnitude
+def curvature_thresholds(magnitude_percentiles):
+    thresholds = [float(threshold) for threshold in np.maximum.accumulate(magnitude_percentiles)]
+    return tuple(thresholds[:-1]) + (np.inf,)
+
+
+#Function does the whole curvature analysis of the mesh
+#Thresholds of the levels are derived from percentiles of the curvature when not given
+#Returns curvature of every edge and color level of every loop
+def curvature_analysis(mesh, thresholds=None):
+    curvature = edge_curvature(mesh.verts, mesh.vertex_normals, mesh.edges)
+    profiling.count("edges processed", len(curvature))
+    if thresholds is None:
+        thresholds = curvature_thresholds(quantiles.percentiles(np.abs(curvature), CURVATURE_LEVEL_PERCENTILES))
+    levels = loop_levels(curvature_levels(curvature, thresholds), mesh.loop_edges, mesh.loop_prev)
+    return curvature, levels
+
+
+####################################################
+#Pipeline
+
+#Stages which can be chained in one session of a mesh, in the order they run
+PIPELINE_STAGES = ('merge', 'holes', 'interior', 'curvature')
+
+
+#Function returns the computed result, used when results are not cached
+def _computed(mesh, name, compute, *params):
+    return compute()
+
+
+#Function runs chosen stages of one session on arrays of the mesh (see mesh.pipeline_job)
+#Merge welds the arrays first, holes, interior faces and curvature are then found on the
+#welded mesh, the one written back when the session ends
+#cached(mesh, name, compute, *params) can return stored results (see cache.ResultCache.cached)
+#Returns targets of replicated vertices (None without merge), the analysed mesh and results by name
+def pipeline_stages(mesh, stages, distance=MERGE_DISTANCE, samples=INTERIOR_SAMPLES, mode='RAYS',
+                    threshold=winding.WINDING_THRESHOLD, workers=1, cached=_computed, progress=None):
+    targets = None
+    work = mesh
+    if 'merge' in stages:
+        with profiling.stage("duplicate clusters"):
+            clusters = cached(mesh, "duplicate_clusters", lambda: duplicate_clusters(mesh, distance), distance)
+        targets = clusters["targets"]
+        if clusters["removed"]:
+            work = welded(mesh, targets)
+
+    found = {}
+    if 'holes' in stages:
+        with profiling.stage("holes"):
+            found["holes"] = cached(work, "holes", lambda: holes(work))
+            found["non_manifold"] = cached(work, "non_manifold_vertices", lambda: non_manifold_vertices(work))
+    if 'interior' in stages:
+        with profiling.stage("interior faces"):
+            if mode == 'WINDING':
+                found["interior"] = cached(work, "interior_faces_winding",
+                                           lambda: winding.interior_faces(work, threshold, workers=workers, progress=progress), threshold)
+            else:
+                found["interior"] = cached(work, "interior_faces",
+                                           lambda: interior_faces(work, samples, progress=progress), samples)
+    if 'curvature' in stages:
+        with profiling.stage("curvature"):
+            found["mean_curvature"] = cached(work, "mean_curvature", lambda: vertex_curvature(work, relative=True)["mean"])
+            found["curvature_stats"] = curvature_stats(found["mean_curvature"])
+    return targets, work, found
+
+
+####################################################
+#Report
+
+#Function runs all mesh health checks and returns plain dictionary
+#Used by batch processing where results are written as JSON
+#Curvature is the relative mean curvature of vertices painted by analyse_curves, measured
+#on the mesh with replicated vertices merged, like store.store_report
+def mesh_report(mesh, distance=MERGE_DISTANCE, samples=INTERIOR_SAMPLES):
+    clusters = duplicate_clusters(mesh, distance)
+    hole_stats = holes(mesh)
+    work = welded(mesh, clusters["targets"]) if clusters["removed"] else mesh
+    mean = vertex_curvature(work, relative=True)["mean"]
+    orientation = orient_faces(mesh)
+    return {
+        "verts": mesh.nr_verts,
+        "edges": mesh.nr_edges,
+        "faces": mesh.nr_faces,
+        "gaps": {
+            "boundary_edges": int(len(boundary_edges(mesh))),
+            "non_manifold_verts": int(len(non_manifold_vertices(mesh))),
+            "holes": int(len(hole_stats["vertex_count"])),
+            "largest_hole_verts": int(hole_stats["vertex_count"].max()) if len(hole_stats["vertex_count"]) else 0,
+            "max_perimeter": float(hole_stats["perimeter"].max()) if len(hole_stats["perimeter"]) else 0.0,
+            "total_area": float(hole_stats["area"].sum()),
+        },
+        "interior_faces": int(len(interior_faces(mesh, samples))),
+        "replicated_vertices": {
+            "removed": clusters["removed"],
+            "clusters": int(len(clusters["sizes"])),
+            "largest_cluster": int(clusters["sizes"].max()) if len(clusters["sizes"]) else 0,
+            "max_spread": float(clusters["spread"].max()) if len(clusters["spread"]) else 0.0,
+        },
+        "curvature": curvature_stats(mean),
+        "topology": topology_counts(topology_audit(mesh)),
+        "orientation": {
+            "components": int(len(orientation["component_faces"])),
+            "flipped_faces": int(len(orientation["flip"])),
+            "non_orientable_components": int(len(orientation["non_orientable"])),
+        },
+    }
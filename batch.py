@@ -0,0 +1,184 @@
+import argparse
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import intersect
+from learn_computer_graphics import loaders
+from learn_computer_graphics import store
+
+#Command line mesh health checks, run without Blender:
+#python -m learn_computer_graphics.batch assets/ "scans/**/*.ply" --workers 8 --output report.ndjson
+#Every file gives one JSON record (one line) written as soon as the file is analysed
+#With --store files larger than memory are streamed once into memory-mapped mesh stores
+#(see store.py) and checked in chunks, interior faces are not checked then
+
+#With --progress progress of every file is printed to stderr at most every PROGRESS_INTERVAL seconds
+PROGRESS_INTERVAL = 1.0
+
+
+#Function finds mesh files in given files, directories and glob patterns
+def collect_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(loaders.SUPPORTED_EXTENSIONS):
+                        files.append(os.path.join(root, name))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            files.extend(sorted(f for f in glob.glob(path, recursive=True)
+                                if f.lower().endswith(loaders.SUPPORTED_EXTENSIONS)))
+    #The same file can be given by a directory and by a pattern
+    return list(dict.fromkeys(os.path.normpath(f) for f in files))
+
+
+#Function returns progress callback printing progress of the file
+def _progress_printer(path):
+    printed = [0.0]
+
+    def progress(done):
+        now = time.perf_counter()
+        if now - printed[0] >= PROGRESS_INTERVAL or done >= 1.0:
+            printed[0] = now
+            print("%s: %d%%" % (path, 100 * done), file=sys.stderr, flush=True)
+    return progress
+
+
+def _timeout_handler(signum, frame):
+    raise TimeoutError
+
+
+#Function analyses one file, it runs in worker process
+#Timeout is measured with SIGALRM, so it is not available on Windows
+#Python handles the signal between bytecodes: a single long NumPy call (a sort, a large
+#np.unique) is not interrupted, the timeout is noticed when the call returns
+#store_directory None loads the whole file, '' keeps the store next to the file
+def analyse_file(path, distance=analysis.MERGE_DISTANCE, timeout=None, store_directory=None, progress=False):
+    start = time.perf_counter()
+    record = {"path": path}
+    use_alarm = bool(timeout) and hasattr(signal, 'setitimer')
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _timeout_handler)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        #Timer is disarmed before leaving the inner block, an alarm coming just before
+        #that is still caught below as timeout of the file
+        try:
+            if store_directory is None:
+                mesh = loaders.load_mesh(path)
+                record.update(analysis.mesh_report(mesh, distance))
+                found = intersect.self_intersections(mesh)
+                record["self_intersections"] = {"faces": int(len(found["faces"])), "triangle_pairs": int(len(found["pairs"]))}
+            else:
+                #Conversion is the first half of the work, checks the second
+                converting = checking = None
+                if progress:
+                    printer = _progress_printer(path)
+                    converting = lambda done: printer(0.5 * done)
+                    checking = lambda done: printer(0.5 + 0.5 * done)
+                target = store.convert(path, store_directory, progress=converting)
+                record.update(store.store_report(target, distance, progress=checking))
+            record["status"] = "ok"
+        finally:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except TimeoutError:
+        record["status"] = "timeout"
+    except Exception as error:
+        record["status"] = "error"
+        record["error"] = str(error)
+    if use_alarm:
+        signal.signal(signal.SIGALRM, previous)
+    record["seconds"] = round(time.perf_counter() - start, 6)
+    return record
+
+
+#Function returns record of a file which could not be analysed
+def _error_record(path, error):
+    return {"path": path, "status": "error", "error": str(error) or type(error).__name__}
+
+
+#Function analyses all files in worker processes
+#Yields records in order in which files are finished
+#A worker process can die (killed when out of memory, crash in a native library), then the pool
+#is broken and all its unfinished files fail; they are analysed again in a fresh pool with one
+#worker, where files run in order, so the first failing file is the one that killed the worker:
+#it gets an error record and the rest go to a fresh pool again
+def run(files, workers=None, distance=analysis.MERGE_DISTANCE, timeout=None, store_directory=None, progress=False):
+    if workers == 1:
+        for path in files:
+            yield analyse_file(path, distance, timeout, store_directory, progress)
+        return
+    pending = list(files)
+    pool_workers = workers
+    while pending:
+        broken = set()
+        with ProcessPoolExecutor(max_workers=pool_workers) as pool:
+            futures = {pool.submit(analyse_file, path, distance, timeout, store_directory, progress): path
+                       for path in pending}
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except BrokenProcessPool:
+                    broken.add(futures[future])
+                    continue
+                except Exception as error:
+                    record = _error_record(futures[future], error)
+                yield record
+        pending = [path for path in pending if path in broken]
+        if pending and pool_workers == 1:
+            yield _error_record(pending.pop(0), "worker process died while analysing the file")
+            pool_workers = workers
+        elif pending:
+            pool_workers = 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m learn_computer_graphics.batch",
+        description="Check gaps, interior faces, replicated vertices and curvature of mesh files.")
+    parser.add_argument("paths", nargs='+', help="mesh files, directories or glob patterns")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="time limit for one file in seconds")
+    parser.add_argument("-o", "--output", default=None, help="NDJSON output file (default: stdout)")
+    parser.add_argument("-d", "--distance", type=float, default=analysis.MERGE_DISTANCE, help="merge distance of replicated vertices")
+    parser.add_argument("-s", "--store", nargs='?', const='', default=None, metavar="DIR",
+                        help="check memory-mapped mesh stores made once per file (kept next to the files or in DIR)")
+    parser.add_argument("-p", "--progress", action='store_true', help="print progress of mesh stores to stderr")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.paths)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    start = time.perf_counter()
+    counts = {"ok": 0, "error": 0, "timeout": 0}
+    faces = 0
+    try:
+        for record in run(files, args.workers, args.distance, args.timeout, args.store, args.progress):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            counts[record["status"]] += 1
+            faces += record.get("faces", 0)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    #Throughput statistics go to stderr, so they do not mix with records
+    seconds = time.perf_counter() - start
+    stats = dict(counts, files=len(files), seconds=round(seconds, 3),
+                 files_per_second=round(len(files) / seconds, 3) if seconds else 0.0,
+                 faces_per_second=round(faces / seconds, 1) if seconds else 0.0)
+    print(json.dumps(stats), file=sys.stderr)
+    return 0 if counts["error"] == 0 and counts["timeout"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
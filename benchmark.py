@@ -0,0 +1,288 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import colormaps
+from learn_computer_graphics import curvature
+from learn_computer_graphics import intersect
+from learn_computer_graphics import splines
+from learn_computer_graphics import winding
+from learn_computer_graphics.core import MeshArrays, transformed_bounds
+
+#Benchmarks of analyses on generated meshes, run without Blender:
+#python -m learn_computer_graphics.benchmark --sizes 1000 100000 --output results.json
+#python -m learn_computer_graphics.benchmark --baseline results.json --max-ratio 1.3
+#With baseline the run fails when a stage is slower than max ratio times its baseline time
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+#Interior faces are classified for a random sample of faces,
+#the time grows with the tree depth only, so big meshes stay measurable
+INTERIOR_SAMPLE = 2000
+
+#Vertices of the mesh are control points of Bezier splines of this many points in the splines stage
+SPLINE_POINTS = 16
+
+
+####################################################
+#Mesh generators
+#Every generator returns vertex coordinates and (F, 3) or (F, 4) faces
+#with about the given number of faces
+
+
+#Function subdivides icosahedron, every level gives 4 times more triangles
+def icosphere(level):
+    t = (1 + 5 ** 0.5) / 2
+    verts = np.array([(-1, t, 0), (1, t, 0), (-1, -t, 0), (1, -t, 0), (0, -1, t), (0, 1, t),
+                      (0, -1, -t), (0, 1, -t), (t, 0, -1), (t, 0, 1), (-t, 0, -1), (-t, 0, 1)], dtype=np.float64)
+    faces = np.array([(0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11), (1, 5, 9), (5, 11, 4),
+                      (11, 10, 2), (10, 7, 6), (7, 1, 8), (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8),
+                      (3, 8, 9), (4, 9, 5), (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1)], dtype=np.int64)
+    verts /= np.linalg.norm(verts, axis=1)[:, None]
+    for _ in range(level):
+        #New vertex in the middle of every edge
+        edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        unique, inverse = np.unique(edges, axis=0, return_inverse=True)
+        middle = verts[unique].mean(axis=1)
+        middle /= np.linalg.norm(middle, axis=1)[:, None]
+        m = inverse.reshape(-1, 3) + len(verts)
+        a, b, c = faces[:, 0], faces[:, 1], faces[:, 2]
+        faces = np.concatenate([
+            np.stack([a, m[:, 0], m[:, 2]], axis=1),
+            np.stack([b, m[:, 1], m[:, 0]], axis=1),
+            np.stack([c, m[:, 2], m[:, 1]], axis=1),
+            m,
+        ])
+        verts = np.vstack([verts, middle])
+    return verts, faces
+
+
+def icosphere_faces(nr_faces):
+    return icosphere(max(0, int(round(np.log(max(nr_faces, 20) / 20) / np.log(4)))))
+
+
+#Function creates torus of quads with vertices moved randomly along their normals
+def noisy_torus(nr_faces, noise=0.02, seed=0):
+    minor = max(3, int(round((nr_faces / 2) ** 0.5)))
+    major = max(3, int(round(nr_faces / minor)))
+    u, v = np.meshgrid(np.linspace(0, 2 * np.pi, major, endpoint=False),
+                       np.linspace(0, 2 * np.pi, minor, endpoint=False), indexing='ij')
+    normal = np.stack([np.cos(u) * np.cos(v), np.sin(u) * np.cos(v), np.sin(v)], axis=-1).reshape(-1, 3)
+    center = np.stack([np.cos(u), np.sin(u), np.zeros_like(u)], axis=-1).reshape(-1, 3)
+    radius = 0.3 + noise * np.random.default_rng(seed).standard_normal(len(normal))
+    verts = center + radius[:, None] * normal
+
+    i = np.arange(major)[:, None]
+    j = np.arange(minor)[None, :]
+    faces = np.stack([
+        i * minor + j,
+        ((i + 1) % major) * minor + j,
+        ((i + 1) % major) * minor + (j + 1) % minor,
+        i * minor + (j + 1) % minor,
+    ], axis=-1).reshape(-1, 4)
+    return verts, faces
+
+
+#Function creates triangle soup: every triangle has its own vertices,
+#so vertices of the sphere are replicated and moved less than merge distance
+def vertex_soup(nr_faces, seed=0):
+    verts, faces = icosphere_faces(nr_faces)
+    co = verts[faces].reshape(-1, 3)
+    co += np.random.default_rng(seed).uniform(-0.2, 0.2, co.shape) * analysis.MERGE_DISTANCE
+    return co, np.arange(len(co)).reshape(-1, 3)
+
+
+#Function removes random faces of a sphere, so the mesh has many holes
+def punched_holes(nr_faces, part=0.01, seed=0):
+    verts, faces = icosphere_faces(nr_faces)
+    keep = np.random.default_rng(seed).random(len(faces)) >= part
+    return verts, faces[keep]
+
+
+#Function creates sphere with smaller spheres inside it, faces of inner shells are interior
+def nested_shells(nr_faces, shells=3):
+    verts, faces = icosphere_faces(nr_faces / shells)
+    scales = np.linspace(1, 0.4, shells)
+    all_verts = np.concatenate([verts * scale for scale in scales])
+    all_faces = np.concatenate([faces + k * len(verts) for k in range(shells)])
+    return all_verts, all_faces
+
+
+GENERATORS = {
+    "icosphere": icosphere_faces,
+    "noisy_torus": noisy_torus,
+    "vertex_soup": vertex_soup,
+    "punched_holes": punched_holes,
+    "nested_shells": nested_shells,
+}
+
+
+####################################################
+#Stages
+#Every stage gets new MeshArrays, so tables cached by earlier runs are not reused
+
+
+def _duplicates(mesh):
+    analysis.duplicate_clusters(mesh)
+
+
+def _holes(mesh):
+    analysis.holes(mesh)
+
+
+def _bvh(mesh):
+    mesh.bvh
+
+
+def _interior_rays(mesh):
+    sample = np.random.default_rng(0).choice(mesh.nr_faces, min(INTERIOR_SAMPLE, mesh.nr_faces), replace=False)
+    analysis.interior_faces(mesh, faces=np.sort(sample))
+
+
+def _interior_winding(mesh):
+    sample = np.random.default_rng(0).choice(mesh.nr_faces, min(INTERIOR_SAMPLE, mesh.nr_faces), replace=False)
+    winding.winding_numbers(mesh.bvh, winding.face_points(mesh)[np.sort(sample)])
+
+
+def _self_intersections(mesh):
+    intersect.self_intersections(mesh)
+
+
+def _curvature(mesh):
+    _, levels = analysis.curvature_analysis(mesh)
+    analysis.CURVATURE_COLORS[levels].ravel()
+
+
+#Mean curvature coloured like the curvature stage of mesh analysis
+def _vertex_curvature(mesh):
+    mean = curvature.vertex_curvature(mesh, relative=True)["mean"]
+    colormaps.colorize(mean, scale='DIVERGING')
+
+
+#Vertices of the mesh in groups make Bezier splines, handles follow the neighbour vertices
+def _splines(mesh):
+    co = mesh.verts.astype(np.float64)
+    tangent = np.gradient(co, axis=0) / 3 if len(co) > 1 else np.zeros_like(co)
+    offsets = np.r_[np.arange(0, len(co), SPLINE_POINTS), len(co)]
+    splines.bezier_analysis(co, co - tangent, co + tangent, offsets, np.zeros(len(offsets) - 1, dtype=bool))
+
+
+#Bounds of the object transformed to world space, like the exact mode of set_lighting
+def _bounds(mesh):
+    matrix = np.array([[0, -2, 0, 1], [2, 0, 0, 2], [0, 0, 2, 3], [0, 0, 0, 1]], dtype=np.float64)
+    transformed_bounds(mesh.verts, matrix)
+
+
+STAGES = {
+    "duplicates": _duplicates,
+    "holes": _holes,
+    "bvh": _bvh,
+    "interior_rays": _interior_rays,
+    "interior_winding": _interior_winding,
+    "self_intersections": _self_intersections,
+    "curvature": _curvature,
+    "vertex_curvature": _vertex_curvature,
+    "splines": _splines,
+    "bounds": _bounds,
+}
+
+
+#Function measures stage on the mesh, the best of repeats is returned
+def measure(stage, verts, faces, repeat=3):
+    times = []
+    for _ in range(repeat):
+        mesh = _mesh(verts, faces)
+        if stage.startswith("interior") or stage == "self_intersections":
+            #Tree is measured by its own stage
+            mesh.bvh
+        start = time.perf_counter()
+        STAGES[stage](mesh)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+#Function makes mesh from faces of equal size
+def _mesh(verts, faces):
+    offsets = np.arange(0, faces.size + 1, faces.shape[1], dtype=np.int32)
+    return MeshArrays(verts, offsets, faces.ravel())
+
+
+#Function runs all stages on all generated meshes
+def run(generators, sizes, stages, repeat=3, log=None):
+    results = []
+    for name in generators:
+        for size in sizes:
+            verts, faces = GENERATORS[name](size)
+            for stage in stages:
+                seconds = measure(stage, verts, faces, repeat)
+                result = {"generator": name, "size": size, "faces": len(faces), "verts": len(verts),
+                          "stage": stage, "seconds": round(seconds, 6)}
+                results.append(result)
+                if log is not None:
+                    print("%-14s %9d faces  %-17s %10.4f s" % (name, len(faces), stage, seconds), file=log)
+    return results
+
+
+#Function compares results with baseline
+#Returns results slower than max_ratio times their baseline time
+def regressions(results, baseline, max_ratio, min_seconds=1e-3):
+    previous = {(r["generator"], r["size"], r["stage"]): r["seconds"] for r in baseline}
+    slower = []
+    for r in results:
+        before = previous.get((r["generator"], r["size"], r["stage"]))
+        #Very short stages are too noisy to compare
+        if before is None or max(before, r["seconds"]) < min_seconds:
+            continue
+        ratio = r["seconds"] / max(before, 1e-9)
+        if ratio > max_ratio:
+            slower.append(dict(r, baseline=before, ratio=round(ratio, 3)))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m learn_computer_graphics.benchmark",
+        description="Time analyses of the add-on on generated meshes.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="approximate numbers of faces, e.g. 1000 100000 5000000")
+    parser.add_argument("--generators", nargs='+', choices=sorted(GENERATORS), default=list(GENERATORS))
+    parser.add_argument("--stages", nargs='+', choices=sorted(STAGES), default=list(STAGES))
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="the best of repeated runs is kept")
+    parser.add_argument("-o", "--output", default=None, help="JSON output file (default: stdout)")
+    parser.add_argument("-b", "--baseline", default=None, help="JSON results of an earlier run")
+    parser.add_argument("--max-ratio", type=float, default=1.25, help="allowed slowdown against baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.generators, args.sizes, args.stages, args.repeat, log=sys.stderr)
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            slower = regressions(results, json.load(baseline)["results"], args.max_ratio)
+        report["regressions"] = slower
+        for r in slower:
+            print("REGRESSION %s %d %s: %.4f s, baseline %.4f s (x%.2f)"
+                  % (r["generator"], r["size"], r["stage"], r["seconds"], r["baseline"], r["ratio"]), file=sys.stderr)
+        exit_code = 1 if slower else 0
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
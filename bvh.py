@@ -0,0 +1,258 @@
+import numpy as np
+
+#Bounding volume hierarchy over triangles, built from arrays without bpy
+#Triangles are sorted along a Morton (Z-order) curve, consecutive triangles form leaves
+#and consecutive nodes are joined level by level, so the tree is built in O(T log T)
+#Queries are traversed in batches: box queries one tree level at a time,
+#rays with their own stacks, one node of every ray per step
+
+LEAF_SIZE = 8
+
+
+#Function spreads 10 lowest bits of every value, so three values can be interleaved
+def _spread_bits(values):
+    values = values.astype(np.uint64) & np.uint64(0x3ff)
+    values = (values | (values << np.uint64(16))) & np.uint64(0x030000ff)
+    values = (values | (values << np.uint64(8))) & np.uint64(0x0300f00f)
+    values = (values | (values << np.uint64(4))) & np.uint64(0x030c30c3)
+    values = (values | (values << np.uint64(2))) & np.uint64(0x09249249)
+    return values
+
+
+#Function calculates 30 bit Morton codes of points
+def morton_codes(points):
+    lowest = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lowest, 1e-30)
+    cells = np.clip(((points - lowest) / extent * 1023).astype(np.int64), 0, 1023)
+    return (_spread_bits(cells[:, 0]) << np.uint64(2)) | (_spread_bits(cells[:, 1]) << np.uint64(1)) \
+        | _spread_bits(cells[:, 2])
+
+
+class BVH:
+
+    #tri_co is (T, 3, 3) array of triangle corners
+    def __init__(self, tri_co, leaf_size=LEAF_SIZE):
+        tri_co = np.asarray(tri_co, dtype=np.float64).reshape(-1, 3, 3)
+        self.leaf_size = leaf_size
+        self.nr_triangles = len(tri_co)
+        self.order = np.argsort(morton_codes(tri_co.mean(axis=1)), kind='stable') if len(tri_co) else np.zeros(0, dtype=np.int64)
+        self.tri_co = tri_co[self.order]
+
+        #Leaves, every leaf holds leaf_size consecutive triangles (the last one can hold less)
+        nr_leaves = max(1, -(-self.nr_triangles // leaf_size))
+        lowest = np.full((nr_leaves, 3), np.inf)
+        highest = np.full((nr_leaves, 3), -np.inf)
+        if self.nr_triangles:
+            leaf = np.arange(self.nr_triangles) // leaf_size
+            np.minimum.at(lowest, leaf, self.tri_co.min(axis=1))
+            np.maximum.at(highest, leaf, self.tri_co.max(axis=1))
+
+        #Levels from leaves to root, children of node i are nodes 2i and 2i + 1
+        self.levels = [(lowest, highest)]
+        while len(lowest) > 1:
+            if len(lowest) % 2:
+                lowest = np.vstack([lowest, np.full((1, 3), np.inf)])
+                highest = np.vstack([highest, np.full((1, 3), -np.inf)])
+            lowest = np.minimum(lowest[0::2], lowest[1::2])
+            highest = np.maximum(highest[0::2], highest[1::2])
+            self.levels.append((lowest, highest))
+        self.levels.reverse()
+
+    #Function returns pairs (query, leaf) of queries overlapping leaves
+    #overlaps(query_indices, lowest, highest) tests queries against boxes
+    def _leaf_pairs(self, nr_queries, overlaps):
+        query = np.arange(nr_queries)
+        node = np.zeros(nr_queries, dtype=np.int64)
+        for depth, (lowest, highest) in enumerate(self.levels):
+            if depth:
+                #Go down to both children of every node
+                query = np.repeat(query, 2)
+                node = (node[:, None] * 2 + np.arange(2)).ravel()
+                inside = node < len(lowest)
+                query = query[inside]
+                node = node[inside]
+            hit = overlaps(query, lowest[node], highest[node])
+            query = query[hit]
+            node = node[hit]
+        return query, node
+
+    #Function returns pairs (query, triangle) of queries and triangles from overlapping leaves
+    #Triangle indices are positions in sorted triangles (self.tri_co)
+    def candidate_pairs(self, nr_queries, overlaps):
+        query, leaf = self._leaf_pairs(nr_queries, overlaps)
+        first = leaf * self.leaf_size
+        count = np.minimum(first + self.leaf_size, self.nr_triangles) - first
+        query = np.repeat(query, count)
+        triangle = np.repeat(first - np.cumsum(count) + count, count) + np.arange(int(count.sum()))
+        return query, triangle
+
+    #Function finds pairs of overlapping nodes of the tree with itself, level by level
+    #Pair of the same node gives three pairs of children, other pairs four,
+    #so every pair of different nodes is found once with the first node not after the second
+    #pairs - (N, 2) nodes of level depth to start from (default: the root with itself)
+    #Yields (K, 2) pairs of nodes of level until (default: leaves), at most max_pairs at once
+    def self_pairs(self, depth=0, pairs=None, until=None, max_pairs=1 << 18):
+        until = len(self.levels) - 1 if until is None else until
+        if pairs is None:
+            pairs = np.zeros((1, 2), dtype=np.int64)
+        children = np.array([(0, 0), (0, 1), (1, 0), (1, 1)], dtype=np.int64)
+        stack = [(depth, pairs)]
+        while stack:
+            depth, pairs = stack.pop()
+            if len(pairs) > max_pairs:
+                middle = len(pairs) // 2
+                stack.append((depth, pairs[middle:]))
+                stack.append((depth, pairs[:middle]))
+                continue
+            lowest, highest = self.levels[depth]
+            a = pairs[:, 0]
+            b = pairs[:, 1]
+            overlap = np.all((lowest[a] <= highest[b]) & (lowest[b] <= highest[a]), axis=1)
+            pairs = pairs[overlap]
+            if depth == until:
+                if len(pairs):
+                    yield pairs
+                continue
+            pairs = (pairs[:, None, :] * 2 + children).reshape(-1, 2)
+            same = np.repeat(a[overlap] == b[overlap], 4) & np.tile([False, False, True, False], int(overlap.sum()))
+            pairs = pairs[~same & np.all(pairs < len(self.levels[depth + 1][0]), axis=1)]
+            stack.append((depth + 1, pairs))
+
+    #Function returns boxes of triangles in sorted order
+    def triangle_boxes(self):
+        if not hasattr(self, '_triangle_boxes'):
+            self._triangle_boxes = self.tri_co.min(axis=1), self.tri_co.max(axis=1)
+        return self._triangle_boxes
+
+    #Function returns pairs of triangles with overlapping boxes from pairs of leaves
+    #Only triangles overlapping the box of the other leaf are combined,
+    #triangles of the same leaf are paired once, indices are positions in sorted triangles
+    def leaf_triangle_pairs(self, leaf_pairs):
+        tri_lowest, tri_highest = self.triangle_boxes()
+        lowest, highest = self.levels[-1]
+        slots = np.arange(self.leaf_size)
+
+        def overlapping(leaves, others):
+            triangles = leaves[:, None] * self.leaf_size + slots
+            valid = triangles < self.nr_triangles
+            triangles = np.minimum(triangles, self.nr_triangles - 1)
+            inside = np.all((tri_lowest[triangles] <= highest[others][:, None])
+                            & (lowest[others][:, None] <= tri_highest[triangles]), axis=2)
+            keep = valid & inside
+            return triangles[keep], keep.sum(axis=1)
+
+        list_a, count_a = overlapping(leaf_pairs[:, 0], leaf_pairs[:, 1])
+        list_b, count_b = overlapping(leaf_pairs[:, 1], leaf_pairs[:, 0])
+        combinations = count_a * count_b
+        pair = np.repeat(np.arange(len(leaf_pairs)), combinations)
+        index = np.arange(int(combinations.sum())) - np.repeat(np.cumsum(combinations) - combinations, combinations)
+        a = list_a[(np.cumsum(count_a) - count_a)[pair] + index // count_b[pair]]
+        b = list_b[(np.cumsum(count_b) - count_b)[pair] + index % count_b[pair]]
+        keep = a < b
+        a, b = a[keep], b[keep]
+        overlap = np.all((tri_lowest[a] <= tri_highest[b]) & (tri_lowest[b] <= tri_highest[a]), axis=1)
+        return a[overlap], b[overlap]
+
+    #Function casts rays and returns distance to the closest hit and index of hit triangle
+    #(-1 when nothing is hit), hits closer than min_distance are skipped
+    #With any_hit the traversal stops at the first hit found (visibility tests)
+    #Every ray has its own stack, one node of every active ray is visited per step,
+    #so rays which already hit something closer skip the rest of the tree
+    def ray_cast(self, origins, directions, min_distance=1e-9, any_hit=False):
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        if len(origins) == 1:
+            origins = np.broadcast_to(origins, directions.shape)
+        nr_rays = len(directions)
+        best_t = np.full(nr_rays, np.inf)
+        best_tri = np.full(nr_rays, -1, dtype=np.int64)
+        if self.nr_triangles == 0 or nr_rays == 0:
+            return best_t, best_tri
+
+        with np.errstate(divide='ignore'):
+            inverse = 1.0 / np.where(directions == 0, 1e-300, directions)
+
+        #Nodes of all levels in one array, level k starts at level_start[k]
+        sizes = [len(lowest) for lowest, _ in self.levels]
+        level_start = np.r_[0, np.cumsum(sizes)]
+        lowest = np.concatenate([level[0] for level in self.levels])
+        highest = np.concatenate([level[1] for level in self.levels])
+        center = 0.5 * (lowest + highest)
+        depth = np.repeat(np.arange(len(sizes)), sizes)
+        leaf_level = len(sizes) - 1
+
+        stack = np.zeros((nr_rays, 2 * len(sizes) + 2), dtype=np.int64)
+        top = np.ones(nr_rays, dtype=np.int64)
+        while True:
+            rays = np.flatnonzero(top)
+            if len(rays) == 0:
+                break
+            top[rays] -= 1
+            node = stack[rays, top[rays]]
+
+            #Slab test, boxes further than the closest hit are skipped
+            t1 = (lowest[node] - origins[rays]) * inverse[rays]
+            t2 = (highest[node] - origins[rays]) * inverse[rays]
+            near = np.minimum(t1, t2).max(axis=1)
+            far = np.maximum(t1, t2).min(axis=1)
+            hit = (near <= far) & (far >= min_distance) & (near <= best_t[rays])
+            rays = rays[hit]
+            node = node[hit]
+            level = depth[node]
+            index = node - level_start[level]
+
+            #Inner nodes: push children, the nearer one is visited first
+            inner = level < leaf_level
+            if inner.any():
+                r = rays[inner]
+                first = level_start[level[inner] + 1] + 2 * index[inner]
+                second = first + 1
+                valid = (2 * index[inner] + 1) < np.asarray(sizes)[level[inner] + 1]
+                swap = valid & (np.einsum('ij,ij->i', center[np.where(valid, second, first)] - center[first], directions[r]) < 0)
+                near_child = np.where(swap, second, first)
+                far_child = np.where(swap, first, second)
+                stack[r[valid], top[r[valid]]] = far_child[valid]
+                top[r[valid]] += 1
+                stack[r, top[r]] = near_child
+                top[r] += 1
+
+            #Leaves: test their triangles
+            leaf = ~inner
+            if leaf.any():
+                r = rays[leaf]
+                first = index[leaf] * self.leaf_size
+                count = np.minimum(first + self.leaf_size, self.nr_triangles) - first
+                pair_rays = np.repeat(r, count)
+                tris = np.repeat(first - np.cumsum(count) + count, count) + np.arange(int(count.sum()))
+                t = intersect_rays_triangles(origins[pair_rays], directions[pair_rays], self.tri_co[tris])
+                t[t < min_distance] = np.inf
+                closer = t < best_t[pair_rays]
+                if closer.any():
+                    #Several triangles of one leaf can be closer, the closest one wins
+                    order = np.lexsort((t[closer], pair_rays[closer]))
+                    hit_rays = pair_rays[closer][order]
+                    winner = np.r_[True, hit_rays[1:] != hit_rays[:-1]]
+                    best_t[hit_rays[winner]] = t[closer][order][winner]
+                    best_tri[hit_rays[winner]] = self.order[tris[closer][order][winner]]
+                    if any_hit:
+                        top[hit_rays[winner]] = 0
+        return best_t, best_tri
+
+
+#Function intersects rays with triangles pairwise (Moller-Trumbore)
+#Returns distance along the ray, inf when there is no intersection
+def intersect_rays_triangles(origins, directions, tri_co):
+    v0 = tri_co[:, 0]
+    e1 = tri_co[:, 1] - v0
+    e2 = tri_co[:, 2] - v0
+    p = np.cross(directions, e2)
+    det = np.einsum('ij,ij->i', p, e1)
+    parallel = np.abs(det) < 1e-12
+    inv_det = 1.0 / np.where(parallel, 1.0, det)
+    s = origins - v0
+    u = np.einsum('ij,ij->i', s, p) * inv_det
+    q = np.cross(s, e1)
+    v = np.einsum('ij,ij->i', directions, q) * inv_det
+    t = np.einsum('ij,ij->i', q, e2) * inv_det
+    hit = ~parallel & (u >= 0) & (v >= 0) & (u + v <= 1)
+    return np.where(hit, t, np.inf)
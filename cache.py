@@ -0,0 +1,117 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+#Cache of analysis results, without bpy
+#Results are keyed by content of the mesh (MeshArrays.digest), name of the analysis
+#and its parameters, so running the same analysis on unchanged mesh reads the result
+#Least recently used results are evicted when memory limit is exceeded
+#With directory set, results are also kept in .npz files and survive reloading the add-on
+
+#Memory limit of cached results in bytes
+CACHE_MEMORY = 256 * 1024 * 1024
+
+
+#Function converts result to named arrays, so it can be measured and saved to .npz
+#Result is an array, a tuple of arrays or a dict of arrays and numbers
+#Arrays are copied, so changing the computed result later does not change the cache
+#Empty dict and tuple have no arrays, they are stored as a marker
+def _pack(value):
+    if isinstance(value, dict):
+        if not value:
+            return {"empty_dict": np.zeros(0)}
+        return {"key_" + name: np.array(item) for name, item in value.items()}
+    if isinstance(value, tuple):
+        if not value:
+            return {"empty_tuple": np.zeros(0)}
+        return {"item_%d" % i: np.array(item) for i, item in enumerate(value)}
+    return {"value": np.array(value)}
+
+
+def _unpack(arrays):
+    names = list(arrays)
+    if names == ["empty_dict"]:
+        return {}
+    if names == ["empty_tuple"]:
+        return ()
+    if names and names[0].startswith("key_"):
+        return {name[4:]: arrays[name].item() if arrays[name].ndim == 0 else arrays[name] for name in names}
+    if names and names[0].startswith("item_"):
+        return tuple(arrays["item_%d" % i] for i in range(len(names)))
+    return arrays["value"]
+
+
+class ResultCache:
+
+    def __init__(self, max_bytes=CACHE_MEMORY, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    #Key of a result: mesh content, analysis and its parameters
+    @staticmethod
+    def key(mesh, name, *params):
+        return "%s-%s-%s" % (name, mesh.digest, "-".join(repr(p) for p in params))
+
+    #File name is hash of the key, parameters can contain any characters
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + ".npz")
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return _unpack(self.entries[key])
+        if self.directory and os.path.isfile(self._path(key)):
+            with np.load(self._path(key), allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+            self._store(key, arrays)
+            self.hits += 1
+            return _unpack(arrays)
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        arrays = _pack(value)
+        self._store(key, arrays)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            np.savez(self._path(key), **arrays)
+
+    def _store(self, key, arrays):
+        if key in self.entries:
+            self.nbytes -= sum(a.nbytes for a in self.entries.pop(key).values())
+        size = sum(a.nbytes for a in arrays.values())
+        if size > self.max_bytes:
+            return
+        #Cached arrays are returned to every caller, so they are read-only
+        for array in arrays.values():
+            array.setflags(write=False)
+        self.entries[key] = arrays
+        self.nbytes += size
+        #Least recently used results are removed first
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= sum(a.nbytes for a in evicted.values())
+
+    #Function returns cached result or computes and stores it
+    def cached(self, mesh, name, compute, *params):
+        key = self.key(mesh, name, *params)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+
+#Results shared by all operators of the add-on
+RESULTS = ResultCache()
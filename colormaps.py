@@ -0,0 +1,93 @@
+import numpy as np
+
+from learn_computer_graphics import quantiles
+
+#Colours of analysis values through lookup tables, without bpy
+#Every colormap is given by colour stops and sampled once into a table of LUT_SIZE colours,
+#values are turned into indices of the table, so colouring is one gather for all vertices
+#Scales:
+#CONTINUOUS - values between low and high go through the whole colormap
+#DIVERGING - symmetric range around zero, zero gets the middle colour
+#BINS - values are split by user-defined bin edges, every bin gets one colour
+#Automatic ranges and bins come from percentiles (see quantiles.py), so a few extreme
+#vertices do not squeeze all other colours into the middle of the colormap
+
+LUT_SIZE = 256
+
+#Colour stops (position, red, green, blue) of every colormap
+COLORMAPS = {
+    'COOLWARM': [(0.0, 0.230, 0.299, 0.754), (0.5, 0.865, 0.865, 0.865), (1.0, 0.706, 0.016, 0.150)],
+    'VIRIDIS': [(0.0, 0.267, 0.005, 0.329), (0.25, 0.229, 0.322, 0.546), (0.5, 0.128, 0.567, 0.551),
+                (0.75, 0.369, 0.789, 0.383), (1.0, 0.993, 0.906, 0.144)],
+    'TRAFFIC': [(0.0, 0.0, 1.0, 0.0), (1 / 3, 1.0, 1.0, 0.0), (2 / 3, 1.0, 0.5, 0.0), (1.0, 1.0, 0.0, 0.0)],
+    'GRAY': [(0.0, 0.0, 0.0, 0.0), (1.0, 1.0, 1.0, 1.0)],
+}
+
+SCALES = ('CONTINUOUS', 'DIVERGING', 'BINS')
+
+
+#Function samples colormap into (size, 4) RGBA table
+def lookup_table(name, size=LUT_SIZE):
+    stops = np.asarray(COLORMAPS[name], dtype=np.float64)
+    positions = np.linspace(0.0, 1.0, size)
+    table = np.ones((size, 4), dtype=np.float32)
+    for channel in range(3):
+        table[:, channel] = np.interp(positions, stops[:, 0], stops[:, channel + 1])
+    return table
+
+
+#Function parses bin edges written as text, e.g. "0.3, 0.7, 1.2"
+def parse_bins(text):
+    return np.sort(np.array([float(part) for part in text.replace(";", ",").split(",") if part.strip()]))
+
+
+#Function colours values between low and high, values outside get the end colours
+def continuous(values, low, high, table):
+    scale = (len(table) - 1) / (high - low) if high > low else 0.0
+    index = np.clip((np.asarray(values, dtype=np.float64) - low) * scale, 0, len(table) - 1)
+    return table[(index + 0.5).astype(np.int64)]
+
+
+#Function colours values by bins, K edges give K + 1 colours spread over the colormap
+def binned(values, edges, table):
+    colors = table[np.round(np.linspace(0, len(table) - 1, len(edges) + 1)).astype(np.int64)]
+    return colors[np.searchsorted(edges, values, side='right')]
+
+
+#Function returns range of values coloured by the scale from their statistics
+#(quantiles.summary or QuantileSketch.summary), range is from p1 to p99,
+#diverging scale is symmetric
+def stats_range(stats, scale='CONTINUOUS'):
+    if stats["count"] == 0:
+        return 0.0, 1.0
+    if scale == 'DIVERGING':
+        limit = max(abs(stats["p1"]), abs(stats["p99"]))
+        return -limit, limit
+    return stats["p1"], stats["p99"]
+
+
+#Function returns bin edges from statistics of values: p1, p5, p50, p95 and p99
+def stats_bins(stats):
+    return np.array([stats["p%d" % q] for q in quantiles.PERCENTILES])
+
+
+#Function returns range of values coloured by the scale when it is not given
+def auto_range(values, scale='CONTINUOUS'):
+    return stats_range(quantiles.summary(values), scale)
+
+
+#Function colours values, returns (N, 4) RGBA colours
+#limits (low, high) set the range of continuous and diverging scales (None - auto_range),
+#edges are bin edges of the bins scale (empty - percentiles of values)
+def colorize(values, scale='CONTINUOUS', colormap='COOLWARM', limits=None, edges=(), size=LUT_SIZE):
+    table = lookup_table(colormap, size)
+    values = np.asarray(values)
+    if scale == 'BINS':
+        if len(edges) == 0:
+            edges = stats_bins(quantiles.summary(values))
+        return binned(values, np.sort(np.asarray(edges, dtype=np.float64)), table)
+    low, high = limits if limits is not None else auto_range(values, scale)
+    if scale == 'DIVERGING':
+        limit = max(abs(low), abs(high))
+        low, high = -limit, limit
+    return continuous(values, low, high, table)
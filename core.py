@@ -0,0 +1,269 @@
+import hashlib
+import numpy as np
+
+from learn_computer_graphics.bvh import BVH
+
+#Mesh core does not use bpy
+#It can be filled from Blender mesh data or from files (see loaders.py)
+#and analysed outside Blender (batch processing, CI)
+
+
+#Decorator remembers value computed from the mesh arrays
+#Derived tables are computed once, when they are needed for the first time
+def _cached(function):
+    name = function.__name__
+
+    def wrapper(self):
+        if name not in self._cache:
+            self._cache[name] = function(self)
+        return self._cache[name]
+
+    wrapper.__name__ = name
+    return property(wrapper)
+
+
+#Compact mesh made of arrays
+#verts - float32 (V, 3) vertex coordinates
+#face_offsets - int32 (F + 1) start of every face in face_verts (CSR)
+#face_verts - int32 (L) vertex index of every loop (face corner)
+#normals - optional float32 (V, 3) vertex normals, e.g. read from Blender
+#loose_edges - optional int32 (K, 2) edges not used by any face (wire edges)
+class MeshArrays:
+
+    def __init__(self, verts, face_offsets, face_verts, normals=None, loose_edges=None):
+        self.verts = np.ascontiguousarray(verts, dtype=np.float32).reshape(-1, 3)
+        self.face_offsets = np.ascontiguousarray(face_offsets, dtype=np.int32)
+        self.face_verts = np.ascontiguousarray(face_verts, dtype=np.int32)
+        if loose_edges is None:
+            loose_edges = np.zeros((0, 2), dtype=np.int32)
+        self.loose_edges = np.ascontiguousarray(loose_edges, dtype=np.int32).reshape(-1, 2)
+        self._cache = {}
+        if normals is not None:
+            self._cache['vertex_normals'] = np.ascontiguousarray(normals, dtype=np.float32).reshape(-1, 3)
+
+    #Function creates mesh from list of faces, every face is list of vertex indices
+    @classmethod
+    def from_faces(cls, verts, faces, loose_edges=None):
+        sizes = np.fromiter((len(f) for f in faces), dtype=np.int32, count=len(faces))
+        offsets = np.zeros(len(faces) + 1, dtype=np.int32)
+        np.cumsum(sizes, out=offsets[1:])
+        face_verts = np.fromiter((v for f in faces for v in f), dtype=np.int32, count=int(offsets[-1]))
+        return cls(verts, offsets, face_verts, loose_edges=loose_edges)
+
+    #Function reads Blender mesh data with foreach_get
+    #Loops keep Blender order, so per-loop results can be written back directly
+    @classmethod
+    def from_blender(cls, me):
+        nr_verts = len(me.vertices)
+        nr_loops = len(me.loops)
+        nr_faces = len(me.polygons)
+
+        verts = np.empty(nr_verts * 3, dtype=np.float32)
+        normals = np.empty(nr_verts * 3, dtype=np.float32)
+        face_verts = np.empty(nr_loops, dtype=np.int32)
+        face_offsets = np.empty(nr_faces + 1, dtype=np.int32)
+
+        me.vertices.foreach_get("co", verts)
+        me.vertices.foreach_get("normal", normals)
+        me.loops.foreach_get("vertex_index", face_verts)
+        me.polygons.foreach_get("loop_start", face_offsets[:-1])
+        face_offsets[-1] = nr_loops
+
+        edges = np.empty(len(me.edges) * 2, dtype=np.int32)
+        loose = np.empty(len(me.edges), dtype=bool)
+        me.edges.foreach_get("vertices", edges)
+        me.edges.foreach_get("is_loose", loose)
+        return cls(verts, face_offsets, face_verts, normals, edges.reshape(-1, 2)[loose])
+
+    #Function sets derived tables computed earlier, e.g. mapped from a mesh store (see store.py)
+    def set_tables(self, **tables):
+        self._cache.update(tables)
+
+    #Hash of vertex and face buffers, equal meshes have equal digests (see cache.py)
+    @_cached
+    def digest(self):
+        content = hashlib.blake2b(digest_size=16)
+        for array in (self.verts, self.face_offsets, self.face_verts):
+            content.update(str(array.shape).encode())
+            content.update(array.data)
+        #Meshes without wire edges keep their digests
+        if len(self.loose_edges):
+            content.update(self.loose_edges.data)
+        return content.hexdigest()
+
+    @property
+    def nr_verts(self):
+        return len(self.verts)
+
+    @property
+    def nr_faces(self):
+        return len(self.face_offsets) - 1
+
+    @property
+    def nr_loops(self):
+        return len(self.face_verts)
+
+    @property
+    def nr_edges(self):
+        return len(self.edges)
+
+    #Number of vertices of every face
+    @_cached
+    def face_sizes(self):
+        return np.diff(self.face_offsets)
+
+    #Face index of every loop
+    @_cached
+    def loop_faces(self):
+        return np.repeat(np.arange(self.nr_faces, dtype=np.int32), self.face_sizes)
+
+    #Index of next loop in the same face
+    @_cached
+    def loop_next(self):
+        loop_next = np.arange(1, self.nr_loops + 1, dtype=np.int32)
+        loop_next[self.face_offsets[1:] - 1] -= self.face_sizes
+        return loop_next
+
+    #Index of previous loop in the same face
+    @_cached
+    def loop_prev(self):
+        loop_prev = np.arange(-1, self.nr_loops - 1, dtype=np.int32)
+        loop_prev[self.face_offsets[:-1]] += self.face_sizes
+        return loop_prev
+
+    #Function builds edge table from loops
+    #Edge of a loop goes from its vertex to the vertex of the next loop
+    def _edge_table(self):
+        if 'edges' not in self._cache:
+            a = self.face_verts
+            b = self.face_verts[self.loop_next]
+            low = np.minimum(a, b).astype(np.int64)
+            high = np.maximum(a, b).astype(np.int64)
+            keys, loop_edges = np.unique(low * max(self.nr_verts, 1) + high, return_inverse=True)
+            edges = np.empty((len(keys), 2), dtype=np.int32)
+            edges[:, 0] = keys // max(self.nr_verts, 1)
+            edges[:, 1] = keys % max(self.nr_verts, 1)
+            self._cache['edges'] = edges
+            self._cache['loop_edges'] = loop_edges.reshape(-1).astype(np.int32)
+        return self._cache['edges'], self._cache['loop_edges']
+
+    #Unique edges as (E, 2) array, lower vertex index first
+    @property
+    def edges(self):
+        return self._edge_table()[0]
+
+    #Edge index of every loop
+    @property
+    def loop_edges(self):
+        return self._edge_table()[1]
+
+    #Number of faces using every edge
+    @_cached
+    def edge_face_count(self):
+        return np.bincount(self.loop_edges, minlength=self.nr_edges).astype(np.int32)
+
+    #Face normals scaled by double face area (Newell method)
+    @_cached
+    def _face_cross(self):
+        p = self.verts[self.face_verts].astype(np.float64)
+        q = self.verts[self.face_verts[self.loop_next]].astype(np.float64)
+        cross = np.cross(p, q)
+        if self.nr_faces == 0:
+            return np.zeros((0, 3))
+        return np.add.reduceat(cross, self.face_offsets[:-1], axis=0)
+
+    @_cached
+    def face_areas(self):
+        return (0.5 * np.linalg.norm(self._face_cross, axis=1)).astype(np.float32)
+
+    @_cached
+    def face_normals(self):
+        cross = self._face_cross
+        length = np.linalg.norm(cross, axis=1)[:, None]
+        return np.divide(cross, length, out=np.zeros_like(cross), where=length > 0).astype(np.float32)
+
+    #Center of every face, mean of its vertices
+    @_cached
+    def face_centroids(self):
+        if self.nr_faces == 0:
+            return np.zeros((0, 3), dtype=np.float32)
+        sums = np.add.reduceat(self.verts[self.face_verts].astype(np.float64), self.face_offsets[:-1], axis=0)
+        return (sums / self.face_sizes[:, None]).astype(np.float32)
+
+    #Vertex normals, area weighted sum of face normals
+    @_cached
+    def vertex_normals(self):
+        cross = self._face_cross[self.loop_faces]
+        normals = np.zeros((self.nr_verts, 3))
+        for axis in range(3):
+            normals[:, axis] = np.bincount(self.face_verts, weights=cross[:, axis], minlength=self.nr_verts)
+        length = np.linalg.norm(normals, axis=1)[:, None]
+        return np.divide(normals, length, out=np.zeros_like(normals), where=length > 0).astype(np.float32)
+
+    #Longest axis of the bounding box, the sweep for replicated vertices goes along it (see store.py)
+    @_cached
+    def sweep_axis(self):
+        lowest, highest = self.bounds()
+        return int(np.argmax(highest - lowest))
+
+    #Vertices sorted along the sweep axis and their coordinates on it
+    @_cached
+    def sweep_order(self):
+        return np.argsort(self.verts[:, self.sweep_axis], kind='stable').astype(np.int32)
+
+    @_cached
+    def sweep_co(self):
+        return self.verts[self.sweep_order, self.sweep_axis]
+
+    #Fan triangulation of all faces
+    #Returns (T, 3) vertex indices and face index of every triangle
+    def _triangulation(self):
+        if 'triangles' not in self._cache:
+            #Every face of n vertices gives n - 2 triangles
+            tri_counts = np.maximum(self.face_sizes - 2, 0)
+            tri_faces = np.repeat(np.arange(self.nr_faces, dtype=np.int32), tri_counts)
+            first = self.face_offsets[:-1][tri_faces]
+            tri_starts = np.zeros(len(tri_counts), dtype=np.int64)
+            np.cumsum(tri_counts[:-1], out=tri_starts[1:])
+            corner = np.arange(len(tri_faces)) - tri_starts[tri_faces]
+            triangles = np.stack([
+                self.face_verts[first],
+                self.face_verts[first + corner + 1],
+                self.face_verts[first + corner + 2],
+            ], axis=1).astype(np.int32)
+            self._cache['triangles'] = triangles
+            self._cache['tri_faces'] = tri_faces
+        return self._cache['triangles'], self._cache['tri_faces']
+
+    @property
+    def triangles(self):
+        return self._triangulation()[0]
+
+    @property
+    def tri_faces(self):
+        return self._triangulation()[1]
+
+    #Bounding volume hierarchy over triangles of the mesh, built once
+    @_cached
+    def bvh(self):
+        return BVH(self.verts[self.triangles])
+
+    #Minimal and maximal corner of the bounding box
+    def bounds(self):
+        if self.nr_verts == 0:
+            return np.zeros(3, dtype=np.float32), np.zeros(3, dtype=np.float32)
+        return self.verts.min(axis=0), self.verts.max(axis=0)
+
+
+#Function transforms points by 4 x 4 matrix (e.g. matrix_world of an object) part by part,
+#so only a part of the points is converted to float64 at a time
+#Returns minimal and maximal corner of the transformed points
+def transformed_bounds(co, matrix, chunk=1 << 20):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    lowest = np.full(3, np.inf)
+    highest = np.full(3, -np.inf)
+    for start in range(0, len(co), chunk):
+        part = np.asarray(co[start:start + chunk], dtype=np.float64).reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+        lowest = np.minimum(lowest, part.min(axis=0))
+        highest = np.maximum(highest, part.max(axis=0))
+    return lowest, highest
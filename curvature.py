@@ -0,0 +1,132 @@
+import numpy as np
+
+from learn_computer_graphics import profiling
+
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    #Blender does not bundle scipy, only the Laplacian matrix needs it
+    sparse = None
+
+#Discrete curvature of every vertex, without bpy (Meyer et al. 2003)
+#Mean curvature comes from the cotangent Laplacian, Gaussian curvature from the angle defect,
+#both are divided by the mixed Voronoi area of the vertex; faces are fan-triangulated
+#Curvatures are in 1 / length, with relative=True they are multiplied by the diagonal of
+#the bounding box (Gaussian curvature by its square), so assets of any size can be compared
+#Sign of mean curvature follows vertex normals: positive on convex parts of outward meshes
+
+
+#Function calculates corner geometry of every triangle
+#Corner c is opposite to edge from corner c + 1 to corner c + 2
+#Arrays are stored corner by corner, (3, T), so sums per vertex use triangles.T
+#Returns opposite edges, cotangents and angles of corners and areas of triangles
+def triangle_corners(mesh):
+    co = mesh.verts.astype(np.float64)
+    triangles = mesh.triangles
+    p0, p1, p2 = co[triangles[:, 0]], co[triangles[:, 1]], co[triangles[:, 2]]
+    edges = (p2 - p1, p0 - p2, p1 - p0)
+    double_area = np.linalg.norm(np.cross(edges[1], edges[2]), axis=1)
+    cot = np.empty((3, len(triangles)))
+    angle = np.empty((3, len(triangles)))
+    for corner in range(3):
+        #Both sides of the corner are the other two edges, one of them reversed
+        dot = -np.einsum('ij,ij->i', edges[(corner + 1) % 3], edges[(corner + 2) % 3])
+        np.divide(dot, double_area, out=cot[corner], where=double_area > 0)
+        cot[corner][double_area == 0] = 0
+        angle[corner] = np.arctan2(double_area, dot)
+    return edges, cot, angle, 0.5 * double_area
+
+
+#Function returns weights of the cotangent Laplacian, one for every triangle corner
+#Weight cot / 2 belongs to the edge opposite to the corner, weights of an edge shared
+#by two triangles add up to (cot alpha + cot beta) / 2
+#Returns (N,) first vertices, second vertices and weights
+def cotangent_weights(mesh, cot=None):
+    if cot is None:
+        cot = triangle_corners(mesh)[1]
+    triangles = mesh.triangles
+    first = triangles[:, [1, 2, 0]].T.ravel()
+    second = triangles[:, [2, 0, 1]].T.ravel()
+    return first, second, 0.5 * cot.ravel()
+
+
+#Function builds the cotangent Laplacian as (V, V) sparse matrix, L = D - W
+#It needs scipy, curvature itself is calculated without it
+def cotangent_laplacian(mesh):
+    if sparse is None:
+        raise ImportError("scipy is needed for the sparse Laplacian matrix")
+    first, second, weights = cotangent_weights(mesh)
+    rows = np.concatenate([first, second, first, second])
+    cols = np.concatenate([second, first, first, second])
+    values = np.concatenate([-weights, -weights, weights, weights])
+    shape = (mesh.nr_verts, mesh.nr_verts)
+    return sparse.coo_matrix((values, (rows, cols)), shape=shape).tocsr()
+
+
+#Function calculates L x, the cotangent Laplacian of vertex positions, triangle by triangle
+#Corner c gets weighted edges to the two other corners, the result is summed per vertex
+#Its length divided by the vertex area is twice the mean curvature
+def mean_curvature_normals(mesh, corners=None):
+    edges, cot, _, _ = corners if corners is not None else triangle_corners(mesh)
+    vertices = mesh.triangles.T.ravel()
+    normals = np.empty((mesh.nr_verts, 3))
+    for axis in range(3):
+        weighted = [0.5 * cot[corner] * edges[corner][:, axis] for corner in range(3)]
+        #Corner c: w(c + 1) * edge(c + 1) - w(c + 2) * edge(c + 2)
+        parts = np.concatenate([weighted[(corner + 1) % 3] - weighted[(corner + 2) % 3] for corner in range(3)])
+        normals[:, axis] = np.bincount(vertices, weights=parts, minlength=mesh.nr_verts)
+    return normals
+
+
+#Function calculates mixed Voronoi area of every vertex
+#Corners of non-obtuse triangles get Voronoi area, obtuse triangles give half of the area
+#to the obtuse corner and quarter to the others
+def mixed_areas(mesh, corners=None):
+    edges, cot, angle, area = corners if corners is not None else triangle_corners(mesh)
+    opposite = [np.einsum('ij,ij->i', edge, edge) for edge in edges]
+    obtuse_corner = angle > np.pi / 2
+    obtuse = obtuse_corner.any(axis=0)
+    parts = []
+    for corner in range(3):
+        following, previous = (corner + 1) % 3, (corner + 2) % 3
+        voronoi = (opposite[following] * cot[following] + opposite[previous] * cot[previous]) / 8
+        parts.append(np.where(obtuse, np.where(obtuse_corner[corner], 0.5, 0.25) * area, voronoi))
+    return np.bincount(mesh.triangles.T.ravel(), weights=np.concatenate(parts),
+                       minlength=mesh.nr_verts).astype(np.float64)
+
+
+#Function calculates curvature of every vertex
+#Returns mean, Gaussian and principal curvatures (k1 >= k2) and mixed area of every vertex
+#Vertices without faces get zero curvature, boundary vertices get zero Gaussian curvature,
+#because angle defect is not defined there
+def vertex_curvature(mesh, relative=False):
+    corners = triangle_corners(mesh)
+    area = mixed_areas(mesh, corners)
+    has_area = area > 0
+
+    #Mean curvature is half of the Laplacian projected on the vertex normal
+    normals = mesh.vertex_normals.astype(np.float64)
+    projected = np.einsum('ij,ij->i', mean_curvature_normals(mesh, corners), normals)
+    mean = np.divide(0.5 * projected, area, out=np.zeros(mesh.nr_verts), where=has_area)
+
+    #Angle defect of inner vertices
+    angles = np.bincount(mesh.triangles.T.ravel(), weights=corners[2].ravel(), minlength=mesh.nr_verts)
+    inner = has_area.copy()
+    inner[mesh.edges[mesh.edge_face_count == 1].ravel()] = False
+    gaussian = np.divide(2 * np.pi - angles, area, out=np.zeros(mesh.nr_verts), where=inner)
+
+    if relative and mesh.nr_verts:
+        lowest, highest = mesh.bounds()
+        diagonal = float(np.linalg.norm(highest.astype(np.float64) - lowest))
+        mean *= diagonal
+        gaussian *= diagonal ** 2
+
+    spread = np.sqrt(np.maximum(mean * mean - gaussian, 0))
+    profiling.count("vertices processed", mesh.nr_verts)
+    return {
+        "mean": mean,
+        "gaussian": gaussian,
+        "k1": mean + spread,
+        "k2": mean - spread,
+        "area": area,
+    }
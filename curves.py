@@ -1,147 +1,152 @@
-import bpy
-import bmesh
-import mathutils
-from collections import defaultdict
-from learn_computer_graphics import mesh
-
-#Function does curves analysis 
-#assigns colors to vertices basing on curvature
-def analyse_curves(self, context):  
-    ####################################
-    #At first it is necessary to remove additional vertices
-    #It is to avoid situation when distance between 2 vertices is zero 
-    if bpy.context.active_object.mode != 'EDIT':
-        bpy.ops.object.editmode_toggle()
-    #Select everything
-    bpy.ops.mesh.select_all(action='SELECT')
-    #Remove additional vertices
-    mesh.merge_verts(self, context)
-    bpy.ops.object.editmode_toggle()
-    ####################################
-    #If active mode is edit mode, switch to object mode
-    if bpy.context.active_object.mode == 'EDIT':
-        bpy.ops.object.editmode_toggle()
-        
-    #Check if any object is selected 
-    #If not, show info to select an object 
-    if not context.selected_objects:
-        self.report({'INFO'}, "Select an object to analyse.")
-    else:
-        #Get the active mesh
-        obj = context.selected_objects[0]
-        mesh_active = obj.data
-        
-        #Assign to active or create new color layer
-        if mesh_active.vertex_colors:
-            color_layer = mesh_active.vertex_colors.active
-        else:
-            color_layer = mesh_active.vertex_colors.new()
-
-        #Get the bmesh representation
-        bm = bmesh.new()
-        bm.from_mesh(bpy.context.active_object.data)
-        bm.edges.ensure_lookup_table()
-        
-        #Initialize median, maximal and minimal curvature
-        median = 0
-        max = -2
-        min = 2
-        
-        #Initialize dictionaries 
-        e_dict = defaultdict(list)
-        v_dict = defaultdict(list)
-        c_dict = defaultdict(float)
-        
-        #Create dictionary with vertices indices and loops indices
-        for f in bm.faces:
-            for v_ix, l_ix in zip(f.verts, f.loops):
-                v_dict[v_ix.index].append(l_ix.index)       
-        print(v_dict)
-               
-        #Create dictionary with edges indices and its faces     
-        for f in bm.faces:
-            for e in f.edges:
-                e_dict[e.index].append(f)    
-        print(e_dict)
-        
-        #Go thru edges end calculate curvature
-        for e in bm.edges:
-            #For each edge save its normals and coordinates to variables
-            p1 = e.verts[0].co
-            p2 = e.verts[1].co
-            n1 = e.verts[0].normal
-            n2 = e.verts[1].normal
-            
-            #Calculate curvature
-            curvature = (n2 - n1).dot(p2 - p1)
-            curvature = curvature / (p2 - p1).length
-            median += curvature
-            
-            #Save calculated curvature in dictionary
-            #Curvature is assigned to edge
-            c_dict[e.index] = curvature
-            
-            #Calculate maximal and minimal curvature
-            if curvature > max: max = curvature
-            if curvature < min: min = curvature
-                
-        #Calculate median curvature
-        median = median/len(bm.edges)
-        
-        #Show info in system console
-        print("Median: ", median)
-        print("Maximal curvature: ", max)
-        print("Minimal curvature: ", min)
-        
-        
-        #Go thru dictionaries to get vertex and his loop indices
-        #Paint them green - littlest values of curvature
-        for e in bm.edges:
-            curvature = c_dict[e.index]
-            for v in e.verts: 
-                for f in e_dict[e.index]:
-                    for l in f.loops:
-                        if l.index in v_dict[v.index]:
-                           color_layer.data[l.index].color = (0, 1.0, 0, 1.0)
-                          
-                                
-        #Go thru dictionaries to get vertex and his loop indices
-        #Paint them yellow                      
-        for e in bm.edges:
-            curvature = c_dict[e.index]
-            for v in e.verts:
-                for f in e_dict[e.index]:
-                    for l in f.loops:
-                        if l.index in v_dict[v.index]:   
-                            if abs(curvature) > (0.3) and abs(curvature) <= (0.7):
-                                color_layer.data[l.index].color = (1.0, 1.0, 0, 1.0)
-          
-        #Go thru dictionaries to get vertex and his loop indices
-        #Paint them orange                     
-        for e in bm.edges:
-            curvature = c_dict[e.index]
-            for v in e.verts:
-                for f in e_dict[e.index]:
-                    for l in f.loops:
-                        if l.index in v_dict[v.index]:  
-                            if abs(curvature) > (0.7) and abs(curvature) <= (1.2):
-                                color_layer.data[l.index].color = (1.0, 0.5, 0, 1.0)
-
-                                
-        #Go thru dictionaries to get vertex and his loop indices
-        #Paint them red - biggest values of curvature                   
-        for e in bm.edges:
-            curvature = c_dict[e.index]
-            for v in e.verts:
-                for f in e_dict[e.index]: 
-                    for l in f.loops:
-                        if l.index in v_dict[v.index]:   
-                            if abs(curvature) > (1.2) and abs(curvature) <= (2):
-                                color_layer.data[l.index].color = (1.0, 0, 0, 1.0)                   
-        
-        
-        #Switch active mode to Vertex Paint
-        bpy.ops.object.mode_set(mode='VERTEX_PAINT')
-
-        
-             
\ No newline at end of file
+import bpy
+import numpy as np
+
+from learn_computer_graphics import mesh
+from learn_computer_graphics import profiling
+from learn_computer_graphics import splines
+
+#Segments of curve objects bending more than this are selected, in 1 / length
+#(curvature 10 is a circle with radius 0.1)
+CURVATURE_LIMIT = 10.0
+
+
+#Function reads Bezier and NURBS splines of the curve object in world space, so curvature
+#does not depend on scale of the object; poly splines have no curvature and are left out
+#Returns dictionary of both kinds: indices of splines in the curve, points and offsets
+def read_splines(obj):
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
+    data = obj.data.splines
+    found = {}
+    for kind, collection, names, size in (('BEZIER', "bezier_points", ("co", "handle_left", "handle_right"), 3),
+                                          ('NURBS', "points", ("co",), 4)):
+        indices = [i for i, spline in enumerate(data) if spline.type == kind]
+        counts = [len(getattr(data[i], collection)) for i in indices]
+        offsets = np.r_[0, np.cumsum(counts)].astype(np.int64)
+        arrays = {}
+        for name in names:
+            values = np.empty((offsets[-1], size), dtype=np.float32)
+            for i, start, end in zip(indices, offsets[:-1], offsets[1:]):
+                part = np.empty((end - start) * size, dtype=np.float32)
+                getattr(data[i], collection).foreach_get(name, part)
+                values[start:end] = part.reshape(-1, size)
+            #Weights of NURBS points stay, affine transform does not change the curve
+            values = values.astype(np.float64)
+            values[:, :3] = values[:, :3] @ matrix[:3, :3].T + matrix[:3, 3]
+            arrays[name] = values
+        found[kind] = {
+            "splines": np.array(indices, dtype=np.int64),
+            "offsets": offsets,
+            "points": arrays,
+            "cyclic": np.array([data[i].use_cyclic_u for i in indices], dtype=bool),
+            "orders": np.array([data[i].order_u for i in indices], dtype=np.int64),
+            "endpoint": np.array([data[i].use_endpoint_u for i in indices], dtype=bool),
+            "bezier": np.array([data[i].use_bezier_u for i in indices], dtype=bool),
+        }
+    return found
+
+
+#Function analyses all splines read by read_splines
+#Returns results of splines.bezier_analysis and splines.nurbs_analysis by kind
+def analyse_splines(found, limit=CURVATURE_LIMIT):
+    bezier, nurbs = found['BEZIER'], found['NURBS']
+    points = bezier["points"]
+    return {
+        'BEZIER': splines.bezier_analysis(points["co"], points["handle_left"], points["handle_right"],
+                                          bezier["offsets"], bezier["cyclic"], limit),
+        'NURBS': splines.nurbs_analysis(nurbs["points"]["co"], nurbs["offsets"], nurbs["orders"], nurbs["cyclic"],
+                                        nurbs["endpoint"], nurbs["bezier"], limit),
+    }
+
+
+#Function returns mask of control points of flagged segments, for all splines of one kind
+#Bezier segment uses two points, NURBS span order points, points of cyclic splines wrap around
+def flagged_points(kind, result, offsets, orders):
+    flagged = result["flagged"]
+    spline = result["segment_spline"][flagged]
+    width = np.full(len(flagged), 2) if kind == 'BEZIER' else np.minimum(orders, np.diff(offsets))[spline]
+    counts = np.diff(offsets)[spline]
+    step = np.arange(int(width.sum())) - np.repeat(np.cumsum(width) - width, width)
+    local = (np.repeat(result["segment_first"][flagged], width) + step) % np.repeat(counts, width)
+    mask = np.zeros(offsets[-1], dtype=bool)
+    mask[offsets[np.repeat(spline, width)] + local] = True
+    return mask
+
+
+#Function returns (K, 2, 3) pieces of sampled flagged segments in local space of the object
+def flagged_pieces(obj, result):
+    offsets = result["sample_offsets"]
+    flagged = result["flagged"]
+    counts = offsets[flagged + 1] - offsets[flagged] - 1
+    first = np.repeat(offsets[flagged] - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+    inverse = np.linalg.inv(np.array(obj.matrix_world, dtype=np.float64))
+    points = result["points"].astype(np.float64) @ inverse[:3, :3].T + inverse[:3, 3]
+    return np.stack([points[first], points[first + 1]], axis=1)
+
+
+#Function prepares curvature analysis of Bezier and NURBS splines of the curve object
+#Control points of segments bending more than the limit are selected and shown in edit mode,
+#with overlay sampled flagged segments are added as a separate edge object
+def spline_job(self, context, limit=CURVATURE_LIMIT, overlay=False):
+    obj = context.active_object
+    with profiling.stage("read splines"):
+        found = read_splines(obj)
+
+    def compute(progress):
+        with profiling.stage("spline curvature"):
+            return analyse_splines(found, limit)
+
+    def finish(results):
+        data = obj.data.splines
+        selected = segments = 0
+        with profiling.stage("write back"):
+            for kind, collection, name in (('BEZIER', "bezier_points", "select_control_point"),
+                                           ('NURBS', "points", "select")):
+                result = results[kind]
+                offsets = found[kind]["offsets"]
+                mask = flagged_points(kind, result, offsets, found[kind]["orders"])
+                for i, start, end in zip(found[kind]["splines"], offsets[:-1], offsets[1:]):
+                    getattr(data[i], collection).foreach_set(name, mask[start:end])
+                selected += int(np.count_nonzero(mask))
+                segments += len(result["flagged"])
+
+                #Show info in system console
+                if len(result["curvature"]):
+                    print(kind.capitalize(), "splines:", len(result["max_curvature"]), "segment(s),",
+                          len(result["curvature"]), "samples, maximal curvature", float(result["curvature"].max()),
+                          "maximal torsion", float(np.abs(result["torsion"]).max()))
+
+            if overlay and segments:
+                pieces = np.concatenate([flagged_pieces(obj, results[kind]) for kind in ('BEZIER', 'NURBS')])
+                mesh.add_segments(obj, pieces, "curvature")
+            if obj.mode != 'EDIT':
+                bpy.ops.object.mode_set(mode='EDIT')
+
+        self.report({'INFO'}, "Selected " + str(selected) + " control point(s) of " + str(segments)
+                    + " segment(s) with curvature above " + str(limit) + ".")
+        return results
+
+    return compute, finish
+
+
+#Function prepares curves analysis
+#Curve objects get curvature of their splines (see spline_job), meshes curvature of edges:
+#replicated vertices are merged first, it is to avoid situation when distance
+#between 2 vertices is zero, both stages run in one session of the mesh (see mesh.py)
+def curves_job(self, context, limit=CURVATURE_LIMIT, overlay=False):
+    #Check if any object is selected
+    #If not, show info to select an object
+    obj = context.active_object
+    if obj is not None and obj.type == 'CURVE':
+        return spline_job(self, context, limit, overlay)
+    if obj is None or obj.type != 'MESH':
+        def finish(result):
+            self.report({'INFO'}, "Select an object to analyse.")
+        return (lambda progress: None), finish
+    return mesh.pipeline_job(self, context, ('merge', 'curvature'))
+
+
+#Function does curves analysis
+#assigns colors to vertices basing on curvature
+def analyse_curves(self, context):
+    compute, finish = curves_job(self, context)
+    finish(compute(None))
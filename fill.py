@@ -0,0 +1,190 @@
+import numpy as np
+
+from learn_computer_graphics import analysis
+
+#Hole filling working on core.MeshArrays, without bpy
+#Every boundary loop is filled separately with triangles by ear clipping:
+#small loops of the same size are clipped together, one ear of every loop per step,
+#large loops one by one, clipping many ears apart from each other per step
+
+#Loops with more vertices are clipped one by one, so memory per loop stays linear
+EAR_CLIPPING_LIMIT = 32
+
+#Corner and vertex pairs tested at once, it bounds memory of clipping
+FILL_BATCH = 1 << 22
+
+
+#Function projects loops on their best fitting planes
+#co is (L, n, 3), returns (L, n, 2) coordinates, loops are counter-clockwise in them
+def _project_loops(co):
+    centered = co - co.mean(axis=1, keepdims=True)
+    normal = np.cross(centered, np.roll(centered, -1, axis=1)).sum(axis=1)
+    length = np.linalg.norm(normal, axis=1)
+    normal[length == 0] = (0, 0, 1)
+    normal /= np.linalg.norm(normal, axis=1)[:, None]
+
+    #Any vector not parallel to the normal gives the first axis of the plane
+    helper = np.where(np.abs(normal[:, :1]) < 0.9, [[1.0, 0, 0]], [[0, 1.0, 0]])
+    u = np.cross(normal, helper)
+    u /= np.linalg.norm(u, axis=1)[:, None]
+    v = np.cross(normal, u)
+    return np.stack([np.einsum('lnk,lk->ln', centered, u), np.einsum('lnk,lk->ln', centered, v)], axis=2)
+
+
+def _cross_2d(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+#Function triangulates loops of equal size by ear clipping
+#loops is (L, n) vertex indices, co is (L, n, 3) their coordinates
+#Returns (L * (n - 2), 3) triangles
+def _ear_clipping(loops, co):
+    nr_loops = len(loops)
+    rows = np.arange(nr_loops)
+    points = _project_loops(co)
+    triangles = []
+    while loops.shape[1] > 3:
+        size = loops.shape[1]
+        before = np.roll(points, 1, axis=1)
+        after = np.roll(points, -1, axis=1)
+        convex = _cross_2d(points - before, after - points)
+
+        #Ear is convex corner with no other vertex of the loop inside its triangle
+        #(L, corner, vertex) tests, the corner's own three vertices are skipped
+        p = points[:, None, :, :]
+        a = before[:, :, None, :]
+        b = points[:, :, None, :]
+        c = after[:, :, None, :]
+        inside = ((_cross_2d(b - a, p - a) > 0) & (_cross_2d(c - b, p - b) > 0) & (_cross_2d(a - c, p - c) > 0))
+        corner = np.arange(size)
+        own = (corner[None, :] == corner[:, None]) | (corner[None, :] == (corner[:, None] - 1) % size) \
+            | (corner[None, :] == (corner[:, None] + 1) % size)
+        inside &= ~own[None, :, :]
+        ear = (convex > 0) & ~inside.any(axis=2)
+
+        #From all ears the one with the shortest new edge is clipped
+        #When a loop has no ear (degenerate loop), its most convex corner is clipped
+        diagonal = np.linalg.norm(after - before, axis=2)
+        score = np.where(ear, diagonal, np.inf)
+        fallback = ~ear.any(axis=1)
+        chosen = np.argmin(score, axis=1)
+        chosen[fallback] = np.argmax(convex[fallback], axis=1)
+
+        #Triangles are reversed, so they continue winding of faces around the hole
+        triangles.append(np.stack([
+            loops[rows, (chosen + 1) % size],
+            loops[rows, chosen],
+            loops[rows, (chosen - 1) % size],
+        ], axis=1))
+
+        keep = np.ones(loops.shape, dtype=bool)
+        keep[rows, chosen] = False
+        loops = loops[keep].reshape(nr_loops, size - 1)
+        points = points[keep].reshape(nr_loops, size - 1, 2)
+
+    triangles.append(loops[:, ::-1])
+    return np.concatenate(triangles)
+
+
+#Function tests corners of a loop projected on a plane (see _clip_loop)
+#Only reflex corners can lie inside the triangle of a convex corner, they are found
+#in the x range of the triangle from reflex corners sorted along x (by_x)
+#Returns convexity (double area of the corner's triangle), ear flag and length of the new edge
+def _corner_tests(points, alive, reflex, by_x, before, after, corners):
+    a = points[before[corners]]
+    b = points[corners]
+    c = points[after[corners]]
+    convex = _cross_2d(b - a, c - b)
+    ear = convex > 0
+
+    x = np.stack([a[:, 0], b[:, 0], c[:, 0]], axis=1)
+    sorted_x = points[by_x, 0]
+    low = np.searchsorted(sorted_x, x.min(axis=1), 'left')
+    counts = np.searchsorted(sorted_x, x.max(axis=1), 'right') - low
+    ends = np.cumsum(counts)
+    #Corners are taken in batches of at most FILL_BATCH candidates (or one corner)
+    cuts = np.unique(np.r_[0, np.searchsorted(ends, np.arange(FILL_BATCH, ends[-1], FILL_BATCH)), len(corners)])
+    for first, last in zip(cuts[:-1], cuts[1:]):
+        part = counts[first:last]
+        tested = first + np.repeat(np.arange(len(part)), part)
+        others = by_x[np.repeat(low[first:last] - np.cumsum(part) + part, part) + np.arange(int(part.sum()))]
+        keep = alive[others] & reflex[others] & (others != corners[tested]) & (others != before[corners[tested]]) \
+            & (others != after[corners[tested]])
+        tested, p = tested[keep], points[others[keep]]
+        pa, pb, pc = a[tested], b[tested], c[tested]
+        inside = (_cross_2d(pb - pa, p - pa) > 0) & (_cross_2d(pc - pb, p - pb) > 0) & (_cross_2d(pa - pc, p - pc) > 0)
+        ear[tested[inside]] = False
+    return convex, ear, np.linalg.norm(c - a, axis=1)
+
+
+#Function triangulates one large loop by ear clipping like _ear_clipping
+#Corners are kept in a linked list, every step clips all ears with new edge shorter than
+#new edges of both neighbour corners (they are never next to each other, so they stay ears),
+#then only corners next to clipped ears are tested again
+#Returns (n - 2, 3) triangles
+def _clip_loop(loop, co):
+    size = len(loop)
+    points = _project_loops(co[None])[0]
+    corners = np.arange(size)
+    before = np.roll(corners, 1)
+    after = np.roll(corners, -1)
+    alive = np.ones(size, dtype=bool)
+    reflex = _cross_2d(points - points[before], points[after] - points) <= 0
+    #Clipping never makes a corner reflex, so the sorted list of reflex corners stays valid
+    by_x = np.flatnonzero(reflex)
+    by_x = by_x[np.argsort(points[by_x, 0], kind='stable')]
+    convex, ear, diagonal = _corner_tests(points, alive, reflex, by_x, before, after, corners)
+
+    triangles = []
+    left = size
+    while left > 3:
+        score = np.where(alive & ear, diagonal, np.inf)
+        chosen = np.flatnonzero((score < np.inf) & (score < score[before]) & (score <= score[after]))[:left - 3]
+        #When the loop has no ear (degenerate loop), its most convex corner is clipped
+        if len(chosen) == 0:
+            chosen = np.array([np.argmax(np.where(alive, convex, -np.inf))])
+        first, last = before[chosen], after[chosen]
+        triangles.append(np.stack([loop[last], loop[chosen], loop[first]], axis=1))
+
+        alive[chosen] = False
+        after[first] = last
+        before[last] = first
+        left -= len(chosen)
+        changed = np.unique(np.r_[first, last])
+        tests = _corner_tests(points, alive, reflex, by_x, before, after, changed)
+        convex[changed], ear[changed], diagonal[changed] = tests
+        reflex[changed] = convex[changed] <= 0
+
+    first = int(np.flatnonzero(alive)[0])
+    triangles.append([[loop[after[first]], loop[first], loop[before[first]]]])
+    return np.concatenate(triangles)
+
+
+#Function fills holes of the mesh with triangles
+#Loops with more than max_verts vertices are skipped (e.g. border of an open surface)
+#Returns coordinates of new vertices (ear clipping adds none), new triangles
+#and number of filled holes
+def fill_holes(mesh, max_verts=None, ear_clipping_limit=EAR_CLIPPING_LIMIT):
+    loop_offsets, loop_verts = analysis.boundary_loops(mesh)
+    sizes = np.diff(loop_offsets)
+    selected = sizes >= 3
+    if max_verts is not None:
+        selected &= sizes <= max_verts
+
+    triangles = [np.zeros((0, 3), dtype=np.int64)]
+
+    #Small loops grouped by size, in batches of bounded memory
+    for size in np.unique(sizes[selected & (sizes <= ear_clipping_limit)]):
+        starts = loop_offsets[:-1][selected & (sizes == size)]
+        batch = max(1, FILL_BATCH // (size * size))
+        for first in range(0, len(starts), batch):
+            loops = loop_verts[starts[first:first + batch, None] + np.arange(size)[None, :]].astype(np.int64)
+            triangles.append(_ear_clipping(loops, mesh.verts[loops].astype(np.float64)))
+
+    #Large loops one by one
+    for i in np.flatnonzero(selected & (sizes > ear_clipping_limit)):
+        loop = loop_verts[loop_offsets[i]:loop_offsets[i + 1]].astype(np.int64)
+        triangles.append(_clip_loop(loop, mesh.verts[loop].astype(np.float64)))
+
+    new_verts = np.zeros((0, 3), dtype=np.float32)
+    return new_verts, np.concatenate(triangles).astype(np.int32), int(np.count_nonzero(selected))
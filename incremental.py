@@ -0,0 +1,197 @@
+import numpy as np
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import curvature
+from learn_computer_graphics import profiling
+from learn_computer_graphics.core import MeshArrays
+
+#Incremental analysis of a mesh whose vertices are moved, without bpy
+#Positions are compared with a snapshot, only the moved vertices and their neighbourhood
+#are analysed again: mean curvature of the one-ring (see curvature.py) from the faces around it,
+#replicated vertices near the moved ones and holes through them
+#Topology must not change, a new IncrementalAnalysis is made for changed topology
+#Mean curvature is relative to the diagonal of the bounding box, when moves change the diagonal
+#by more than RESCALE_PART of it, all values are scaled to the new diagonal
+
+#Moved vertices are kept out of the grid of replicated vertices until there are this many
+#of them (or this part of all vertices), then the grid is built again
+REBUILD_MOVED = 4096
+REBUILD_PART = 0.05
+
+#Part of the diagonal of the bounding box it can change before curvature is scaled to it again
+RESCALE_PART = 0.01
+
+#Cell offsets of a vertex and all its neighbour cells
+_NEIGHBOURS = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)],
+                       dtype=np.int64)
+
+
+#Function returns diagonal of the bounding box of given positions
+def _diagonal(co):
+    if len(co) == 0:
+        return 0.0
+    return float(np.linalg.norm(co.max(axis=0).astype(np.float64) - co.min(axis=0)))
+
+
+#Function builds CSR index of rows of items (e.g. loops of every vertex)
+#Returns starts (N + 1) and items sorted by their row
+def _index(rows, nr_rows):
+    order = np.argsort(rows, kind='stable')
+    starts = np.searchsorted(rows[order], np.arange(nr_rows + 1))
+    return starts, order
+
+
+#Function returns items of given rows of CSR index, concatenated
+def _gather(starts, items, rows):
+    counts = starts[rows + 1] - starts[rows]
+    first = np.repeat(starts[rows] - np.cumsum(counts) + counts, counts)
+    return items[first + np.arange(int(counts.sum()))]
+
+
+#Function gives every cell of the grid one integer key
+#Keys can collide for far cells, candidates are checked by distance anyway
+def _cell_keys(cells):
+    return (cells[:, 0] * 73856093) ^ (cells[:, 1] * 19349663) ^ (cells[:, 2] * 83492791)
+
+
+class IncrementalAnalysis:
+
+    def __init__(self, mesh, distance=analysis.MERGE_DISTANCE):
+        self.mesh = mesh
+        self.distance = distance
+        self.co = mesh.verts.astype(np.float32)
+
+        #Loops of every vertex
+        self._vert_loops = _index(mesh.face_verts, mesh.nr_verts)
+
+        #Mean curvature relative to the diagonal of the bounding box, like
+        #curvature.vertex_curvature(mesh, relative=True)
+        self.scale = _diagonal(self.co)
+        self.mean = self._curvature()
+
+        #Replicated vertices as pairs of vertices
+        i, j = analysis.duplicate_pairs(mesh.verts, distance)
+        self.pairs = np.stack([i, j], axis=1)
+        self._build_grid()
+
+        #Holes and holes of every vertex (a vertex can be on more holes)
+        self.holes = analysis.holes(mesh)
+        starts, order = _index(self.holes["loop_verts"], mesh.nr_verts)
+        self._vert_holes = starts, np.repeat(np.arange(len(self.holes["vertex_count"])), self.holes["vertex_count"])[order]
+
+    #Function sorts vertices by key of their grid cell, moved vertices are left out later
+    def _build_grid(self):
+        cells = np.floor(self.co.astype(np.float64) / max(self.distance, 1e-30)).astype(np.int64)
+        keys = _cell_keys(cells)
+        self._grid_order = np.argsort(keys, kind='stable')
+        self._grid_keys = keys[self._grid_order]
+        self._moved = np.zeros(0, dtype=np.int64)
+
+    #Function finds replicated vertices of given vertices
+    #Vertices not moved since the grid was built are found in the grid,
+    #moved vertices are compared among themselves
+    def _replicated_pairs(self, verts):
+        co = self.co.astype(np.float64)
+        cells = np.floor(co[verts] / max(self.distance, 1e-30)).astype(np.int64)
+        keys = _cell_keys((cells[:, None, :] + _NEIGHBOURS).reshape(-1, 3))
+        low = np.searchsorted(self._grid_keys, keys, side='left')
+        high = np.searchsorted(self._grid_keys, keys, side='right')
+        counts = high - low
+        query = np.repeat(np.repeat(verts, len(_NEIGHBOURS)), counts)
+        found = self._grid_order[np.repeat(low - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))]
+        keep = ~np.isin(found, self._moved)
+        query, found = query[keep], found[keep]
+
+        i, j = analysis.duplicate_pairs(self.co[self._moved], self.distance)
+        i, j = self._moved[i], self._moved[j]
+        query = np.concatenate([query, i, j])
+        found = np.concatenate([found, j, i])
+        keep = np.isin(query, verts) & (query != found)
+        query, found = query[keep], found[keep]
+        d = co[query] - co[found]
+        close = np.einsum('ij,ij->i', d, d) <= self.distance * self.distance
+        pairs = np.sort(np.stack([query[close], found[close]], axis=1), axis=1)
+        return np.unique(pairs, axis=0) if len(pairs) else pairs.reshape(-1, 2)
+
+    #Function returns relative mean curvature of all vertices at current positions
+    #Normals are area weighted also when the mesh was read with normals of Blender,
+    #so updates give the same values
+    def _curvature(self):
+        plain = MeshArrays(self.co, self.mesh.face_offsets, self.mesh.face_verts)
+        return curvature.vertex_curvature(plain)["mean"] * self.scale
+
+    #Function finds vertices moved since the last update and analyses their neighbourhood again
+    #Returns None when nothing moved, otherwise moved vertices, their one-ring (vertices with
+    #changed mean curvature) and whether all values were scaled to a new diagonal
+    def update(self, verts):
+        co = np.asarray(verts, dtype=np.float32).reshape(-1, 3)
+        if len(co) != self.mesh.nr_verts:
+            raise ValueError("Number of vertices changed, make a new analysis")
+        dirty = np.flatnonzero((co != self.co).any(axis=1))
+        if len(dirty) == 0:
+            return None
+        self.co[dirty] = co[dirty]
+        mesh = self.mesh
+
+        #Values of all vertices follow the diagonal when it changed enough
+        diagonal = _diagonal(self.co)
+        rescaled = abs(diagonal - self.scale) > RESCALE_PART * self.scale
+        if rescaled:
+            with profiling.stage("live rescale"):
+                if self.scale > 0:
+                    self.mean *= diagonal / self.scale
+                    self.scale = diagonal
+                else:
+                    self.scale = diagonal
+                    self.mean = self._curvature()
+
+        #Curvature of a vertex depends on faces around it, so faces around the one-ring
+        #of the moved vertices are analysed as a small mesh
+        with profiling.stage("live curvature"):
+            faces = np.unique(mesh.loop_faces[_gather(*self._vert_loops, dirty)])
+            ring = np.unique(mesh.face_verts[self._face_loops(faces)])
+            faces = np.unique(mesh.loop_faces[_gather(*self._vert_loops, ring)])
+            face_verts = mesh.face_verts[self._face_loops(faces)]
+            verts, local = np.unique(face_verts, return_inverse=True)
+            part = MeshArrays(self.co[verts], np.r_[0, np.cumsum(mesh.face_sizes[faces])], local)
+            mean = curvature.vertex_curvature(part)["mean"]
+            self.mean[ring] = mean[np.searchsorted(verts, ring)] * self.scale
+
+        #Pairs of replicated vertices with a moved vertex are found again, also for vertices
+        #paired with a moved vertex: pairs join clusters, not every close pair is kept
+        with profiling.stage("live replicated vertices"):
+            self._moved = np.union1d(self._moved, dirty)
+            if len(self._moved) > max(REBUILD_MOVED, REBUILD_PART * mesh.nr_verts):
+                self._build_grid()
+            touched = np.isin(self.pairs, dirty).any(axis=1)
+            lost = np.union1d(dirty, self.pairs[touched])
+            self.pairs = np.unique(np.concatenate([self.pairs[~touched], self._replicated_pairs(lost)]), axis=0)
+
+        #Holes through moved vertices are measured again
+        with profiling.stage("live holes"):
+            holes = np.unique(_gather(*self._vert_holes, dirty))
+            if len(holes):
+                offsets = self.holes["loop_offsets"]
+                counts = offsets[holes + 1] - offsets[holes]
+                loop_verts = _gather(offsets, self.holes["loop_verts"], holes)
+                stats = analysis.hole_stats(self.co, np.r_[0, np.cumsum(counts)].astype(np.int32), loop_verts)
+                for name in ("perimeter", "area", "centroid"):
+                    self.holes[name][holes] = stats[name]
+
+        profiling.count("vertices moved", len(dirty))
+        return {"verts": dirty, "ring": ring, "rescaled": rescaled}
+
+    #Function returns loops of given faces, face by face
+    def _face_loops(self, faces):
+        sizes = self.mesh.face_sizes[faces]
+        starts = self.mesh.face_offsets[faces]
+        return np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(int(sizes.sum()))
+
+    #Function describes current state: replicated vertices and holes
+    def summary(self):
+        perimeter = self.holes["perimeter"]
+        return {
+            "replicated_vertices": int(len(np.unique(self.pairs))),
+            "holes": int(len(perimeter)),
+            "max_perimeter": float(perimeter.max()) if len(perimeter) else 0.0,
+        }
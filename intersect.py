@@ -0,0 +1,162 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from learn_computer_graphics import parallel
+from learn_computer_graphics import profiling
+
+#Self-intersections of the mesh, without bpy
+#BVH of the mesh is overlapped with itself (see BVH.self_pairs), triangles of overlapping
+#leaves are tested exactly, every triangle edge against the other triangle
+#Triangles sharing a vertex (neighbours, triangles of one face) are not tested,
+#coplanar overlapping triangles are not reported
+
+#Node pairs of this level of the tree are split between chunks of work
+INTERSECT_SPLIT_LEVEL = 6
+
+#About this many triangles make one chunk of work
+INTERSECT_CHUNK = 32768
+
+
+#Function intersects segments p-q with triangles pairwise
+#Returns parameter along the segment (0 at p, 1 at q), nan when there is no intersection
+def segment_triangle(p, q, tri_co):
+    direction = q - p
+    e1 = tri_co[:, 1] - tri_co[:, 0]
+    e2 = tri_co[:, 2] - tri_co[:, 0]
+    pv = np.cross(direction, e2)
+    det = np.einsum('ij,ij->i', pv, e1)
+    #Parallel when the segment lies (almost) in the plane of the triangle, relative to their sizes
+    scale = np.linalg.norm(direction, axis=1) * np.linalg.norm(e1, axis=1) * np.linalg.norm(e2, axis=1)
+    parallel = np.abs(det) <= 1e-12 * scale
+    inv_det = 1.0 / np.where(parallel, 1.0, det)
+    s = p - tri_co[:, 0]
+    u = np.einsum('ij,ij->i', s, pv) * inv_det
+    qv = np.cross(s, e1)
+    v = np.einsum('ij,ij->i', direction, qv) * inv_det
+    t = np.einsum('ij,ij->i', e2, qv) * inv_det
+    hit = ~parallel & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= 1)
+    return np.where(hit, t, np.nan)
+
+
+#Function tests which triangles have corners of the other triangles on both sides of their plane
+#Pairs where a triangle lies on one side of the plane of the other cannot intersect
+def _straddling(tri_a, tri_b):
+    normal = np.cross(tri_a[:, 1] - tri_a[:, 0], tri_a[:, 2] - tri_a[:, 0])
+    side = np.einsum('ijk,ik->ij', tri_b - tri_a[:, :1], normal)
+    return (side.min(axis=1) <= 0) & (side.max(axis=1) >= 0)
+
+
+#Function intersects triangles pairwise
+#Returns mask of intersecting pairs and (K, 2, 3) intersection segments of them
+def triangle_intersections(tri_a, tri_b):
+    #Cheap rejection by planes first, edges are tested for the rest only
+    candidates = np.flatnonzero(_straddling(tri_a, tri_b) & _straddling(tri_b, tri_a))
+    intersect, segments = _edge_intersections(tri_a[candidates], tri_b[candidates])
+    mask = np.zeros(len(tri_a), dtype=bool)
+    mask[candidates[intersect]] = True
+    return mask, segments
+
+
+def _edge_intersections(tri_a, tri_b):
+    points = []
+    for source, target in ((tri_a, tri_b), (tri_b, tri_a)):
+        for corner in range(3):
+            p = source[:, corner]
+            q = source[:, (corner + 1) % 3]
+            t = segment_triangle(p, q, target)
+            points.append(p + t[:, None] * (q - p))
+    points = np.stack(points, axis=1)
+    hit = ~np.isnan(points[:, :, 0])
+    intersect = hit.any(axis=1)
+
+    #Ends of the segment are the extreme hits along the line of both planes
+    points, hit = points[intersect], hit[intersect]
+    normal_a = np.cross(tri_a[intersect, 1] - tri_a[intersect, 0], tri_a[intersect, 2] - tri_a[intersect, 0])
+    normal_b = np.cross(tri_b[intersect, 1] - tri_b[intersect, 0], tri_b[intersect, 2] - tri_b[intersect, 0])
+    along = np.einsum('ijk,ik->ij', np.where(hit[:, :, None], points, 0.0), np.cross(normal_a, normal_b))
+    start = np.argmin(np.where(hit, along, np.inf), axis=1)
+    end = np.argmax(np.where(hit, along, -np.inf), axis=1)
+    rows = np.arange(len(points))
+    return intersect, np.stack([points[rows, start], points[rows, end]], axis=1)
+
+
+#Function tests triangles of overlapping leaves starting from given node pairs
+#Returns pairs of intersecting triangles (positions in the tree) and their segments
+def _intersect_pairs(tree, tri_verts, depth, node_pairs):
+    found = [np.zeros((0, 2), dtype=np.int64)]
+    segments = [np.zeros((0, 2, 3))]
+    tested = 0
+    for leaf_pairs in tree.self_pairs(depth, node_pairs):
+        a, b = tree.leaf_triangle_pairs(leaf_pairs)
+        #Triangles do not share a vertex
+        verts_a = tri_verts[a]
+        verts_b = tri_verts[b]
+        shared = np.zeros(len(a), dtype=bool)
+        for i in range(3):
+            for j in range(3):
+                shared |= verts_a[:, i] == verts_b[:, j]
+        a, b = a[~shared], b[~shared]
+        tested += len(a)
+        intersect, segment = triangle_intersections(tree.tri_co[a], tree.tri_co[b])
+        found.append(np.stack([a[intersect], b[intersect]], axis=1))
+        segments.append(segment)
+    return np.concatenate(found), np.concatenate(segments), tested
+
+
+#Tree of the mesh in worker process, it is sent once to every worker
+_worker_tree = None
+
+
+def _start_worker(tree, tri_verts):
+    global _worker_tree
+    _worker_tree = tree, tri_verts
+
+
+def _intersect_chunk(arguments):
+    return _intersect_pairs(*(_worker_tree + arguments))
+
+
+#Function finds self-intersections of the mesh
+#Node pairs of a level of the tree are split into chunks, with workers > 1
+#the chunks are tested in worker processes
+#progress(done_part) is called after every chunk
+#Returns intersecting faces, pairs of faces and (K, 2, 3) intersection segments
+def self_intersections(mesh, workers=1, chunks=64, progress=None):
+    tree = mesh.bvh
+    tri_verts = mesh.triangles[tree.order]
+    depth = min(INTERSECT_SPLIT_LEVEL, len(tree.levels) - 1)
+    node_pairs = np.concatenate(list(tree.self_pairs(until=depth)) or [np.zeros((0, 2), dtype=np.int64)])
+    nr_parts = min(max(chunks, workers) if workers > 1 else chunks, tree.nr_triangles // INTERSECT_CHUNK + 1)
+    parts = [part for part in np.array_split(node_pairs, max(min(nr_parts, len(node_pairs)), 1)) if len(part)]
+
+    results = []
+    if workers > 1 and len(parts) > 1:
+        #Worker processes are started fresh (spawn), like in parallel.py
+        context = multiprocessing.get_context('spawn')
+        executable = parallel._python_executable()
+        if executable:
+            context.set_executable(executable)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_start_worker,
+                                 initargs=(tree, tri_verts)) as pool:
+            for result in pool.map(_intersect_chunk, [(depth, part) for part in parts]):
+                results.append(result)
+                if progress is not None:
+                    progress(len(results) / len(parts))
+    else:
+        for part in parts:
+            results.append(_intersect_pairs(tree, tri_verts, depth, part))
+            if progress is not None:
+                progress(len(results) / len(parts))
+    profiling.count("triangle pairs tested", sum(result[2] for result in results))
+
+    pairs = np.concatenate([result[0] for result in results] or [np.zeros((0, 2), dtype=np.int64)])
+    segments = np.concatenate([result[1] for result in results] or [np.zeros((0, 2, 3))])
+    face_pairs = mesh.tri_faces[tree.order[pairs]].reshape(-1, 2)
+    face_pairs.sort(axis=1)
+    return {
+        "faces": np.unique(face_pairs).astype(np.int32),
+        "pairs": face_pairs.astype(np.int32),
+        "segments": segments,
+    }
@@ -0,0 +1,60 @@
+import threading
+
+#Background part of long analyses, without bpy (see modal.py)
+#Analysis is split into compute(progress), which works only with arrays, and finish(result),
+#which writes to Blender; compute runs in a background thread, finish in the caller's thread
+#only after compute ended without being cancelled, so a cancelled analysis changes nothing
+
+
+class Cancelled(Exception):
+    pass
+
+
+class BackgroundJob:
+
+    def __init__(self, compute, finish):
+        self._compute = compute
+        self._finish = finish
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    #Runs in background thread, progress callback stops the computation when cancelled
+    def _run(self):
+        try:
+            self.result = self._compute(self._report_progress)
+        except Cancelled:
+            pass
+        except Exception as error:
+            self.error = error
+
+    def _report_progress(self, done):
+        if self._cancel.is_set():
+            raise Cancelled
+        self.progress = done
+
+    def wait(self):
+        self._thread.join()
+
+    #Function stops the computation after its current chunk, its result is dropped
+    def cancel(self):
+        self._cancel.set()
+        self.wait()
+        self.result = None
+
+    #Function writes the result of the finished computation
+    def finish(self):
+        if self.running or self._cancel.is_set():
+            raise RuntimeError("analysis did not finish")
+        if self.error is not None:
+            raise self.error
+        return self._finish(self.result)
@@ -0,0 +1,175 @@
+import bpy
+import numpy as np
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import colormaps
+from learn_computer_graphics import incremental
+from learn_computer_graphics import mesh
+from learn_computer_graphics import profiling
+from learn_computer_graphics import quantiles
+from learn_computer_graphics.core import MeshArrays
+
+#Live analysis while the mesh is edited or sculpted (opt-in from the panel)
+#depsgraph_update_post handler reads positions of the live object, moved vertices and
+#their one-ring are analysed again (see incremental.py) and only colours of changed vertices
+#are written to the colour attribute
+#Colour range is fixed when live analysis starts, so colours of vertices painted at different
+#times can be compared; curvature is relative to the size of the mesh, when the size changes
+#(see incremental.RESCALE_PART) a range taken from percentiles is computed again and all
+#vertices are painted
+#Changed topology (added or removed elements) starts the analysis again for the whole mesh
+#Edit mode keeps its own copy of the mesh, edits made there are analysed when it is left
+
+#Up to this part of vertices colours are written vertex by vertex, above it with one foreach_set
+LIVE_BULK_PART = 0.02
+
+#Analysis of every live object, by object name
+_states = {}
+
+#Colour settings (see mesh.color_settings) of every live object, by object name
+_colors = {}
+
+#Colour settings of the panel every live object was started with, by object name
+_panel_colors = {}
+
+#Objects started in edit mode, they are painted when edit mode is left
+_unpainted = set()
+
+
+#Function reads vertex positions of the object
+def _positions(obj):
+    co = np.empty(len(obj.data.vertices) * 3, dtype=np.float32)
+    obj.data.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3)
+
+
+#Function writes colours of given vertices, all vertices when verts is None
+#Vertex by vertex writing needs the point-domain colour attribute, the old loop layer
+#is always written whole
+def _write_colors(obj, state, verts=None):
+    me = obj.data
+    settings = _colors[obj.name]
+    attribute = me.attributes.get(mesh.CURVATURE_COLOR_ATTRIBUTE) if hasattr(me, "attributes") else None
+    if verts is None or attribute is None or len(verts) > LIVE_BULK_PART * len(me.vertices):
+        colors = colormaps.colorize(state.mean, **settings)
+        mesh.write_vertex_colors(me, colors, state.mean, state.mesh.face_verts)
+    else:
+        values = me.attributes[mesh.CURVATURE_ATTRIBUTE].data
+        colors = colormaps.colorize(state.mean[verts], **settings)
+        for vert, color, value in zip(verts.tolist(), colors.tolist(), state.mean[verts].tolist()):
+            attribute.data[vert].color = color
+            values[vert].value = value
+        profiling.count("vertices colored", len(verts))
+    me.update()
+
+
+#Function completes colour settings of the panel
+#Colour range and bins not set on the panel are percentiles of the current curvature
+def _color_settings(state, colors):
+    colors = dict(colors)
+    stats = quantiles.summary(state.mean)
+    if colors.get("limits") is None:
+        colors["limits"] = colormaps.stats_range(stats, colors.get("scale", 'CONTINUOUS'))
+    if colors.get("scale") == 'BINS' and len(colors.get("edges", ())) == 0:
+        colors["edges"] = colormaps.stats_bins(stats)
+    return colors
+
+
+#Function starts live analysis of the object
+#Colour range and bins are the ones set on the panel, or percentiles of curvature at the start
+def start(obj, distance=analysis.MERGE_DISTANCE, colors=None):
+    with profiling.stage("live analysis"):
+        if obj.mode == 'EDIT':
+            obj.update_from_editmode()
+        state = incremental.IncrementalAnalysis(MeshArrays.from_blender(obj.data), distance)
+        _states[obj.name] = state
+        if colors is not None:
+            _panel_colors[obj.name] = dict(colors)
+        _colors[obj.name] = _color_settings(state, colors if colors is not None else _colors.get(obj.name, {}))
+        if obj.mode == 'EDIT':
+            _unpainted.add(obj.name)
+        else:
+            _write_colors(obj, state)
+    if on_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update)
+    return state
+
+
+#Function stops live analysis of all objects
+def stop():
+    _states.clear()
+    _colors.clear()
+    _panel_colors.clear()
+    _unpainted.clear()
+    if on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update)
+
+
+#Function returns live analysis of the object, None when it is not live
+def state_of(obj):
+    return _states.get(obj.name) if obj is not None else None
+
+
+#Function analyses moved vertices of one live object
+def _update(obj):
+    state = _states[obj.name]
+    me = obj.data
+    if obj.mode == 'EDIT':
+        return
+    if (len(me.vertices), len(me.loops), len(me.polygons)) != \
+            (state.mesh.nr_verts, state.mesh.nr_loops, state.mesh.nr_faces):
+        start(obj, state.distance)
+        return
+    changes = state.update(_positions(obj))
+    rescaled = changes is not None and changes["rescaled"]
+    if rescaled:
+        #Values of all vertices changed with the size of the mesh
+        _colors[obj.name] = _color_settings(state, _panel_colors.get(obj.name, {}))
+    if rescaled or obj.name in _unpainted:
+        _unpainted.discard(obj.name)
+        _write_colors(obj, state)
+    elif changes is not None:
+        _write_colors(obj, state, changes["ring"])
+
+
+#Handler of depsgraph updates, Blender 2.80 passes only the scene
+def on_depsgraph_update(scene, depsgraph=None):
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    updated = set()
+    for update in depsgraph.updates:
+        if not update.is_updated_geometry:
+            continue
+        data = update.id.original
+        for name in list(_states):
+            obj = bpy.data.objects.get(name)
+            if obj is None or obj.type != 'MESH':
+                del _states[name]
+                _colors.pop(name, None)
+                _panel_colors.pop(name, None)
+            elif name not in updated and (data == obj or data == obj.data):
+                updated.add(name)
+                _update(obj)
+
+
+#Live mode is switched from the panel for the active object
+def _update_live(self, context):
+    obj = context.active_object
+    if self.marta_live and obj is not None and obj.type == 'MESH':
+        start(obj, self.marta_live_distance, mesh.color_settings(context))
+    else:
+        stop()
+
+
+def register():
+    bpy.types.WindowManager.marta_live = bpy.props.BoolProperty(
+        name="Live analysis", description="Analyse moved vertices of the active object after every edit",
+        default=False, update=_update_live)
+    bpy.types.WindowManager.marta_live_distance = bpy.props.FloatProperty(
+        name="Merge distance", default=analysis.MERGE_DISTANCE, min=0.0, precision=6)
+
+
+def unregister():
+    stop()
+    del bpy.types.WindowManager.marta_live
+    del bpy.types.WindowManager.marta_live_distance
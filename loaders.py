@@ -0,0 +1,323 @@
+import os
+import struct
+import numpy as np
+
+from learn_computer_graphics.core import MeshArrays
+
+#Loaders fill core.MeshArrays from mesh files without Blender
+
+SUPPORTED_EXTENSIONS = ('.obj', '.ply', '.stl')
+
+
+#Function loads mesh file, format is chosen by file extension
+def load_mesh(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.obj':
+        return load_obj(path)
+    if extension == '.ply':
+        return load_ply(path)
+    if extension == '.stl':
+        return load_stl(path)
+    raise ValueError("Unsupported mesh file: " + path)
+
+
+####################################################
+#OBJ
+
+#Function reads vertices, faces and lines of Wavefront OBJ file
+#Segments of lines become loose edges
+#Texture coordinates, normals, groups and materials are skipped
+def load_obj(path):
+    verts = []
+    faces = []
+    lines = []
+    with open(path, 'r', errors='replace') as file:
+        for line in file:
+            if line.startswith('v '):
+                verts.append(line[2:].split()[:3])
+            elif line.startswith('f '):
+                #Face corner can be written as v, v/vt, v//vn or v/vt/vn
+                #Negative indices count from the last read vertex
+                face = []
+                for corner in line[2:].split():
+                    index = int(corner.split('/', 1)[0])
+                    face.append(index - 1 if index > 0 else len(verts) + index)
+                faces.append(face)
+            elif line.startswith('l '):
+                points = []
+                for point in line[2:].split():
+                    index = int(point.split('/', 1)[0])
+                    points.append(index - 1 if index > 0 else len(verts) + index)
+                lines.extend(zip(points[:-1], points[1:]))
+    verts = np.array(verts, dtype=np.float32).reshape(-1, 3)
+    return MeshArrays.from_faces(verts, faces, np.array(lines, dtype=np.int32).reshape(-1, 2))
+
+
+####################################################
+#PLY
+
+_PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+
+#Function reads PLY header
+#Returns format and list of elements (name, count, properties)
+def _read_ply_header(file):
+    if file.readline().strip() != b'ply':
+        raise ValueError("Not a PLY file: " + file.name)
+    ply_format = None
+    elements = []
+    while True:
+        line = file.readline()
+        if not line:
+            raise ValueError("PLY header is not finished: " + file.name)
+        words = line.decode('ascii', 'replace').split()
+        if not words:
+            continue
+        if words[0] == 'format':
+            ply_format = words[1]
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property':
+            #List property is (name, count type, item type)
+            if words[1] == 'list':
+                elements[-1][2].append((words[4], _PLY_TYPES[words[2]], _PLY_TYPES[words[3]]))
+            else:
+                elements[-1][2].append((words[2], _PLY_TYPES[words[1]], None))
+        elif words[0] == 'end_header':
+            return ply_format, elements
+
+
+#Function reads list property of binary PLY
+#Faces usually have the same number of vertices, then all of them are read at once
+def _read_ply_lists(data, offset, count, properties, byte_order):
+    if len(properties) != 1 or properties[0][2] is None:
+        raise ValueError("Only elements with a single list property are supported")
+    count_type = np.dtype(byte_order + properties[0][1])
+    item_type = np.dtype(byte_order + properties[0][2])
+    if count == 0:
+        return [], offset
+
+    first = int(np.frombuffer(data, count_type, 1, offset)[0])
+    row = np.dtype([('n', count_type), ('items', item_type, (first,))])
+    if offset + row.itemsize * count <= len(data):
+        rows = np.frombuffer(data, row, count, offset)
+        if np.all(rows['n'] == first):
+            return rows['items'], offset + row.itemsize * count
+
+    #Mixed face sizes
+    faces = []
+    for _ in range(count):
+        n = int(np.frombuffer(data, count_type, 1, offset)[0])
+        offset += count_type.itemsize
+        faces.append(np.frombuffer(data, item_type, n, offset))
+        offset += item_type.itemsize * n
+    return faces, offset
+
+
+#Function reads vertices and faces of PLY file (ascii or binary)
+def load_ply(path):
+    with open(path, 'rb') as file:
+        ply_format, elements = _read_ply_header(file)
+        data = file.read()
+
+    verts = np.zeros((0, 3), dtype=np.float32)
+    faces = []
+    if ply_format == 'ascii':
+        lines = iter(data.decode('ascii', 'replace').splitlines())
+        for name, count, properties in elements:
+            rows = [next(lines).split() for _ in range(count)]
+            if name == 'vertex':
+                names = [p[0] for p in properties]
+                columns = [names.index(axis) for axis in ('x', 'y', 'z')]
+                verts = np.array([[row[c] for c in columns] for row in rows], dtype=np.float32).reshape(-1, 3)
+            elif name == 'face':
+                faces = [[int(v) for v in row[1:1 + int(row[0])]] for row in rows]
+    elif ply_format in ('binary_little_endian', 'binary_big_endian'):
+        byte_order = '<' if ply_format == 'binary_little_endian' else '>'
+        offset = 0
+        for name, count, properties in elements:
+            if any(p[2] is not None for p in properties):
+                lists, offset = _read_ply_lists(data, offset, count, properties, byte_order)
+                if name == 'face':
+                    faces = lists
+            else:
+                row = np.dtype([(p[0], byte_order + p[1]) for p in properties])
+                rows = np.frombuffer(data, row, count, offset)
+                offset += row.itemsize * count
+                if name == 'vertex':
+                    verts = np.stack([rows['x'], rows['y'], rows['z']], axis=1).astype(np.float32)
+    else:
+        raise ValueError("Unknown PLY format: " + str(ply_format))
+
+    if isinstance(faces, np.ndarray):
+        #All faces have the same size
+        sizes = np.full(len(faces), faces.shape[1], dtype=np.int32)
+        offsets = np.zeros(len(faces) + 1, dtype=np.int32)
+        np.cumsum(sizes, out=offsets[1:])
+        return MeshArrays(verts, offsets, faces.reshape(-1))
+    return MeshArrays.from_faces(verts, faces)
+
+
+####################################################
+#STL
+
+#Function reads triangles of STL file (ascii or binary)
+#STL stores separate corners of every triangle, identical corners are joined into one vertex
+def load_stl(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    nr_triangles = struct.unpack('<I', data[80:84])[0] if len(data) >= 84 else -1
+    if len(data) == 84 + 50 * nr_triangles:
+        record = np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attribute', '<u2')])
+        corners = np.frombuffer(data, record, nr_triangles, 84)['corners'].reshape(-1, 3)
+    elif data.lstrip().startswith(b'solid'):
+        words = data.split()
+        corners = [words[i + 1:i + 4] for i, word in enumerate(words) if word == b'vertex']
+        corners = np.array(corners, dtype=np.float32).reshape(-1, 3)
+    else:
+        raise ValueError("Not a STL file: " + path)
+
+    verts, face_verts = np.unique(corners, axis=0, return_inverse=True)
+    offsets = np.arange(0, len(corners) + 1, 3, dtype=np.int32)
+    return MeshArrays(verts, offsets, face_verts.reshape(-1))
+
+
+####################################################
+#Streaming
+#Files larger than memory are read in chunks of about chunk vertices or faces
+#Readers yield ("verts", (n, 3) float32) and ("faces", sizes, face_verts) parts in file order,
+#face_verts are global vertex indices, progress(done_part) gets the read part of the file
+
+STREAM_CHUNK = 1 << 20
+
+STREAM_EXTENSIONS = ('.obj', '.ply')
+
+
+#Function streams mesh file, format is chosen by file extension
+def stream_mesh(path, chunk=STREAM_CHUNK, progress=None):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.obj':
+        return stream_obj(path, chunk, progress)
+    if extension == '.ply':
+        return stream_ply(path, chunk, progress)
+    raise ValueError("Streaming is not supported for: " + path)
+
+
+def _faces_part(faces):
+    sizes = np.fromiter((len(f) for f in faces), dtype=np.int32, count=len(faces))
+    face_verts = np.fromiter((v for f in faces for v in f), dtype=np.int32, count=int(sizes.sum()))
+    return "faces", sizes, face_verts
+
+
+#Function streams vertices and faces of Wavefront OBJ file, like load_obj
+def stream_obj(path, chunk=STREAM_CHUNK, progress=None):
+    size = max(os.path.getsize(path), 1)
+    nr_verts = 0
+    verts = []
+    faces = []
+    with open(path, 'rb') as file:
+        for line in file:
+            if line.startswith(b'v '):
+                verts.append(line[2:].split()[:3])
+                if len(verts) == chunk:
+                    yield "verts", np.array(verts, dtype=np.float32).reshape(-1, 3)
+                    nr_verts += len(verts)
+                    verts = []
+            elif line.startswith(b'f '):
+                #Negative indices count from the last read vertex
+                face = []
+                for corner in line[2:].split():
+                    index = int(corner.split(b'/', 1)[0])
+                    face.append(index - 1 if index > 0 else nr_verts + len(verts) + index)
+                faces.append(face)
+                if len(faces) == chunk:
+                    yield _faces_part(faces)
+                    faces = []
+                    if progress is not None:
+                        progress(file.tell() / size)
+        if verts:
+            yield "verts", np.array(verts, dtype=np.float32).reshape(-1, 3)
+        if faces:
+            yield _faces_part(faces)
+    if progress is not None:
+        progress(1.0)
+
+
+#Function streams list rows of binary PLY element, rows of the same size are read at once
+def _stream_ply_lists(file, count, properties, byte_order, chunk):
+    if len(properties) != 1 or properties[0][2] is None:
+        raise ValueError("Only elements with a single list property are supported")
+    count_type = np.dtype(byte_order + properties[0][1])
+    item_type = np.dtype(byte_order + properties[0][2])
+    left = count
+    while left:
+        first = int(np.frombuffer(file.peek(count_type.itemsize)[:count_type.itemsize], count_type)[0])
+        row = np.dtype([('n', count_type), ('items', item_type, (first,))])
+        n = min(left, chunk)
+        start = file.tell()
+        data = file.read(row.itemsize * n)
+        rows = np.frombuffer(data, row, len(data) // row.itemsize)
+        if len(rows) == n and np.all(rows['n'] == first):
+            yield np.full(n, first, dtype=np.int32), rows['items'].reshape(-1).astype(np.int32)
+            left -= n
+            continue
+
+        #Mixed face sizes, rows of the chunk are read one by one
+        file.seek(start)
+        sizes = np.empty(n, dtype=np.int32)
+        items = []
+        for i in range(n):
+            sizes[i] = int(np.frombuffer(file.read(count_type.itemsize), count_type)[0])
+            items.append(np.frombuffer(file.read(item_type.itemsize * int(sizes[i])), item_type))
+        yield sizes, np.concatenate(items).astype(np.int32)
+        left -= n
+
+
+#Function streams vertices and faces of PLY file (ascii or binary), like load_ply
+def stream_ply(path, chunk=STREAM_CHUNK, progress=None):
+    size = max(os.path.getsize(path), 1)
+    with open(path, 'rb') as file:
+        ply_format, elements = _read_ply_header(file)
+        for name, count, properties in elements:
+            if ply_format == 'ascii':
+                columns = [p[0] for p in properties]
+                left = count
+                while left:
+                    rows = [file.readline().split() for _ in range(min(left, chunk))]
+                    left -= len(rows)
+                    if name == 'vertex':
+                        xyz = [columns.index(axis) for axis in ('x', 'y', 'z')]
+                        yield "verts", np.array([[row[c] for c in xyz] for row in rows], dtype=np.float32).reshape(-1, 3)
+                    elif name == 'face':
+                        yield _faces_part([[int(v) for v in row[1:1 + int(row[0])]] for row in rows])
+                    if progress is not None:
+                        progress(file.tell() / size)
+            elif ply_format in ('binary_little_endian', 'binary_big_endian'):
+                byte_order = '<' if ply_format == 'binary_little_endian' else '>'
+                if any(p[2] is not None for p in properties):
+                    for sizes, face_verts in _stream_ply_lists(file, count, properties, byte_order, chunk):
+                        if name == 'face':
+                            yield "faces", sizes, face_verts
+                        if progress is not None:
+                            progress(file.tell() / size)
+                    continue
+                row = np.dtype([(p[0], byte_order + p[1]) for p in properties])
+                left = count
+                while left:
+                    n = min(left, chunk)
+                    rows = np.frombuffer(file.read(row.itemsize * n), row, n)
+                    left -= n
+                    if name == 'vertex':
+                        yield "verts", np.stack([rows['x'], rows['y'], rows['z']], axis=1).astype(np.float32)
+                    if progress is not None:
+                        progress(file.tell() / size)
+            else:
+                raise ValueError("Unknown PLY format: " + str(ply_format))
+    if progress is not None:
+        progress(1.0)
@@ -1,192 +1,716 @@
-import bpy
-import bmesh
-from mathutils import Vector
-
-#Function selects gaps in mesh
-def gaps_on(context):
-    #If active mode is not edit mode, switch to edit mode
-    if bpy.context.active_object.mode != 'EDIT':
-        bpy.ops.object.editmode_toggle()
-    
-    #Switch to vertex selection mode
-    bpy.ops.mesh.select_mode(type='VERT')
-    
-    #Select holes in mesh
-    bpy.ops.mesh.select_non_manifold()
-
-
-#Function removes gaps in mesh 
-def gaps_remove(context):
-    #If active mode is not edit mode, switch to edit mode
-    if bpy.context.active_object.mode != 'EDIT':
-        bpy.ops.object.editmode_toggle()
-    
-    #Switch to vertex selection mode
-    bpy.ops.mesh.select_mode(type='VERT')
-    
-    #Select holes in mesh
-    bpy.ops.mesh.select_non_manifold()
-    
-    #Add faces where holes are
-    bpy.ops.mesh.edge_face_add()
-
-
-#Function selects additional interior faces
-def extra_faces_on(mesh_data, self, context):
-    #Deselect everything
-    bpy.ops.mesh.select_all(action='DESELECT')
-    
-    #Get the active mesh
-    obj = bpy.context.edit_object
-    mesh_data = obj.data
-
-    bpy.ops.mesh.select_mode(type='FACE')
-    camera_origin = Vector( ( 0, 0, 10 ) )
-    
-     # First do the built in selection
-    bpy.ops.mesh.select_interior_faces()
-
-    # Keep all indices in this selection
-    indices = []
-    
-    #If we are in object mode switch it to edit mode
-    if bpy.context.active_object.mode != 'EDIT':
-        bpy.ops.object.editmode_toggle()
-    
-    #Get a bmesh representation for our mesh data
-    bm = bmesh.from_edit_mesh( mesh_data )
-    bm.faces.active = None
-    
-    #Add counter to an iterable and return the enumerate object
-    for index, face in enumerate( bm.faces ):
-        if face.select:
-            indices.append( ( index, face.calc_center_median_weighted() ) )
-
-    # Deselect everything
-    bpy.ops.mesh.select_all(action='DESELECT')
-
-
-    # Switch to object mode to do scene raycasting
-    bpy.ops.object.mode_set( mode = 'OBJECT' )
-    outside = []
-    view_layer = bpy.data.scenes["Scene"].view_layers["View Layer"]
-    
-    for index_data in indices:
-        index = index_data[ 0 ]
-        center = index_data[ 1 ]
-        direction = center - camera_origin
-        direction.normalize()
-
-        # Cast a ray from the "camera" position to the face we think is interior
-        result, location, normal, face_index, object, matrix = bpy.context.scene.ray_cast( view_layer, camera_origin, direction )
-
-        if face_index == index:
-            outside.append( face_index )
-
-    # Build a list of interior faces that is compatible with built-it selection
-    invisible_interior_faces = [ data[ 0 ] for data in indices if data[ 0 ] not in outside ]
-    
-    #Show result in the system console
-    print( 'Selected ',len( invisible_interior_faces ),' interior faces' )
-    
-    #Show the result on the screen
-    self.report({'INFO'}, "Selected " + str(len( invisible_interior_faces )) + " interior face(s).")
-
-    # Select the faces
-    if len( invisible_interior_faces ) > 0:
-
-        for index in invisible_interior_faces:
-            mesh_data.polygons[ index ].select = True
-            
-    #Set edit mode to show the results on the screen
-    bpy.ops.object.mode_set( mode = 'EDIT' )
-    bmesh.update_edit_mesh(mesh_data, True)
-
-    
-#Function removes additional interior faces  
-def extra_faces_remove(mesh_data, self, context):
-    
-    #Deselect everything
-    bpy.ops.mesh.select_all(action='DESELECT')
-    
-    
-     # Get the active mesh
-    obj = bpy.context.edit_object
-    mesh_data = obj.data
-
-
-    # Get a BMesh representation
-    bm = bmesh.from_edit_mesh(mesh_data)
-    bm.faces.active = None
-
-    
-    #Count faces before selection
-    faces_before = len(bm.faces)
-    face_after = len(bm.faces)
-    
-    #Select interior faces
-    extra_faces_on(mesh_data, self, context)
-
-    
-    # Delete faces if they are selected
-    if len(context.selected_objects) > 0:
-        bpy.ops.mesh.delete( type = 'FACE' )
-        
-     # Get the active mesh
-    obj = bpy.context.edit_object
-    mesh_data = obj.data
-
-
-    # Get a BMesh representation
-    bm = bmesh.from_edit_mesh(mesh_data)
-    bm.faces.active = None
-    
-    #Count faces after removal
-    faces_after = len(bm.faces)
-    faces_removed = faces_before - faces_after
-    
-    #Show info about removed faces    
-    self.report({'INFO'}, "Removed " + str(faces_removed) + " interior face(s).")
-    bmesh.update_edit_mesh(mesh_data, True)
-    
-
-#Function removes vertices that are replicated 
-def merge_verts(self, context):
-    #If active mode is not edit mode, switch to edit mode
-    if bpy.context.active_object.mode != 'EDIT':
-        bpy.ops.object.editmode_toggle()
-        
-    #Select everything
-    bpy.ops.mesh.select_all(action='SELECT')
-    
-    # Get the active mesh
-    obj = bpy.context.edit_object
-    me = obj.data
-
-
-    # Get a BMesh representation
-    bm = bmesh.from_edit_mesh(me)
-    bm.faces.active = None
-
-    #Count vertices before removal
-    nr_before = len(bm.verts)
-    
-    #Remove replicated vertices
-    bpy.ops.mesh.remove_doubles()
-    
-    #Count vertices after removal
-    nr_after = len(bm.verts)
-
-    #Count how many vertices were removed
-    amount_removed = nr_before - nr_after
-    
-    #Show info on the screen
-    self.report({'INFO'}, "Removed " + str(amount_removed) + " additional vertice(s).")
-    
-    # Show the updates in the viewport
-    # and recalculate n-gon tessellation.
-    bmesh.update_edit_mesh(me, True)
-    
-    return {"FINISHED"}
-
-
+import bpy
+import bmesh
+import numpy as np
+from learn_computer_graphics import analysis
+from learn_computer_graphics import cache
+from learn_computer_graphics import colormaps
+from learn_computer_graphics import fill
+from learn_computer_graphics import intersect
+from learn_computer_graphics import parallel
+from learn_computer_graphics import profiling
+from learn_computer_graphics import quantiles
+from learn_computer_graphics import winding
+from learn_computer_graphics.core import MeshArrays
+
+#Functions below are thin adapters
+#Mesh is read into arrays, analysed by analysis.py and results are written back to Blender
+
+
+#Function reads mesh of the object into arrays
+#Changes made in edit mode are written to mesh data first
+def object_arrays(obj):
+    with profiling.stage("read mesh"):
+        if obj.mode == 'EDIT':
+            obj.update_from_editmode()
+        return MeshArrays.from_blender(obj.data)
+
+
+#Names of attributes with curvature of every vertex and its colour
+CURVATURE_ATTRIBUTE = "curvature"
+CURVATURE_COLOR_ATTRIBUTE = "curvature_color"
+
+
+#Function returns colouring settings of the panel as arguments of colormaps.colorize
+#Range and bins not set on the panel are taken from stats of the coloured values when given
+def color_settings(context, stats=None):
+    scene = context.scene
+    scale = getattr(scene, "marta_color_scale", 'DIVERGING')
+    limit = getattr(scene, "marta_color_limit", 0.0)
+    settings = {
+        "scale": scale,
+        "colormap": getattr(scene, "marta_colormap", 'COOLWARM'),
+        "limits": (-limit, limit) if limit > 0 else None,
+        "edges": colormaps.parse_bins(getattr(scene, "marta_color_bins", "")) if scale == 'BINS' else (),
+    }
+    if stats is not None and stats["count"]:
+        if settings["limits"] is None:
+            settings["limits"] = colormaps.stats_range(stats, scale)
+        if scale == 'BINS' and len(settings["edges"]) == 0:
+            settings["edges"] = colormaps.stats_bins(stats)
+    return settings
+
+
+#Function writes float attribute of points in one foreach_set, the attribute is made when missing
+def _point_attribute(me, name, data_type, values):
+    attribute = me.attributes.get(name)
+    if attribute is not None and (attribute.data_type != data_type or attribute.domain != 'POINT'):
+        me.attributes.remove(attribute)
+        attribute = None
+    if attribute is None:
+        attribute = me.attributes.new(name, data_type, 'POINT')
+    attribute.data.foreach_set("color" if data_type == 'FLOAT_COLOR' else "value", values.ravel())
+    return attribute
+
+
+#Function writes colour of every vertex (and optionally its value) in one bulk write
+#Colours go to point-domain colour attribute shown in vertex paint and by the Attribute node,
+#values to a float attribute; Blender before 2.93 has no such attributes,
+#there colours are spread to loops of the legacy vertex colour layer
+def write_vertex_colors(me, colors, values=None, face_verts=None):
+    colors = np.ascontiguousarray(colors, dtype=np.float32)
+    if not hasattr(me, "attributes") or not hasattr(bpy.types, "FloatColorAttribute"):
+        if face_verts is None:
+            face_verts = np.empty(len(me.loops), dtype=np.int32)
+            me.loops.foreach_get("vertex_index", face_verts)
+        layer = me.vertex_colors.active if me.vertex_colors else me.vertex_colors.new()
+        layer.data.foreach_set("color", colors[face_verts].ravel())
+        profiling.count("loops colored", len(face_verts))
+        return
+
+    attribute = _point_attribute(me, CURVATURE_COLOR_ATTRIBUTE, 'FLOAT_COLOR', colors)
+    if values is not None:
+        _point_attribute(me, CURVATURE_ATTRIBUTE, 'FLOAT', np.ascontiguousarray(values, dtype=np.float32))
+    #Colour attributes can be chosen for display since Blender 3.2
+    color_attributes = getattr(me, "color_attributes", None)
+    if color_attributes is not None:
+        color_attributes.active_color = attribute
+    profiling.count("vertices colored", len(colors))
+
+
+#Function returns cache of analysis results
+#Directory set on the panel keeps results also on disk
+def results(context):
+    directory = getattr(context.scene, "marta_cache_directory", "")
+    cache.RESULTS.directory = bpy.path.abspath(directory) if directory else None
+    return cache.RESULTS
+
+
+#Analysis session of one object
+#Mesh is acquired once in array form, stages (merge, holes, interior faces, curvature)
+#work on the arrays and selection and colors are written back once in commit
+#Edit mode is left at most once and the final mode is set once, so the mesh is not
+#copied between edit and object representation by every stage
+class MeshSession:
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.mesh = object_arrays(obj)
+        self._vert_select = None
+        self._face_select = None
+        self._edge_select = None
+        self._vert_colors = None
+        self._vert_values = None
+
+    #Mesh data can be changed only in object mode
+    def _object_mode(self):
+        if self.obj.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+    #Function re-reads arrays after topology of the mesh was changed
+    def _reload(self):
+        self.mesh = object_arrays(self.obj)
+        self._vert_select = None
+        self._face_select = None
+        self._edge_select = None
+        self._vert_colors = None
+        self._vert_values = None
+
+    #Function merges every vertex into its target in one BMesh round trip
+    #Returns number of removed vertices
+    def weld(self, targets):
+        duplicates = np.flatnonzero(targets != np.arange(self.mesh.nr_verts))
+        if len(duplicates) == 0:
+            return 0
+        self._object_mode()
+        me = self.obj.data
+        bm = bmesh.new()
+        bm.from_mesh(me)
+        bm.verts.ensure_lookup_table()
+        targetmap = {bm.verts[i]: bm.verts[targets[i]] for i in duplicates}
+        bmesh.ops.weld_verts(bm, targetmap=targetmap)
+        bm.to_mesh(me)
+        bm.free()
+        me.update()
+        self._reload()
+        return len(duplicates)
+
+    #Function adds vertices and triangles, returns indices of new faces
+    def add_faces(self, new_verts, triangles):
+        self._object_mode()
+        new_faces = add_faces(self.obj, new_verts, triangles)
+        self._reload()
+        return new_faces
+
+    #Function deletes faces with their edges and vertices not used by other faces
+    #Returns number of removed faces
+    def delete_faces(self, faces):
+        if len(faces) == 0:
+            return 0
+        self._object_mode()
+        me = self.obj.data
+        bm = bmesh.new()
+        bm.from_mesh(me)
+        bm.faces.ensure_lookup_table()
+        bmesh.ops.delete(bm, geom=[bm.faces[i] for i in faces], context='FACES')
+        bm.to_mesh(me)
+        bm.free()
+        me.update()
+        self._reload()
+        return len(faces)
+
+    #Function reverses loops of faces in one BMesh round trip (face and loop data are kept)
+    #Returns number of flipped faces
+    def flip_faces(self, faces):
+        if len(faces) == 0:
+            return 0
+        self._object_mode()
+        me = self.obj.data
+        bm = bmesh.new()
+        bm.from_mesh(me)
+        bm.faces.ensure_lookup_table()
+        bmesh.ops.reverse_faces(bm, faces=[bm.faces[i] for i in faces])
+        bm.to_mesh(me)
+        bm.free()
+        me.update()
+        self._reload()
+        return len(faces)
+
+    #Function chooses vertices, faces or edges ((K, 2) vertex pairs) selected in commit,
+    #everything else is deselected
+    def select(self, verts=None, faces=None, edges=None):
+        mesh = self.mesh
+        vert_select = np.zeros(mesh.nr_verts, dtype=bool)
+        face_select = np.zeros(mesh.nr_faces, dtype=bool)
+        if faces is not None:
+            face_select[faces] = True
+            vert_select[mesh.face_verts[face_select[mesh.loop_faces]]] = True
+        if verts is not None:
+            vert_select[verts] = True
+            if mesh.nr_faces:
+                face_select |= np.logical_and.reduceat(vert_select[mesh.face_verts], mesh.face_offsets[:-1])
+        self._edge_select = None
+        if edges is not None:
+            #Only given edges are selected, not other edges between their vertices
+            edges = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+            vert_select[edges.ravel()] = True
+            self._edge_select = edges[:, 0] * max(mesh.nr_verts, 1) + edges[:, 1]
+        self._vert_select = vert_select
+        self._face_select = face_select
+
+    #Function sets RGBA colour of every vertex and optionally its value, written in commit
+    def paint_verts(self, colors, values=None):
+        self._vert_colors = np.ascontiguousarray(colors, dtype=np.float32).reshape(-1, 4)
+        self._vert_values = values
+
+    #Function writes selection and colors to the mesh and sets the final mode
+    #(mode None keeps the current mode, e.g. when several objects are committed)
+    def commit(self, mode='OBJECT', select_mode=None):
+        with profiling.stage("write back"):
+            me = self.obj.data
+            if self._vert_select is not None or self._vert_colors is not None:
+                self._object_mode()
+
+            if self._vert_select is not None:
+                #Edges are selected when both of their vertices are selected
+                edges = np.empty(len(me.edges) * 2, dtype=np.int32)
+                me.edges.foreach_get("vertices", edges)
+                if self._edge_select is None:
+                    edge_select = self._vert_select[edges[0::2]] & self._vert_select[edges[1::2]]
+                else:
+                    edges = np.sort(edges.reshape(-1, 2), axis=1).astype(np.int64)
+                    edge_select = np.isin(edges[:, 0] * max(self.mesh.nr_verts, 1) + edges[:, 1], self._edge_select)
+                me.vertices.foreach_set("select", self._vert_select)
+                me.edges.foreach_set("select", edge_select)
+                me.polygons.foreach_set("select", self._face_select)
+
+            if self._vert_colors is not None:
+                write_vertex_colors(me, self._vert_colors, self._vert_values, self.mesh.face_verts)
+
+            me.update()
+            if mode is not None and self.obj.mode != mode:
+                bpy.ops.object.mode_set(mode=mode)
+            if select_mode is not None:
+                bpy.ops.mesh.select_mode(type=select_mode)
+
+
+#Analyses are split into two parts, so they can run in modal operators (see modal.py):
+#compute(progress) works only with arrays and can run in a background thread,
+#finish(result) writes results to Blender and runs in the main thread
+#Functions *_job return both parts, functions without it run them one after another
+
+
+#Function prepares selection of gaps in mesh
+def gaps_job(self, context):
+    session = MeshSession(bpy.context.active_object)
+    mesh = session.mesh
+    store = results(context)
+
+    def compute(progress):
+        with profiling.stage("holes"):
+            holes = store.cached(mesh, "holes", lambda: analysis.holes(mesh))
+        with profiling.stage("non-manifold vertices"):
+            non_manifold = store.cached(mesh, "non_manifold_vertices", lambda: analysis.non_manifold_vertices(mesh))
+        return holes, non_manifold
+
+    def finish(result):
+        holes, non_manifold = result
+
+        #Show info in the system console and on the screen
+        nr_holes = len(holes["vertex_count"])
+        for i in np.argsort(-holes["perimeter"])[:10]:
+            print("Hole with", holes["vertex_count"][i], "vertices, perimeter", holes["perimeter"][i],
+                  "area", holes["area"][i], "centroid", tuple(holes["centroid"][i]))
+        self.report({'INFO'}, "Found " + str(nr_holes) + " hole(s).")
+
+        #Select holes in mesh
+        session.select(verts=non_manifold)
+        session.commit('EDIT', 'VERT')
+        return holes
+
+    return compute, finish
+
+
+#Function selects gaps in mesh
+#Returns description of holes (see analysis.holes)
+def gaps_on(self, context):
+    compute, finish = gaps_job(self, context)
+    return finish(compute(None))
+
+
+#Function prepares fixing of face orientation
+#Faces are oriented consistently in every connected part and outwards (see analysis.orient_faces),
+#only faces with wrong orientation are flipped and then selected
+def orient_job(self, context):
+    session = MeshSession(bpy.context.active_object)
+    mesh = session.mesh
+    store = results(context)
+
+    def compute(progress):
+        with profiling.stage("orientation"):
+            return store.cached(mesh, "orientation", lambda: analysis.orient_faces(mesh))
+
+    def finish(orientation):
+        #Show info in the system console and on the screen
+        wrong = np.flatnonzero(orientation["component_flipped"])
+        for i in wrong[np.argsort(-orientation["component_flipped"][wrong])][:10]:
+            print("Part", i, "with", orientation["component_faces"][i], "faces:",
+                  orientation["component_flipped"][i], "wrong")
+        with profiling.stage("flip"):
+            flipped = session.flip_faces(orientation["flip"])
+        message = "Flipped " + str(flipped) + " face(s) in " + str(len(wrong)) + " part(s)"
+        if len(orientation["non_orientable"]):
+            message += ", " + str(len(orientation["non_orientable"])) + " part(s) cannot be oriented"
+        self.report({'INFO'}, message + ".")
+
+        session.select(faces=orientation["flip"])
+        session.commit('EDIT', 'FACE')
+        return orientation
+
+    return compute, finish
+
+
+#Function prepares topology audit of the mesh (see analysis.topology_audit)
+#Counts of all categories are reported, elements of category are selected when it is given
+def audit_job(self, context, category=None, distance=analysis.DEGENERATE_DISTANCE):
+    session = MeshSession(bpy.context.active_object)
+    mesh = session.mesh
+    store = results(context)
+
+    def compute(progress):
+        with profiling.stage("topology audit"):
+            return store.cached(mesh, "topology_audit", lambda: analysis.topology_audit(mesh, distance), distance)
+
+    def finish(audit):
+        counts = analysis.topology_counts(audit)
+
+        #Show info in the system console and on the screen
+        for name, count in counts.items():
+            print(name.replace("_", " ").capitalize() + ":", count, audit[name][:20].tolist())
+        found = [name.replace("_", " ") + " " + str(count) for name, count in counts.items() if count]
+        self.report({'INFO'}, "Topology: " + (", ".join(found) if found else "no issues") + ".")
+
+        #Select elements of one category
+        if category:
+            indices = audit[category]
+            if category == 'wire_edges':
+                session.select(edges=mesh.loose_edges[indices])
+                session.commit('EDIT', 'EDGE')
+            elif category.endswith('_edges'):
+                session.select(edges=mesh.edges[indices])
+                session.commit('EDIT', 'EDGE')
+            elif category.endswith('_faces'):
+                session.select(faces=indices)
+                session.commit('EDIT', 'FACE')
+            else:
+                session.select(verts=indices)
+                session.commit('EDIT', 'VERT')
+        return audit
+
+    return compute, finish
+
+
+#Function prepares search of self-intersections
+#Intersecting faces are selected, with segments the intersection segments are added
+#as edges of a new object placed like the analysed one
+def intersections_job(self, context, workers=1, segments=False):
+    obj = bpy.context.active_object
+    session = MeshSession(obj)
+    mesh = session.mesh
+    store = results(context)
+    with profiling.stage("build BVH tree"):
+        mesh.bvh
+
+    def compute(progress):
+        with profiling.stage("self-intersections"):
+            return store.cached(mesh, "self_intersections",
+                                lambda: intersect.self_intersections(mesh, workers, progress=progress))
+
+    def finish(found):
+        #Show info in the system console and on the screen
+        print('Self-intersections:', len(found["pairs"]), 'triangle pair(s),', len(found["faces"]), 'face(s)')
+        self.report({'INFO'}, "Selected " + str(len(found["faces"])) + " self-intersecting face(s).")
+
+        session.select(faces=found["faces"])
+        session.commit('EDIT', 'FACE')
+        if segments and len(found["segments"]):
+            add_segments(obj, found["segments"])
+        return found
+
+    return compute, finish
+
+
+#Function creates object with edges of given (K, 2, 3) segments in local space of obj
+def add_segments(obj, segments, name="intersections"):
+    me = bpy.data.meshes.new(obj.name + " " + name)
+    me.vertices.add(2 * len(segments))
+    me.edges.add(len(segments))
+    me.vertices.foreach_set("co", np.asarray(segments, dtype=np.float32).ravel())
+    me.edges.foreach_set("vertices", np.arange(2 * len(segments), dtype=np.int32))
+    me.update()
+    segments_obj = bpy.data.objects.new(me.name, me)
+    segments_obj.matrix_world = obj.matrix_world
+    for collection in obj.users_collection:
+        collection.objects.link(segments_obj)
+    return segments_obj
+
+
+#Function adds vertices and triangles to object's mesh in one bulk write
+#Mesh arrays are read, extended and written back with foreach_set
+#Object has to be in object mode
+def add_faces(obj, new_verts, triangles):
+    me = obj.data
+    nr_verts = len(me.vertices)
+    nr_loops = len(me.loops)
+    nr_faces = len(me.polygons)
+
+    me.vertices.add(len(new_verts))
+    me.loops.add(3 * len(triangles))
+    me.polygons.add(len(triangles))
+
+    co = np.empty((nr_verts + len(new_verts)) * 3, dtype=np.float32)
+    me.vertices.foreach_get("co", co)
+    co[nr_verts * 3:] = np.asarray(new_verts, dtype=np.float32).ravel()
+    me.vertices.foreach_set("co", co)
+
+    loop_verts = np.empty(nr_loops + 3 * len(triangles), dtype=np.int32)
+    me.loops.foreach_get("vertex_index", loop_verts)
+    loop_verts[nr_loops:] = np.asarray(triangles, dtype=np.int32).ravel()
+    me.loops.foreach_set("vertex_index", loop_verts)
+
+    loop_start = np.empty(nr_faces + len(triangles), dtype=np.int32)
+    loop_total = np.empty(nr_faces + len(triangles), dtype=np.int32)
+    me.polygons.foreach_get("loop_start", loop_start)
+    me.polygons.foreach_get("loop_total", loop_total)
+    loop_start[nr_faces:] = nr_loops + 3 * np.arange(len(triangles), dtype=np.int32)
+    loop_total[nr_faces:] = 3
+    me.polygons.foreach_set("loop_start", loop_start)
+    me.polygons.foreach_set("loop_total", loop_total)
+
+    me.update(calc_edges=True)
+    return np.arange(nr_faces, nr_faces + len(triangles))
+
+
+#Function prepares removing of gaps in mesh
+#Every hole is filled separately with triangles
+#Holes with more than max_verts vertices are kept (0 - no limit)
+def gaps_remove_job(self, context, max_verts=0):
+    session = MeshSession(bpy.context.active_object)
+    mesh = session.mesh
+
+    def compute(progress):
+        #Triangulate holes
+        with profiling.stage("fill holes"):
+            return fill.fill_holes(mesh, max_verts or None)
+
+    def finish(result):
+        new_verts, triangles, nr_holes = result
+
+        #Add faces where holes are and select them
+        with profiling.stage("add faces"):
+            new_faces = session.add_faces(new_verts, triangles)
+        profiling.count("faces added", len(new_faces))
+        session.select(faces=new_faces)
+        session.commit('EDIT', 'FACE')
+
+        #Show info on the screen
+        self.report({'INFO'}, "Filled " + str(nr_holes) + " hole(s) with " + str(len(triangles)) + " triangle(s).")
+
+    return compute, finish
+
+
+#Function removes gaps in mesh
+def gaps_remove(self, context, max_verts=0):
+    compute, finish = gaps_remove_job(self, context, max_verts)
+    return finish(compute(None))
+
+
+#Function prepares search of additional interior faces
+#With remove the faces are deleted, otherwise they are selected
+#workers > 1 splits winding numbers between worker processes
+def extra_faces_job(self, context, samples=analysis.INTERIOR_SAMPLES, mode='RAYS',
+                    threshold=winding.WINDING_THRESHOLD, remove=False, workers=1):
+    #Get the active mesh
+    session = MeshSession(bpy.context.active_object)
+    mesh = session.mesh
+    store = results(context)
+
+    def compute(progress):
+        with profiling.stage("interior faces"):
+            if mode == 'WINDING':
+                #Faces inside the volume of the object
+                return store.cached(mesh, "interior_faces_winding",
+                                    lambda: winding.interior_faces(mesh, threshold, workers=workers, progress=progress), threshold)
+            #Faces which cannot be seen from any direction
+            return store.cached(mesh, "interior_faces",
+                                lambda: analysis.interior_faces(mesh, samples, progress=progress), samples)
+
+    def finish(invisible_interior_faces):
+        #Show result in the system console
+        print('Selected ', len(invisible_interior_faces), ' interior faces')
+
+        #Show the result on the screen
+        self.report({'INFO'}, "Selected " + str(len(invisible_interior_faces)) + " interior face(s).")
+
+        if not remove:
+            #Select the faces and set edit mode to show the results on the screen
+            session.select(faces=invisible_interior_faces)
+            session.commit('EDIT', 'FACE')
+            return invisible_interior_faces
+
+        #Delete the faces with their edges and vertices not used by other faces
+        with profiling.stage("delete faces"):
+            faces_removed = session.delete_faces(invisible_interior_faces)
+        session.commit('EDIT', 'FACE')
+
+        #Show info about removed faces
+        self.report({'INFO'}, "Removed " + str(faces_removed) + " interior face(s).")
+        return invisible_interior_faces
+
+    return compute, finish
+
+
+#Function selects additional interior faces
+#Returns indices of selected faces
+def extra_faces_on(mesh_data, self, context, samples=analysis.INTERIOR_SAMPLES, mode='RAYS',
+                   threshold=winding.WINDING_THRESHOLD, workers=1):
+    compute, finish = extra_faces_job(self, context, samples, mode, threshold, workers=workers)
+    return finish(compute(None))
+
+
+#Function removes additional interior faces
+def extra_faces_remove(mesh_data, self, context, samples=analysis.INTERIOR_SAMPLES, mode='RAYS',
+                       threshold=winding.WINDING_THRESHOLD, workers=1):
+    compute, finish = extra_faces_job(self, context, samples, mode, threshold, remove=True, workers=workers)
+    return finish(compute(None))
+
+
+#Function prepares removing of vertices that are replicated
+#With dry_run only reports clusters of replicated vertices, the mesh is not changed
+#Given session is reused and not committed, so more stages can follow (see curves.py)
+def merge_verts_job(self, context, distance=analysis.MERGE_DISTANCE, dry_run=False, session=None):
+    commit = session is None
+    if session is None:
+        session = MeshSession(bpy.context.active_object)
+    mesh = session.mesh
+    store = results(context)
+
+    def compute(progress):
+        #Find vertex every vertex should be merged into
+        with profiling.stage("duplicate clusters"):
+            return store.cached(mesh, "duplicate_clusters", lambda: analysis.duplicate_clusters(mesh, distance), distance)
+
+    def finish(clusters):
+        targets = clusters["targets"]
+        duplicates = np.flatnonzero(targets != np.arange(mesh.nr_verts))
+        max_spread = clusters["spread"].max() if len(clusters["spread"]) else 0.0
+
+        if dry_run:
+            #Show info on the screen
+            self.report({'INFO'}, "Found " + str(len(duplicates)) + " additional vertice(s) in "
+                        + str(len(clusters["sizes"])) + " cluster(s), max spread " + "%.6g" % max_spread + ".")
+            return {"FINISHED"}
+
+        #Remove replicated vertices
+        with profiling.stage("weld"):
+            removed = session.weld(targets)
+        profiling.count("vertices merged", removed)
+
+        #Show info on the screen
+        self.report({'INFO'}, "Removed " + str(removed) + " additional vertice(s).")
+        if commit:
+            session.commit('EDIT')
+
+        return {"FINISHED"}
+
+    return compute, finish
+
+
+#Function removes vertices that are replicated
+def merge_verts(self, context, distance=analysis.MERGE_DISTANCE, dry_run=False):
+    compute, finish = merge_verts_job(self, context, distance, dry_run)
+    return finish(compute(None))
+
+
+#Stages which can be chained in one session
+PIPELINE_STAGES = analysis.PIPELINE_STAGES
+
+
+#Function prepares chain of stages on one session of the active object
+#Merge, holes, interior faces and curvature are computed on arrays (welded in arrays when
+#merging, see analysis.pipeline_stages), the mesh is welded once, curvature is painted on
+#the welded mesh and selection of holes and interior faces is written together in one commit
+#workers > 1 splits winding numbers between worker processes
+def pipeline_job(self, context, stages, distance=analysis.MERGE_DISTANCE, samples=analysis.INTERIOR_SAMPLES,
+                 mode='RAYS', threshold=winding.WINDING_THRESHOLD, workers=1):
+    session = MeshSession(bpy.context.active_object)
+    mesh = session.mesh
+    store = results(context)
+
+    def compute(progress):
+        return analysis.pipeline_stages(mesh, stages, distance, samples, mode, threshold, workers,
+                                        cached=store.cached, progress=progress)
+
+    def finish(result):
+        targets, work, found = result
+        messages = []
+        if targets is not None:
+            with profiling.stage("weld"):
+                removed = session.weld(targets)
+            profiling.count("vertices merged", removed)
+            messages.append("removed " + str(removed) + " vertice(s)")
+
+            #Blender's weld removes the same vertices as the array one, but it can remove
+            #different faces, then interior faces are found by their vertices
+            if removed and "interior" in found and not (np.array_equal(work.face_offsets, session.mesh.face_offsets)
+                                                        and np.array_equal(work.face_verts, session.mesh.face_verts)):
+                found["interior"] = analysis.matching_faces(work, session.mesh, found["interior"])
+
+        selected_verts = found.get("non_manifold")
+        selected_faces = found.get("interior")
+        if "holes" in found:
+            messages.append(str(len(found["holes"]["vertex_count"])) + " hole(s)")
+        if selected_faces is not None:
+            messages.append(str(len(selected_faces)) + " interior face(s)")
+        if selected_verts is not None or selected_faces is not None:
+            session.select(verts=selected_verts, faces=selected_faces)
+
+        if 'curvature' in stages:
+            stats = found["curvature_stats"]
+            mean = found["mean_curvature"]
+
+            #Show info of the painted mean curvature in system console
+            print("Mean: ", stats["mean"])
+            print("Median: ", stats["p50"])
+            print("Percentiles 1, 5, 95, 99: ", stats["p1"], stats["p5"], stats["p95"], stats["p99"])
+            print("Maximal curvature: ", stats["max"])
+            print("Minimal curvature: ", stats["min"])
+
+            #Paint every vertex with colour of its mean curvature, range from the printed stats
+            with profiling.stage("colors"):
+                session.paint_verts(colormaps.colorize(mean, **color_settings(context, stats)), mean)
+
+        #Everything is written at once, selection is shown in edit mode, colors in vertex paint
+        if selected_verts is not None or selected_faces is not None:
+            session.commit('EDIT', 'FACE' if selected_verts is None else 'VERT')
+        elif 'curvature' in stages:
+            session.commit('VERTEX_PAINT')
+        else:
+            session.commit('EDIT' if targets is not None else 'OBJECT')
+        if messages:
+            self.report({'INFO'}, "Mesh analysis: " + ", ".join(messages) + ".")
+        return found
+
+    return compute, finish
+
+
+#Function returns mesh objects analysed in given scope, selected or all of the view layer
+def scene_objects(context, scope='SELECTED'):
+    objects = context.selected_objects if scope == 'SELECTED' else context.view_layer.objects
+    return [obj for obj in objects if obj.type == 'MESH']
+
+
+#Function prepares analysis of many objects in worker processes
+#scope is 'SELECTED' (selected meshes) or 'SCENE' (all meshes of the view layer, not of excluded collections)
+#Replicated vertices are only counted, holes and interior faces are selected,
+#curvature is painted; all objects are shown together in one edit mode
+def scene_job(self, context, stages, scope='SELECTED', workers=0, distance=analysis.MERGE_DISTANCE,
+              samples=analysis.INTERIOR_SAMPLES, mode='RAYS', threshold=winding.WINDING_THRESHOLD):
+    if context.active_object is not None and context.active_object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    sessions = [MeshSession(obj) for obj in scene_objects(context, scope)]
+
+    def compute(progress):
+        return parallel.analyse_meshes([session.mesh for session in sessions], stages, workers or None, progress,
+                                       distance=distance, samples=samples, mode=mode, threshold=threshold)
+
+    def finish(found):
+        #All objects are coloured with one range, from percentiles of curvature of the whole scene
+        sketch = quantiles.QuantileSketch()
+        for result in found:
+            if "curvature_sketch" in result:
+                sketch.merge(result["curvature_sketch"])
+        stats = sketch.summary()
+        if sketch.count:
+            print("Scene mean curvature: median", stats["p50"], "percentiles 1, 99:", stats["p1"], stats["p99"])
+        settings = color_settings(context, stats)
+
+        totals = {}
+        for session, result in zip(sessions, found):
+            #Report of every object in the system console
+            counts = {name: (len(value) if isinstance(value, np.ndarray) else value) for name, value in result.items()
+                      if name in ('replicated_vertices', 'holes', 'non_manifold', 'interior')}
+            print(session.obj.name, counts)
+            for name, value in counts.items():
+                totals[name] = totals.get(name, 0) + value
+
+            if "non_manifold" in result or "interior" in result:
+                session.select(verts=result.get("non_manifold"), faces=result.get("interior"))
+            if "mean_curvature" in result:
+                session.paint_verts(colormaps.colorize(result["mean_curvature"], **settings), result["mean_curvature"])
+            session.commit(None)
+
+        #One mode switch for all objects
+        with profiling.stage("write back"):
+            if any(name in stages for name in ('holes', 'interior')) and sessions:
+                for obj in context.view_layer.objects:
+                    obj.select_set(False)
+                for session in sessions:
+                    session.obj.select_set(True)
+                context.view_layer.objects.active = sessions[0].obj
+                bpy.ops.object.mode_set(mode='EDIT')
+
+        self.report({'INFO'}, "Analysed " + str(len(sessions)) + " object(s): "
+                    + ", ".join(name.replace("_", " ") + " " + str(value) for name, value in totals.items()) + ".")
+        return found
+
+    return compute, finish
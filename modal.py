@@ -0,0 +1,151 @@
+import hashlib
+
+import bpy
+import numpy as np
+
+from learn_computer_graphics import jobs
+from learn_computer_graphics import profiling
+
+#Modal execution of long analyses
+#Array part of an analysis (compute) runs in a background thread in chunks,
+#timer of the modal operator shows progress in the status bar and on the panel
+#Escape stops the thread after the current chunk, results are dropped and the mesh
+#is not changed, because everything is written to Blender only in finish part
+#While the thread runs only the view can be moved, other events are blocked, and finish
+#part is skipped when the analysed meshes changed anyway (by a script), its indices would be stale
+
+#How often progress is refreshed, in seconds
+PROGRESS_INTERVAL = 0.1
+
+#Events passed to Blender while the analysis runs, they only move the view
+NAVIGATION_EVENTS = {
+    'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'WHEELINMOUSE',
+    'WHEELOUTMOUSE', 'TRACKPADPAN', 'TRACKPADZOOM', 'NDOF_MOTION', 'WINDOW_DEACTIVATE',
+    'NUMPAD_0', 'NUMPAD_1', 'NUMPAD_2', 'NUMPAD_3', 'NUMPAD_4', 'NUMPAD_5', 'NUMPAD_6', 'NUMPAD_7', 'NUMPAD_8',
+    'NUMPAD_9', 'NUMPAD_PERIOD', 'NUMPAD_PLUS', 'NUMPAD_MINUS',
+}
+
+
+#Mixin of operators running analysis returned by job(context) as (compute, finish)
+#(see mesh.py), operator started from a button runs modal (invoke),
+#from scripts or redo panel synchronously (execute)
+class ModalAnalysis:
+
+    def job(self, context):
+        raise NotImplementedError
+
+    #Objects whose meshes the job reads, only they are checked for changes
+    def analysed_objects(self, context):
+        return [context.active_object] if context.active_object is not None else []
+
+    def execute(self, context):
+        with profiling.run(self.bl_label):
+            compute, finish = self.job(context)
+            finish(compute(None))
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        self._profile = profiling.begin(self.bl_label)
+        try:
+            self._job = jobs.BackgroundJob(*self.job(context))
+        except Exception:
+            profiling.end(self._profile)
+            raise
+
+        wm = context.window_manager
+        wm.marta_progress = 0.0
+        wm.marta_running = self.bl_label
+        wm.progress_begin(0, 100)
+        self._timer = wm.event_timer_add(PROGRESS_INTERVAL, window=context.window)
+        wm.modal_handler_add(self)
+        self._objects = self.analysed_objects(context)
+        self._state = _mesh_state(self._objects)
+        self._job.start()
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self._job.cancel()
+            self._end(context)
+            self.report({'INFO'}, self.bl_label + " cancelled.")
+            return {'CANCELLED'}
+
+        if event.type == 'TIMER':
+            if self._job.running:
+                self._show_progress(context)
+                return {'PASS_THROUGH'}
+            if self._job.error is not None:
+                self._end(context)
+                self.report({'ERROR'}, self.bl_label + " failed: " + str(self._job.error))
+                return {'CANCELLED'}
+            try:
+                changed = _mesh_state(self._objects) != self._state
+            except ReferenceError:
+                #An analysed object was removed
+                changed = True
+            if changed:
+                self._end(context)
+                self.report({'WARNING'}, self.bl_label + " cancelled, meshes were changed while it ran.")
+                return {'CANCELLED'}
+            try:
+                self._job.finish()
+            finally:
+                self._end(context)
+            return {'FINISHED'}
+
+        if event.type in NAVIGATION_EVENTS:
+            return {'PASS_THROUGH'}
+        return {'RUNNING_MODAL'}
+
+    def _show_progress(self, context):
+        percent = 100.0 * self._job.progress
+        wm = context.window_manager
+        wm.marta_progress = percent
+        wm.progress_update(int(percent))
+        context.workspace.status_text_set("%s: %d%% (Esc to cancel)" % (self.bl_label, percent))
+        _redraw_panels(context)
+
+    def _end(self, context):
+        profiling.end(self._profile)
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        wm.marta_running = ""
+        wm.marta_progress = 0.0
+        context.workspace.status_text_set(None)
+        _redraw_panels(context)
+
+
+#Function describes analysed objects: mode, and counts and digest of vertex positions
+#of meshes, analysis results are valid only while it stays the same
+#Only the analysed objects are read, hashing every mesh of the scene would stall the UI
+def _mesh_state(objects):
+    state = {}
+    for obj in objects:
+        if obj.type != 'MESH':
+            state[obj.name] = (obj.type, obj.mode)
+            continue
+        me = obj.data
+        co = np.empty(len(me.vertices) * 3, dtype=np.float32)
+        me.vertices.foreach_get("co", co)
+        state[obj.name] = (me.name, obj.mode, len(me.vertices), len(me.edges), len(me.polygons), len(me.loops),
+                           hashlib.blake2b(co.data, digest_size=16).hexdigest())
+    return state
+
+
+#Function redraws properties editors, so the panel shows current progress
+def _redraw_panels(context):
+    for area in context.screen.areas:
+        if area.type == 'PROPERTIES':
+            area.tag_redraw()
+
+
+def register():
+    bpy.types.WindowManager.marta_progress = bpy.props.FloatProperty(
+        name="Progress", subtype='PERCENTAGE', min=0.0, max=100.0, default=0.0)
+    bpy.types.WindowManager.marta_running = bpy.props.StringProperty(name="Running analysis", default="")
+
+
+def unregister():
+    del bpy.types.WindowManager.marta_progress
+    del bpy.types.WindowManager.marta_running
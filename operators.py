@@ -0,0 +1,542 @@
+import bpy
+from bpy.types import Operator
+from bpy.props import FloatVectorProperty, FloatProperty, BoolProperty, IntProperty, EnumProperty, StringProperty
+from bpy_extras.object_utils import AddObjectHelper, object_data_add
+from bpy_extras.io_utils import ExportHelper
+from mathutils import Vector
+
+from learn_computer_graphics import mesh
+from learn_computer_graphics import curves
+from learn_computer_graphics import live
+from learn_computer_graphics import rendering
+from learn_computer_graphics import modal
+from learn_computer_graphics import profiling
+
+####################################################
+#Connecting main script with mesh.py
+
+class highlight_gaps(modal.ModalAnalysis, bpy.types.Operator):
+    """Tooltip"""
+    bl_idname = "marta.highlight_gaps"
+    bl_label = "Highlight gaps"
+
+
+    def job(self, context):
+        return mesh.gaps_job(self, context)
+
+
+
+class remove_gaps(modal.ModalAnalysis, bpy.types.Operator):
+    """Tooltip"""
+    bl_idname = "marta.remove_gaps"
+    bl_label = "Remove gaps"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    max_verts: IntProperty(name="Largest hole", description="Holes with more vertices are not filled (0 - no limit)", default=1000, min=0)
+
+
+    def job(self, context):
+        return mesh.gaps_remove_job(self, context, self.max_verts)
+    
+    
+#Interior faces are found by rays (faces not visible from outside)
+#or by generalized winding number (faces inside the volume, also for leaky meshes)
+INTERIOR_MODES = [
+    ('RAYS', "Ray visibility", "Faces which cannot be seen from outside"),
+    ('WINDING', "Winding number", "Faces lying inside the volume of the object"),
+]
+
+
+class topology_audit(modal.ModalAnalysis, bpy.types.Operator):
+    """Count non-manifold and degenerate elements, select one category"""
+    bl_idname = "marta.topology_audit"
+    bl_label = "Topology audit"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    select: EnumProperty(name="Select", items=[
+        ('NONE', "Nothing", "Only count elements of all categories"),
+        ('boundary_edges', "Boundary edges", "Edges used by one face"),
+        ('multi_face_edges', "Edges of 3+ faces", "Edges used by more than two faces"),
+        ('bowtie_verts', "Bowtie vertices", "Vertices with more than one fan of faces"),
+        ('wire_edges', "Wire edges", "Edges without faces"),
+        ('isolated_verts', "Isolated vertices", "Vertices without edges and faces"),
+        ('zero_area_faces', "Zero area faces", "Degenerate faces"),
+        ('zero_length_edges', "Zero length edges", "Degenerate edges"),
+    ], default='NONE')
+    distance: FloatProperty(name="Degenerate distance", description="Shorter edges have zero length", default=1e-6, min=0.0, precision=8)
+
+
+    def job(self, context):
+        return mesh.audit_job(self, context, None if self.select == 'NONE' else self.select, self.distance)
+
+
+class self_intersections(modal.ModalAnalysis, bpy.types.Operator):
+    """Select faces crossing other faces of the object"""
+    bl_idname = "marta.self_intersections"
+    bl_label = "Self-intersections"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    workers: IntProperty(name="Processes", description="Number of worker processes testing parts of the tree", default=1, min=1)
+    segments: BoolProperty(name="Add segments", description="Add intersection segments as edges of a new object", default=False)
+
+
+    def job(self, context):
+        return mesh.intersections_job(self, context, self.workers, self.segments)
+
+
+class highlight_interior_faces(modal.ModalAnalysis, bpy.types.Operator):
+    """Tooltip"""
+    bl_idname = "marta.highlight_interior_faces"
+    bl_label = "Highlight interior faces"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    mode: EnumProperty(name="Method", items=INTERIOR_MODES, default='RAYS')
+    samples: IntProperty(name="Rays per face", description="Number of directions tested from every face", default=32, min=1)
+    threshold: FloatProperty(name="Winding threshold", description="Faces with larger winding number are inside", default=0.75, min=0.5, max=1.0)
+    workers: IntProperty(name="Processes", description="Number of worker processes computing winding numbers", default=1, min=1)
+
+
+    def job(self, context):
+        return mesh.extra_faces_job(self, context, self.samples, self.mode, self.threshold, workers=self.workers)
+    
+    
+class remove_interior_faces(modal.ModalAnalysis, bpy.types.Operator):
+    """Tooltip"""
+    bl_idname = "marta.remove_interior_faces"
+    bl_label = "Remove interior faces"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    mode: EnumProperty(name="Method", items=INTERIOR_MODES, default='RAYS')
+    samples: IntProperty(name="Rays per face", description="Number of directions tested from every face", default=32, min=1)
+    threshold: FloatProperty(name="Winding threshold", description="Faces with larger winding number are inside", default=0.75, min=0.5, max=1.0)
+    workers: IntProperty(name="Processes", description="Number of worker processes computing winding numbers", default=1, min=1)
+
+
+    def job(self, context):
+        return mesh.extra_faces_job(self, context, self.samples, self.mode, self.threshold, remove=True,
+                                    workers=self.workers)
+
+class replicated_vertices(modal.ModalAnalysis, bpy.types.Operator):
+    """Tooltip"""
+    bl_idname = "marta.replicated_vertices"
+    bl_label = "Merge vertices"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    distance: FloatProperty(name="Merge distance", default=0.0001, min=0.0, precision=6)
+    dry_run: BoolProperty(name="Only report", description="Report replicated vertices without merging them", default=False)
+
+
+    def job(self, context):
+        return mesh.merge_verts_job(self, context, self.distance, self.dry_run)
+   
+   
+
+class analyse_mesh(modal.ModalAnalysis, bpy.types.Operator):
+    """Run chosen analyses in one pass over the mesh"""
+    bl_idname = "marta.analyse_mesh"
+    bl_label = "Analyse mesh"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    merge: BoolProperty(name="Merge vertices", default=True)
+    holes: BoolProperty(name="Gaps", default=True)
+    interior: BoolProperty(name="Interior faces", default=True)
+    curvature: BoolProperty(name="Curvature", default=False)
+    distance: FloatProperty(name="Merge distance", default=0.0001, min=0.0, precision=6)
+    mode: EnumProperty(name="Method", items=INTERIOR_MODES, default='RAYS')
+    samples: IntProperty(name="Rays per face", description="Number of directions tested from every face", default=32, min=1)
+    threshold: FloatProperty(name="Winding threshold", description="Faces with larger winding number are inside", default=0.75, min=0.5, max=1.0)
+    workers: IntProperty(name="Processes", description="Number of worker processes computing winding numbers", default=1, min=1)
+
+
+    def job(self, context):
+        stages = [stage for stage in mesh.PIPELINE_STAGES if getattr(self, stage)]
+        return mesh.pipeline_job(self, context, stages, self.distance, self.samples, self.mode, self.threshold,
+                                 self.workers)
+   
+   
+
+class analyse_scene(modal.ModalAnalysis, bpy.types.Operator):
+    """Run chosen analyses on many objects in worker processes"""
+    bl_idname = "marta.analyse_scene"
+    bl_label = "Analyse objects"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    scope: EnumProperty(name="Objects", items=[('SELECTED', "Selected", "Selected meshes"),
+                                               ('SCENE', "Scene", "All meshes of the scene")], default='SELECTED')
+    merge: BoolProperty(name="Replicated vertices", default=True)
+    holes: BoolProperty(name="Gaps", default=True)
+    interior: BoolProperty(name="Interior faces", default=True)
+    curvature: BoolProperty(name="Curvature", default=False)
+    workers: IntProperty(name="Processes", description="Number of worker processes (0 - number of CPUs)", default=0, min=0)
+    distance: FloatProperty(name="Merge distance", default=0.0001, min=0.0, precision=6)
+    mode: EnumProperty(name="Method", items=INTERIOR_MODES, default='RAYS')
+    samples: IntProperty(name="Rays per face", description="Number of directions tested from every face", default=32, min=1)
+    threshold: FloatProperty(name="Winding threshold", description="Faces with larger winding number are inside", default=0.75, min=0.5, max=1.0)
+
+
+    def job(self, context):
+        stages = [stage for stage in mesh.PIPELINE_STAGES if getattr(self, stage)]
+        return mesh.scene_job(self, context, stages, self.scope, self.workers, self.distance, self.samples,
+                              self.mode, self.threshold)
+
+    def analysed_objects(self, context):
+        return mesh.scene_objects(context, self.scope)
+   
+   
+
+#######################################   
+#Connecting main script with curves.py
+class curves_analysis_on(modal.ModalAnalysis, bpy.types.Operator):
+    """Tooltip"""
+    bl_idname = "marta.curves_analysis_on"
+    bl_label = "Do curves analyse"
+
+    limit: FloatProperty(name="Curvature limit", description="Segments of curve objects bending more are "
+                         "selected (1 / radius of the bend)", default=10.0, min=0.0)
+    overlay: BoolProperty(name="Overlay", description="Add edges along flagged segments of curve objects",
+                          default=False)
+
+
+    def job(self, context):
+        return curves.curves_job(self, context, self.limit, self.overlay)
+
+
+    
+#######################################   
+#Connecting main script with rendering.py
+
+class denoising(bpy.types.Operator):
+    """Tooltip"""
+    bl_idname = "marta.denoising"
+    bl_label = "Denoise data before rendering"
+
+
+    def execute(self, context):
+        rendering.denoise_data(context)
+        return {'FINISHED'}
+
+
+class face_orientation(bpy.types.Operator):
+    """Tooltip"""
+    bl_idname = "marta.face_orientation"
+    bl_label = "Toggle face orientation showing"
+
+
+    def execute(self, context):
+        rendering.show_face_orientation(context)
+        return {'FINISHED'}
+    
+
+class fix_face_orientation(modal.ModalAnalysis, bpy.types.Operator):
+    """Flip only faces whose orientation disagrees with outward orientation of their part"""
+    bl_idname = "marta.fix_face_orientation"
+    bl_label = "Fix face orientation"
+    bl_options = {'REGISTER', 'UNDO'}
+
+
+    def job(self, context):
+        return mesh.orient_job(self, context)
+
+
+class lighting(bpy.types.Operator):
+    """Tooltip"""
+    bl_idname = "marta.lighting"
+    bl_label = "Set studio lighting"
+
+    exact: BoolProperty(name="Exact bounds", description="Use all vertices instead of bounding boxes of objects", default=False)
+
+    def execute(self, context):
+        with profiling.run(self.bl_label):
+            rendering.set_lighting(self, context, self.exact)
+        return {'FINISHED'}
+
+
+#######################################
+#Profile reports
+
+class export_profile(bpy.types.Operator, ExportHelper):
+    """Save timings and counters of the last analysis"""
+    bl_idname = "marta.export_profile"
+    bl_label = "Save profile report"
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json;*.csv", options={'HIDDEN'})
+    file_format: EnumProperty(name="Format", items=[('JSON', "JSON", ""), ('CSV', "CSV", "")], default='JSON')
+
+    @classmethod
+    def poll(cls, context):
+        return profiling.LAST is not None
+
+    def check(self, context):
+        self.filename_ext = ".csv" if self.file_format == 'CSV' else ".json"
+        return super().check(context)
+
+    def execute(self, context):
+        profiling.LAST.write(self.filepath)
+        self.report({'INFO'}, "Profile saved to " + self.filepath)
+        return {'FINISHED'}
+
+
+#Instrumentation is switched from the panel
+def _update_profiling(self, context):
+    profiling.ENABLED = self.marta_profile
+    
+
+
+####################################################
+#Creating buttons - defining look of all panel
+#and assigning them appropriate functionalities
+
+
+class LayoutDemoPanel(bpy.types.Panel):
+    """Creates a Panel in the scene context of the properties editor"""
+    bl_label = "Learn Computer Graphics"
+    bl_idname = "SCENE_PT_layout"
+    bl_space_type = 'PROPERTIES'
+    bl_region_type = 'WINDOW'
+    bl_context = "scene"
+
+    def draw(self, context):
+        layout = self.layout
+
+        scene = context.scene
+        wm = context.window_manager
+
+        #Progress of analysis running in the background (Esc cancels it)
+        if wm.marta_running:
+            layout.label(text=wm.marta_running + " (Esc to cancel)")
+            row = layout.row()
+            row.enabled = False
+            row.prop(wm, "marta_progress", text="Progress")
+
+
+#Mesh buttons
+            
+        layout.label(text="MESH ISSUES")
+        
+        # Gaps in mesh
+        layout.label(text="Gaps in mesh:")
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.highlight_gaps")
+        
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.remove_gaps")
+
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.topology_audit")
+
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.self_intersections")
+        
+        
+        #Additional faces within object
+        layout.label(text="Additional faces within object:")
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.highlight_interior_faces")
+        
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.remove_interior_faces")
+        
+        #Replicated vertices
+        layout.label(text="Replicated vertices:")
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.replicated_vertices")
+        
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.replicated_vertices", text="Find replicated vertices").dry_run = True
+
+        #All mesh analyses at once
+        layout.label(text="All mesh issues:")
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.analyse_mesh")
+
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.analyse_scene", text="Analyse selected objects").scope = 'SELECTED'
+        row.operator("marta.analyse_scene", text="Analyse scene").scope = 'SCENE'
+
+        #Colours of curvature
+        row = layout.row()
+        row.prop(scene, "marta_colormap", text="")
+        row.prop(scene, "marta_color_scale", text="")
+        row = layout.row()
+        if scene.marta_color_scale == 'BINS':
+            row.prop(scene, "marta_color_bins")
+        else:
+            row.prop(scene, "marta_color_limit")
+        
+        
+        
+       
+#Curves buttons
+        layout.label(text=" ")
+        layout.label(text="CURVES ISSUES")
+        
+        # Too bent curves
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.curves_analysis_on")
+
+        #Live analysis after every edit of the active object
+        row = layout.row()
+        row.prop(wm, "marta_live")
+        row.prop(wm, "marta_live_distance")
+        state = live.state_of(context.active_object) if wm.marta_live else None
+        if state is not None:
+            summary = state.summary()
+            layout.label(text="%d replicated vertices, %d holes (max perimeter %.4f)"
+                         % (summary["replicated_vertices"], summary["holes"], summary["max_perimeter"]))
+        
+
+#Rendering buttons
+        layout.label(text=" ")
+        layout.label(text="RENDERING")
+        
+        # Denoising
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.denoising")
+        
+        #Face orientation
+        layout.label(text="Face orientation:")
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.face_orientation")
+
+        
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.fix_face_orientation")
+       
+        
+        #Light 
+        layout.label(text="Light settings:")
+        row = layout.row()
+        row.scale_y = 1.0
+        row.operator("marta.lighting")
+
+#Profiling
+        layout.label(text=" ")
+        layout.label(text="PROFILING")
+        row = layout.row()
+        row.prop(wm, "marta_profile")
+        last = profiling.LAST
+        if wm.marta_profile and last is not None:
+            box = layout.box()
+            box.label(text="%s: %.1f ms wall, %.1f ms CPU, peak %.1f MB"
+                      % (last.name, 1000 * last.wall, 1000 * last.cpu, last.peak_memory / 2 ** 20))
+            for name, values in last.stages.items():
+                box.label(text="%s: %.1f ms (%.1f ms CPU)" % (name, 1000 * values["wall"], 1000 * values["cpu"]))
+            for name, value in last.counters.items():
+                box.label(text="%s: %d" % (name, value))
+            row = layout.row()
+            row.operator("marta.export_profile")
+
+#Cache of results
+        layout.label(text=" ")
+        layout.label(text="CACHE")
+        row = layout.row()
+        row.prop(scene, "marta_cache_directory")
+        
+        
+
+        
+    
+
+##############################################################
+
+def register():
+    modal.register()
+    live.register()
+
+    bpy.utils.register_class(highlight_gaps)
+    bpy.utils.register_class(remove_gaps)
+    bpy.utils.register_class(topology_audit)
+    bpy.utils.register_class(self_intersections)
+    bpy.utils.register_class(highlight_interior_faces)
+    bpy.utils.register_class(remove_interior_faces)
+    bpy.utils.register_class(replicated_vertices)
+    bpy.utils.register_class(analyse_mesh)
+    bpy.utils.register_class(analyse_scene)
+    
+    
+    bpy.utils.register_class(curves_analysis_on)
+    
+    bpy.utils.register_class(denoising)
+    bpy.utils.register_class(face_orientation)
+    bpy.utils.register_class(fix_face_orientation)
+    bpy.utils.register_class(lighting)
+    bpy.utils.register_class(export_profile)
+   
+    bpy.utils.register_class(LayoutDemoPanel)
+
+    bpy.types.WindowManager.marta_profile = BoolProperty(
+        name="Profile analyses", description="Measure time, counters and memory of every analysis",
+        default=False, update=_update_profiling)
+    bpy.types.Scene.marta_cache_directory = StringProperty(
+        name="Cache directory", description="Keep analysis results in .npz files (empty - only in memory)",
+        default="", subtype='DIR_PATH')
+    bpy.types.Scene.marta_colormap = EnumProperty(
+        name="Colormap", description="Colours of curvature",
+        items=[('COOLWARM', "Cool-warm", "Blue concave, grey flat, red convex"),
+               ('VIRIDIS', "Viridis", "Perceptually uniform, dark to yellow"),
+               ('TRAFFIC', "Traffic", "Green, yellow, orange and red"),
+               ('GRAY', "Gray", "Black to white")],
+        default='COOLWARM')
+    bpy.types.Scene.marta_color_scale = EnumProperty(
+        name="Scale", description="How curvature is mapped to colours",
+        items=[('CONTINUOUS', "Continuous", "Range of curvature goes through the whole colormap"),
+               ('DIVERGING', "Diverging", "Symmetric range around zero, flat parts get the middle colour"),
+               ('BINS', "Bins", "Every bin between given edges gets one colour")],
+        default='DIVERGING')
+    bpy.types.Scene.marta_color_limit = FloatProperty(
+        name="Limit", description="Curvature (relative to the bounding box) of the end colours, "
+                                  "0 - automatic from the 1st and 99th percentile",
+        default=0.0, min=0.0)
+    bpy.types.Scene.marta_color_bins = StringProperty(
+        name="Bins", description="Bin edges of relative curvature separated by commas, "
+                                 "empty - percentiles 1, 5, 50, 95 and 99",
+        default="")
+
+
+def unregister():
+    bpy.utils.unregister_class(highlight_gaps)
+    bpy.utils.unregister_class(remove_gaps)
+    bpy.utils.unregister_class(topology_audit)
+    bpy.utils.unregister_class(self_intersections)
+    bpy.utils.unregister_class(highlight_interior_faces)
+    bpy.utils.unregister_class(remove_interior_faces)
+    bpy.utils.unregister_class(replicated_vertices)
+    bpy.utils.unregister_class(analyse_mesh)
+    bpy.utils.unregister_class(analyse_scene)
+    
+    
+    bpy.utils.unregister_class(curves_analysis_on)
+
+    bpy.utils.unregister_class(denoising)
+    bpy.utils.unregister_class(face_orientation)
+    bpy.utils.unregister_class(fix_face_orientation)
+    bpy.utils.unregister_class(lighting)
+    bpy.utils.unregister_class(export_profile)
+
+    bpy.utils.unregister_class(LayoutDemoPanel)
+
+    del bpy.types.Scene.marta_cache_directory
+    del bpy.types.Scene.marta_colormap
+    del bpy.types.Scene.marta_color_scale
+    del bpy.types.Scene.marta_color_limit
+    del bpy.types.Scene.marta_color_bins
+    del bpy.types.WindowManager.marta_profile
+    live.unregister()
+    profiling.ENABLED = False
+
+    modal.unregister()
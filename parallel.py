@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import curvature
+from learn_computer_graphics import quantiles
+from learn_computer_graphics import winding
+from learn_computer_graphics.core import MeshArrays
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    #Python < 3.8 (Blender 2.80 - 2.82), arrays are sent to workers by pickling
+    shared_memory = None
+
+#Analysis of many meshes in worker processes, without bpy
+#Arrays of every mesh are put into shared memory once, workers map them without copying
+#Meshes are started from the largest one, so the whole run takes about as long
+#as the largest mesh when there are enough workers
+
+MESH_ARRAYS = ('verts', 'face_offsets', 'face_verts')
+
+
+#Function copies arrays of the mesh into shared memory blocks
+#Returns description of the blocks (picklable) and the blocks themselves
+def share(mesh):
+    description = {}
+    blocks = []
+    for name in MESH_ARRAYS:
+        array = getattr(mesh, name)
+        if shared_memory is None or array.nbytes == 0:
+            description[name] = array
+            continue
+        block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        description[name] = (block.name, array.shape, array.dtype.str)
+        blocks.append(block)
+    return description, blocks
+
+
+#Function maps shared arrays in worker process
+def _attach(description):
+    arrays = {}
+    blocks = []
+    for name, value in description.items():
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+            continue
+        block_name, shape, dtype = value
+        block = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        blocks.append(block)
+    return MeshArrays(arrays['verts'], arrays['face_offsets'], arrays['face_verts']), blocks
+
+
+#Function runs chosen stages on one mesh, it runs in worker process
+#Results are plain arrays and numbers, sizes of them are proportional to found issues
+def analyse_shared(description, stages, distance=analysis.MERGE_DISTANCE, samples=analysis.INTERIOR_SAMPLES,
+                   mode='RAYS', threshold=winding.WINDING_THRESHOLD):
+    mesh, blocks = _attach(description)
+    try:
+        result = {"verts": mesh.nr_verts, "faces": mesh.nr_faces}
+        if 'merge' in stages:
+            clusters = analysis.duplicate_clusters(mesh, distance)
+            result["replicated_vertices"] = clusters["removed"]
+            result["replicated_clusters"] = len(clusters["sizes"])
+        if 'holes' in stages:
+            holes = analysis.holes(mesh)
+            result["holes"] = len(holes["vertex_count"])
+            result["non_manifold"] = analysis.non_manifold_vertices(mesh)
+        if 'interior' in stages:
+            if mode == 'WINDING':
+                #Objects already run in worker processes, points of one object are not split again
+                result["interior"] = winding.interior_faces(mesh, threshold)
+            else:
+                result["interior"] = analysis.interior_faces(mesh, samples)
+        if 'curvature' in stages:
+            result["mean_curvature"] = curvature.vertex_curvature(mesh, relative=True)["mean"].astype(np.float32)
+            result["curvature"] = quantiles.summary(result["mean_curvature"])
+            #Sketches of all meshes are merged for statistics of the whole scene
+            result["curvature_sketch"] = quantiles.QuantileSketch().add(result["mean_curvature"])
+        return result
+    except BaseException as error:
+        #Frames of the error keep arrays of the mesh, they are dropped so the blocks can be closed
+        traceback.clear_frames(error.__traceback__)
+        raise
+    finally:
+        #Arrays of the mesh must not be used after the blocks are closed
+        del mesh
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                #Arrays are still referenced, the block is unmapped when the process ends,
+                #an error of the analysis is raised instead of this one
+                pass
+
+
+#Function returns executable for worker processes
+#Before Blender 2.91 sys.executable is Blender itself, then its Python is used
+#(bpy.app.binary_path_python was removed in 2.91, sys.executable is the Python since then)
+def _python_executable():
+    try:
+        import bpy
+    except ImportError:
+        return None
+    if bpy.app.version >= (2, 91, 0):
+        return sys.executable
+    return bpy.app.binary_path_python
+
+
+#Function analyses meshes in worker processes
+#progress(done_part) is called after every finished mesh, it can stop the run by raising
+#Returns results in order of meshes
+def analyse_meshes(meshes, stages, workers=None, progress=None, **params):
+    results = [None] * len(meshes)
+    shared = []
+    try:
+        for mesh in meshes:
+            shared.append(share(mesh))
+
+        #Largest meshes first
+        order = sorted(range(len(meshes)), key=lambda i: -(meshes[i].nr_loops + meshes[i].nr_verts))
+        workers = min(workers or os.cpu_count() or 1, max(len(meshes), 1))
+        if workers == 1:
+            for done, i in enumerate(order, 1):
+                results[i] = analyse_shared(shared[i][0], stages, **params)
+                if progress is not None:
+                    progress(done / len(meshes))
+            return results
+
+        #Worker processes are started fresh (spawn), forking a running Blender is not safe
+        context = multiprocessing.get_context('spawn')
+        executable = _python_executable()
+        if executable:
+            context.set_executable(executable)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(analyse_shared, shared[i][0], stages, **params): i for i in order}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    results[futures[future]] = future.result()
+                    if progress is not None:
+                        progress(done / len(meshes))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return results
+    finally:
+        for _, blocks in shared:
+            for block in blocks:
+                block.close()
+                block.unlink()
@@ -0,0 +1,153 @@
+import csv
+import json
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+#Instrumentation of analyses, without bpy
+#Stages measure wall and CPU time, counters count processed elements (edges, rays, loops...)
+#and peak memory of the whole run is taken from tracemalloc
+#It is off by default, then stage() and count() do nothing
+#Only one run is measured at a time, its stages can run in a background thread
+
+ENABLED = False
+
+#Run being measured and the last finished run
+CURRENT = None
+LAST = None
+
+
+class Profile:
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = OrderedDict()
+        self.counters = OrderedDict()
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_memory = 0
+        self._started_tracing = False
+
+    def start(self):
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        elif hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def stop(self):
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = time.process_time() - self._cpu
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self._started_tracing:
+            tracemalloc.stop()
+
+    def add_stage(self, name, wall, cpu):
+        stage = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0, "calls": 0})
+        stage["wall"] += wall
+        stage["cpu"] += cpu
+        stage["calls"] += 1
+
+    def count(self, name, amount):
+        self.counters[name] = self.counters.get(name, 0) + int(amount)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "peak_memory": self.peak_memory,
+            "stages": [dict(stage=name, **values) for name, values in self.stages.items()],
+            "counters": dict(self.counters),
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as output:
+            json.dump(self.to_dict(), output, indent=2)
+
+    #One row for every stage and counter, the whole run is the first row
+    def write_csv(self, path):
+        with open(path, 'w', newline='') as output:
+            writer = csv.writer(output)
+            writer.writerow(["kind", "name", "wall", "cpu", "calls", "value"])
+            writer.writerow(["run", self.name, self.wall, self.cpu, 1, self.peak_memory])
+            for name, values in self.stages.items():
+                writer.writerow(["stage", name, values["wall"], values["cpu"], values["calls"], ""])
+            for name, value in self.counters.items():
+                writer.writerow(["counter", name, "", "", "", value])
+
+    #Function writes report, format is chosen by extension of the file (.json or .csv)
+    def write(self, path):
+        if path.lower().endswith(".csv"):
+            self.write_csv(path)
+        else:
+            self.write_json(path)
+
+
+#Function starts measuring of a run, returns None when instrumentation is off
+def begin(name):
+    global CURRENT
+    if not ENABLED:
+        return None
+    CURRENT = Profile(name)
+    CURRENT.start()
+    return CURRENT
+
+
+#Function finishes measuring of a run started by begin
+def end(profile):
+    global CURRENT, LAST
+    if profile is None:
+        return
+    profile.stop()
+    if CURRENT is profile:
+        CURRENT = None
+    LAST = profile
+
+
+#Measures whole run
+@contextmanager
+def run(name):
+    profile = begin(name)
+    try:
+        yield profile
+    finally:
+        end(profile)
+
+
+@contextmanager
+def _measure(profile, name):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield
+    finally:
+        profile.add_stage(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+
+class _NoStage:
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+#Measures one stage of the current run
+def stage(name):
+    if CURRENT is None:
+        return _NO_STAGE
+    return _measure(CURRENT, name)
+
+
+#Adds amount to counter of the current run
+def count(name, amount):
+    if CURRENT is not None:
+        CURRENT.count(name, amount)
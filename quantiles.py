@@ -0,0 +1,133 @@
+import numpy as np
+
+#Percentile statistics of analysis values, without bpy
+#Values in memory get exact percentiles from one np.partition, values coming in chunks
+#(mesh store, worker processes) go to QuantileSketch, which keeps only counts of logarithmic
+#bins and can be merged; its percentiles are within SKETCH_ACCURACY of the exact ones
+#Both give the same dictionary: count, mean, min, max and p1, p5, p50, p95, p99
+
+PERCENTILES = (1, 5, 50, 95, 99)
+
+#Relative error of sketch percentiles
+SKETCH_ACCURACY = 0.01
+
+#Magnitudes below this count as zero in the sketch, magnitudes above it go to the last bin
+SKETCH_SMALLEST = 1e-9
+SKETCH_LARGEST = 1e9
+
+
+#Function calculates exact percentiles (0 - 100) of values, interpolated like np.percentile
+#All needed ranks are selected with one np.partition, the values are not sorted
+def percentiles(values, q=PERCENTILES):
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if len(values) == 0:
+        return np.zeros(len(q))
+    ranks = np.asarray(q, dtype=np.float64) / 100 * (len(values) - 1)
+    below = np.floor(ranks).astype(np.int64)
+    above = np.minimum(below + 1, len(values) - 1)
+    selected = np.partition(values, np.unique(np.concatenate([below, above])))
+    return selected[below] + (ranks - below) * (selected[above] - selected[below])
+
+
+#Function describes values: count, mean, min, max and percentiles
+def summary(values):
+    values = np.asarray(values).ravel()
+    if len(values) == 0:
+        return _summary(0, 0.0, 0.0, 0.0, np.zeros(len(PERCENTILES)))
+    return _summary(len(values), float(values.mean(dtype=np.float64)), float(values.min()), float(values.max()),
+                    percentiles(values))
+
+
+def _summary(count, mean, lowest, highest, values):
+    stats = {"count": int(count), "mean": mean, "min": lowest, "max": highest}
+    for q, value in zip(PERCENTILES, values):
+        stats["p%d" % q] = float(value)
+    return stats
+
+
+#Mergeable quantile sketch with relative error (DDSketch, Masson et al. 2019)
+#Magnitude x goes to bin ceil(log(x) / log(gamma)), negative and positive values have
+#their own bins, so every percentile is known up to SKETCH_ACCURACY of its value
+#Count, sum, min and max are kept exactly
+class QuantileSketch:
+
+    def __init__(self, accuracy=SKETCH_ACCURACY):
+        self.accuracy = accuracy
+        self._log_gamma = np.log((1 + accuracy) / (1 - accuracy))
+        self._first = int(np.floor(np.log(SKETCH_SMALLEST) / self._log_gamma))
+        nr_bins = int(np.ceil(np.log(SKETCH_LARGEST) / self._log_gamma)) - self._first + 1
+        self.negative = np.zeros(nr_bins, dtype=np.int64)
+        self.positive = np.zeros(nr_bins, dtype=np.int64)
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    #Function adds values to the sketch, values which are not finite are left out
+    #Returns the sketch, so a sketch can be made by QuantileSketch().add(values)
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        magnitude = np.abs(values)
+        small = magnitude < SKETCH_SMALLEST
+        self.zeros += int(np.count_nonzero(small))
+        bins = np.ceil(np.log(np.where(small, 1.0, magnitude)) / self._log_gamma).astype(np.int64) - self._first
+        bins = np.clip(bins, 0, len(self.positive) - 1)
+        for counts, side in ((self.negative, (values < 0) & ~small), (self.positive, (values > 0) & ~small)):
+            counts += np.bincount(bins[side], minlength=len(counts))
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self
+
+    #Function adds counts of another sketch with the same accuracy, returns the sketch
+    def merge(self, other):
+        if other.accuracy != self.accuracy:
+            raise ValueError("Sketches with different accuracy cannot be merged")
+        self.negative += other.negative
+        self.positive += other.positive
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    #Function returns sketch of absolute values, their sum is estimated from the bins
+    def magnitude(self):
+        sketch = QuantileSketch(self.accuracy)
+        sketch.positive = self.negative + self.positive
+        sketch.zeros = self.zeros
+        sketch.count = self.count
+        sketch.total = float((sketch._values() * sketch.positive).sum())
+        if self.count:
+            sketch.min = 0.0
+            sketch.max = max(abs(self.min), abs(self.max))
+            sketch.min = float(sketch.percentiles((0,))[0])
+        return sketch
+
+    #Representative value of every bin, its relative error is at most the accuracy
+    def _values(self):
+        gamma = np.exp(self._log_gamma)
+        return 2 * gamma ** (np.arange(len(self.positive)) + self._first) / (gamma + 1)
+
+    #Function estimates percentiles (0 - 100), like percentiles() without interpolation
+    def percentiles(self, q=PERCENTILES):
+        if self.count == 0:
+            return np.zeros(len(q))
+        values = self._values()
+        counts = np.concatenate([self.negative[::-1], [self.zeros], self.positive])
+        ordered = np.concatenate([-values[::-1], [0.0], values])
+        ranks = np.round(np.asarray(q, dtype=np.float64) / 100 * (self.count - 1))
+        found = ordered[np.searchsorted(np.cumsum(counts), ranks, side='right')]
+        return np.clip(found, self.min, self.max)
+
+    #Function describes added values like summary()
+    def summary(self):
+        if self.count == 0:
+            return summary(np.zeros(0))
+        return _summary(self.count, self.total / self.count, self.min, self.max, self.percentiles())
@@ -0,0 +1,277 @@
+import numpy as np
+
+from learn_computer_graphics import profiling
+
+#Curvature and torsion of Bezier and NURBS splines, without bpy
+#Splines are given by their control points concatenated for all splines, with offsets (CSR)
+#Every segment (Bezier segment between two points, NURBS knot span) is a polynomial,
+#its power basis coefficients come from the cubic Bezier basis matrix or, for NURBS spans,
+#from vectorised de Boor on homogeneous points and control points of their derivatives
+#at the start of the span (Taylor coefficients); segments are sampled at a density following
+#the turning of their control polygon and all samples are evaluated at once by Horner's rule
+#Curvature is |C' x C''| / |C'|^3 and torsion (C' x C'') . C''' / |C' x C''|^2, in 1 / length
+
+#Samples of a segment: one per this angle of turning of its control polygon, within the bounds
+SAMPLE_ANGLE = np.radians(5.0)
+SAMPLES_MIN = 4
+SAMPLES_MAX = 64
+
+#Cubic Bezier in power basis: C(t) = [1, t, t^2, t^3] @ BEZIER_MATRIX @ [P0, P1, P2, P3]
+BEZIER_MATRIX = np.array([
+    (1, 0, 0, 0),
+    (-3, 3, 0, 0),
+    (3, -6, 3, 0),
+    (-1, 3, -3, 1),
+], dtype=np.float64)
+
+
+#Function sums angles between consecutive legs of control polygons, (S, K, 3) points
+def polygon_turning(ctrl):
+    legs = np.diff(ctrl, axis=1)
+    a, b = legs[:, :-1], legs[:, 1:]
+    return np.arctan2(np.linalg.norm(np.cross(a, b), axis=2), np.einsum('ijk,ijk->ij', a, b)).sum(axis=1)
+
+
+#Function chooses number of sample intervals of every segment by turning of its control polygon
+#Returns parameters of all samples (0 - 1 within segment), segment of every sample and offsets
+def _samples(turning):
+    counts = np.clip(np.ceil(turning / SAMPLE_ANGLE), SAMPLES_MIN, SAMPLES_MAX).astype(np.int64)
+    offsets = np.r_[0, np.cumsum(counts + 1)]
+    segments = np.repeat(np.arange(len(counts)), counts + 1)
+    steps = np.arange(offsets[-1]) - offsets[segments]
+    return steps / counts[segments], segments, offsets
+
+
+#Function calculates curvature and torsion from the first three derivatives
+#Straight parts (C' x C'' = 0) get zero torsion, stationary points zero curvature
+def curvature_torsion(d1, d2, d3):
+    cross = np.cross(d1, d2)
+    cross_sq = np.einsum('ij,ij->i', cross, cross)
+    speed = np.linalg.norm(d1, axis=1)
+    curvature = np.divide(np.sqrt(cross_sq), speed ** 3, out=np.zeros(len(d1)), where=speed > 0)
+    torsion = np.divide(np.einsum('ij,ij->i', cross, d3), cross_sq, out=np.zeros(len(d1)),
+                        where=cross_sq > 1e-24 * np.maximum(speed, 1) ** 6)
+    return curvature, torsion
+
+
+#Function returns segments of Bezier splines as (S, 4, 3) control points
+#co, left and right are points and their handles of all splines, offsets their CSR offsets,
+#cyclic splines get one more segment from the last point to the first
+#Returns control points, spline and first point (within the spline) of every segment
+def bezier_segments(co, left, right, offsets, cyclic):
+    counts = np.diff(offsets)
+    spans = np.maximum(counts - 1 + (np.asarray(cyclic) & (counts > 1)), 0)
+    spline = np.repeat(np.arange(len(counts)), spans)
+    local = np.arange(int(spans.sum())) - np.repeat(np.cumsum(spans) - spans, spans)
+    first = offsets[spline] + local
+    second = offsets[spline] + (local + 1) % counts[spline]
+    ctrl = np.stack([co[first], right[first], left[second], co[second]], axis=1).astype(np.float64)
+    return ctrl, spline, local
+
+
+#Function evaluates polynomial segments at samples
+#coefficients are (S, K, D) power basis coefficients of segments, t parameters of samples
+#Returns values and first three derivatives
+def polynomial_derivatives(coefficients, segments, t):
+    #Every coefficient is gathered for the samples once, as contiguous (N, D) array
+    columns = [np.ascontiguousarray(coefficients[:, r])[segments] for r in range(coefficients.shape[1])]
+    t = t[:, None]
+    found = []
+    for order in range(4):
+        #Coefficients of the derivative: c_r * r! / (r - order)!
+        value = np.zeros((len(t), coefficients.shape[2]))
+        for r in range(len(columns) - 1, order - 1, -1):
+            factor = np.prod(np.arange(r - order + 1, r + 1))
+            value *= t
+            value += columns[r] if factor == 1 else factor * columns[r]
+        found.append(value)
+    return found
+
+
+#Function evaluates Bezier segments at samples
+#Returns points and first three derivatives
+def bezier_derivatives(ctrl, segments, t):
+    return polynomial_derivatives(np.einsum('ij,sjk->sik', BEZIER_MATRIX, ctrl), segments, t)
+
+
+#Function makes knots of NURBS spline like Blender (calcknots), uniform, endpoint or Bezier
+def nurbs_knots(nr_points, order, endpoint=False, bezier=False):
+    nr_knots = nr_points + order
+    if bezier and order in (3, 4):
+        #Inner knots repeated order - 1 times
+        if order == 4:
+            return np.floor(0.34 + np.arange(nr_knots) / 3.0)
+        steps = (np.arange(nr_knots) >= order) & (np.arange(nr_knots) <= nr_points)
+        return np.floor(0.6 + 0.5 * np.cumsum(steps))
+    if endpoint:
+        #First and last order knots equal, curve goes through the end points
+        return np.clip(np.arange(nr_knots) - order + 1, 0, nr_points - order + 1).astype(np.float64)
+    return np.arange(nr_knots, dtype=np.float64)
+
+
+#Function prepares NURBS splines of one order for batch evaluation
+#Cyclic splines get their first order - 1 points again at the end and uniform knots
+#Returns homogeneous control points, their offsets, knots and their offsets
+def _nurbs_arrays(co, offsets, order, cyclic, endpoint, bezier):
+    points, point_offsets, knots, knot_offsets = [], [0], [], [0]
+    for i in range(len(offsets) - 1):
+        spline = co[offsets[i]:offsets[i + 1]]
+        if cyclic[i]:
+            spline = np.concatenate([spline, spline[:order - 1]])
+            spline_knots = nurbs_knots(len(spline), order)
+        else:
+            spline_knots = nurbs_knots(len(spline), order, endpoint[i], bezier[i])
+        points.append(spline)
+        knots.append(spline_knots)
+        point_offsets.append(point_offsets[-1] + len(spline))
+        knot_offsets.append(knot_offsets[-1] + len(spline_knots))
+    points = np.concatenate(points).astype(np.float64)
+    #Blender keeps cartesian coordinates and weight, de Boor works on (w x, w y, w z, w)
+    homogeneous = np.concatenate([points[:, :3] * points[:, 3:], points[:, 3:]], axis=1)
+    return homogeneous, np.array(point_offsets), np.concatenate(knots), np.array(knot_offsets)
+
+
+#Function evaluates B-spline of given degree with de Boor's algorithm, point by point
+#first are (global) first control points, knot the (global) knots of spans of the points
+#Derivative level r uses control points of the r-th derivative and knots shifted by r,
+#both indexed like the original spline
+def _de_boor(ctrl, knots, degree, level, first, knot, t):
+    q = degree - level
+    if q < 0:
+        return np.zeros((len(t), ctrl.shape[1]))
+    d = [ctrl[first + j] for j in range(q + 1)]
+    for s in range(1, q + 1):
+        for j in range(q, s - 1, -1):
+            low = knots[knot - degree + j + level]
+            high = knots[knot + j + 1 - s]
+            alpha = ((t - low) / np.where(high > low, high - low, 1.0))[:, None]
+            d[j] = (1 - alpha) * d[j - 1] + alpha * d[j]
+    return d[q]
+
+
+#Function returns control points of the next derivative, in place of the spline points
+#Last level + 1 points of every spline are not used and stay zero
+def _derivative_points(ctrl, offsets, knots, knot_offsets, degree, level):
+    spline = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    local = np.arange(len(ctrl)) - offsets[spline]
+    knot = knot_offsets[spline] + local
+    valid = local < np.diff(offsets)[spline] - level - 1
+    result = np.zeros_like(ctrl)
+    g = np.flatnonzero(valid)
+    high = knots[knot[g] + degree + 1]
+    low = knots[knot[g] + level + 1]
+    scale = np.divide(degree - level, high - low, out=np.zeros(len(g)), where=high > low)
+    result[g] = scale[:, None] * (ctrl[g + 1] - ctrl[g])
+    return result
+
+
+#Function evaluates NURBS splines of one order at samples of their knot spans
+#Returns points and first three derivatives of samples, spline and first control point
+#(within the spline, points of cyclic splines wrap around) of every span and offsets of samples
+def _nurbs_order(co, offsets, order, cyclic, endpoint, bezier):
+    ctrl, point_offsets, knots, knot_offsets = _nurbs_arrays(co, offsets, order, cyclic, endpoint, bezier)
+    degree = order - 1
+
+    #Spans with positive length between knots degree and number of points
+    counts = np.diff(point_offsets)
+    spline = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(len(ctrl)) - point_offsets[spline]
+    knot = knot_offsets[spline] + local
+    span = (local >= degree) & (local < counts[spline])
+    span[span] &= knots[knot[span] + 1] > knots[knot[span]]
+    spans = np.flatnonzero(span)
+    span_knot = knot[spans]
+    span_first = spans - degree
+
+    #Turning of the cartesian control polygon of every span
+    cartesian = ctrl[:, :3] / ctrl[:, 3:]
+    polygon = cartesian[span_first[:, None] + np.arange(order)]
+    t, segments, sample_offsets = _samples(polygon_turning(polygon))
+
+    #Taylor coefficients of homogeneous spans at their start, A^(r)(u0) / r!
+    low, length = knots[span_knot], knots[span_knot + 1] - knots[span_knot]
+    coefficients = np.empty((len(spans), order, 4))
+    level_ctrl = ctrl
+    for level in range(order):
+        value = _de_boor(level_ctrl, knots, degree, level, span_first, span_knot, low)
+        #Parameter of the span goes from 0 to 1, so derivative r is scaled by length^r
+        coefficients[:, level] = value * (length ** level / np.prod(np.arange(1, level + 1)))[:, None]
+        if level < degree:
+            level_ctrl = _derivative_points(level_ctrl, point_offsets, knots, knot_offsets, degree, level)
+
+    #Homogeneous samples, then cartesian derivatives by the quotient rule
+    h = polynomial_derivatives(coefficients, segments, t)
+    w = [value[:, 3:] for value in h]
+    a = [value[:, :3] for value in h]
+    c0 = a[0] / w[0]
+    c1 = (a[1] - w[1] * c0) / w[0]
+    c2 = (a[2] - 2 * w[1] * c1 - w[2] * c0) / w[0]
+    c3 = (a[3] - 3 * w[1] * c2 - 3 * w[2] * c1 - w[3] * c0) / w[0]
+    return c0, c1, c2, c3, spline[spans], local[span_first], sample_offsets
+
+
+#Function collects per-sample and per-segment results: spline, index and first control point
+#of every segment, offsets of its samples, points, curvature and torsion of samples (float32),
+#largest curvature of every segment and segments flagged above the limit
+def _result(points, d1, d2, d3, segment_spline, segment_first, sample_offsets, limit):
+    curvature, torsion = curvature_torsion(d1, d2, d3)
+    counts = np.diff(sample_offsets)
+    #Segment index within its spline
+    starts = np.r_[0, np.flatnonzero(np.diff(segment_spline)) + 1]
+    segment_index = np.arange(len(segment_spline)) - np.repeat(starts, np.diff(np.r_[starts, len(segment_spline)])) \
+        if len(segment_spline) else np.zeros(0, dtype=np.int64)
+    max_curvature = np.maximum.reduceat(curvature, sample_offsets[:-1]) if len(counts) else np.zeros(0)
+    return {
+        "segment_spline": segment_spline.astype(np.int32),
+        "segment_index": segment_index.astype(np.int32),
+        "segment_first": segment_first.astype(np.int32),
+        "sample_offsets": sample_offsets.astype(np.int32),
+        "points": points.astype(np.float32),
+        "curvature": curvature.astype(np.float32),
+        "torsion": torsion.astype(np.float32),
+        "max_curvature": max_curvature.astype(np.float32),
+        "flagged": np.flatnonzero(max_curvature > limit).astype(np.int32),
+    }
+
+
+#Function analyses Bezier splines, see bezier_segments for the input
+#Segments with curvature above the limit somewhere are flagged
+def bezier_analysis(co, left, right, offsets, cyclic, limit=np.inf):
+    offsets = np.asarray(offsets, dtype=np.int64)
+    ctrl, segment_spline, segment_first = bezier_segments(np.asarray(co), np.asarray(left), np.asarray(right), offsets,
+                                           np.asarray(cyclic, dtype=bool))
+    t, segments, sample_offsets = _samples(polygon_turning(ctrl))
+    points, d1, d2, d3 = bezier_derivatives(ctrl, segments, t)
+    profiling.count("curve samples", len(t))
+    return _result(points, d1, d2, d3, segment_spline, segment_first, sample_offsets, limit)
+
+
+#Function analyses NURBS splines
+#co are (P, 4) points with weights, offsets their CSR offsets, orders, cyclic, endpoint and
+#bezier flags are given for every spline; splines of one order are evaluated together
+#Segments are knot spans, segment_index is the span within the spline
+def nurbs_analysis(co, offsets, orders, cyclic, endpoint, bezier, limit=np.inf):
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 4)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    #Order cannot be larger than number of points, splines with less than two points give nothing
+    orders = np.minimum(np.asarray(orders), counts)
+    flags = [np.asarray(flag, dtype=bool) for flag in (cyclic, endpoint, bezier)]
+    parts = []
+    for order in np.unique(orders[orders >= 2]):
+        splines = np.flatnonzero(orders == order)
+        points = np.concatenate([co[offsets[i]:offsets[i + 1]] for i in splines])
+        part_offsets = np.r_[0, np.cumsum(counts[splines])]
+        found = _nurbs_order(points, part_offsets, int(order), *(flag[splines] for flag in flags))
+        parts.append(found[:4] + (splines[found[4]],) + found[5:])
+
+    #Segments of one spline follow each other, every spline is in one part
+    if not parts:
+        empty = np.zeros((0, 3))
+        none = np.zeros(0, dtype=np.int64)
+        return _result(empty, empty, empty, empty, none, none, np.zeros(1, dtype=np.int64), limit)
+    shifts = np.cumsum([0] + [part[6][-1] for part in parts[:-1]])
+    sample_offsets = np.concatenate([[0]] + [part[6][1:] + shift for part, shift in zip(parts, shifts)])
+    values = [np.concatenate([part[i] for part in parts]) for i in range(6)]
+    profiling.count("curve samples", sample_offsets[-1])
+    return _result(*values, sample_offsets, limit)
@@ -0,0 +1,636 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+
+import numpy as np
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import curvature
+from learn_computer_graphics import loaders
+from learn_computer_graphics import profiling
+from learn_computer_graphics import quantiles
+from learn_computer_graphics.core import MeshArrays
+
+#Compact on-disk mesh store for very large meshes, without bpy
+#Mesh file is converted once per asset into a directory of .npy files:
+#float32 positions, int32 CSR topology and derived tables (edges, normals, sweep order)
+#Files are memory-mapped, analyses below read them in chunks of STORE_CHUNK elements,
+#so only touched pages are loaded and working memory does not grow with the mesh
+#(results stay proportional to found issues)
+#OBJ and PLY files are converted out of core: they are streamed in chunks (see loaders.py)
+#and tables are built by spilling records to bucket files sorted one by one
+
+STORE_VERSION = 2
+STORE_EXTENSION = '.mesh'
+STORE_CHUNK = 1 << 20
+
+#Limit of bucket files open at once while tables are built
+MAX_BUCKETS = 256
+
+#Vertices sampled per slab of the sweep order, bounds of the slabs are their percentiles
+SWEEP_SAMPLES = 64
+
+_BASE = ('verts', 'face_offsets', 'face_verts')
+_TABLES = ('edges', 'loop_edges', 'edge_face_count', 'vertex_normals', 'sweep_order', 'sweep_co')
+
+
+#Function returns directory of the store of the mesh file
+#Without directory the store is kept next to the file
+def store_path(path, directory=None):
+    if directory:
+        return os.path.join(directory, os.path.basename(path) + STORE_EXTENSION)
+    return path + STORE_EXTENSION
+
+
+#Size and modification time identify the version of the source file
+def _source_info(path):
+    stat = os.stat(path)
+    return {"source": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def _read_info(target):
+    try:
+        with open(os.path.join(target, "info.json")) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+#Function checks if the store was made from the current version of the source file
+def is_current(target, path):
+    info = _read_info(target)
+    if info is None or info.get("version") != STORE_VERSION:
+        return False
+    source = _source_info(path)
+    return info.get("size") == source["size"] and info.get("mtime") == source["mtime"]
+
+
+#Function maps progress of a part of the work to the range start - end of the whole work
+def _part(progress, start, end):
+    if progress is None:
+        return None
+    return lambda done: progress(start + (end - start) * done)
+
+
+def _chunks(size, chunk):
+    for start in range(0, size, chunk):
+        yield start, min(start + chunk, size)
+
+
+#Faces are taken in chunks of about chunk loops, every face lies whole in one chunk
+def _face_chunks(mesh, chunk):
+    first = 0
+    while first < mesh.nr_faces:
+        last = int(np.searchsorted(mesh.face_offsets, int(mesh.face_offsets[first]) + chunk, side='right')) - 1
+        last = min(max(last, first + 1), mesh.nr_faces)
+        yield first, last
+        first = last
+
+
+#Function returns faces first - last as a mesh sharing vertices with the whole mesh
+#Its loop index plus the returned start is the loop index in the whole mesh
+def _face_part(mesh, first, last):
+    offsets = np.asarray(mesh.face_offsets[first:last + 1], dtype=np.int64)
+    start = int(offsets[0])
+    return MeshArrays(mesh.verts, offsets - start, mesh.face_verts[start:int(offsets[-1])]), start
+
+
+#.npy file written in parts, the header is written again with the final length
+class _NpyWriter:
+
+    HEADER_SIZE = 128
+
+    def __init__(self, path, dtype, columns=None):
+        self.dtype = np.dtype(dtype)
+        self.columns = columns
+        self.length = 0
+        self.file = open(path, 'wb')
+        self.file.write(b' ' * self.HEADER_SIZE)
+
+    def append(self, array):
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+        self.file.write(array.tobytes())
+        self.length += len(array)
+
+    def close(self):
+        shape = (self.length,) if self.columns is None else (self.length, self.columns)
+        header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (self.dtype.str, shape)
+        header = header.ljust(self.HEADER_SIZE - 11) + "\n"
+        self.file.seek(0)
+        self.file.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1'))
+        self.file.close()
+
+
+#Records spilled to bucket files, buckets are read back one by one
+#Records keep their order inside a bucket
+class _Spill:
+
+    def __init__(self, directory, nr_buckets, dtype):
+        self.dtype = np.dtype(dtype)
+        self.paths = [os.path.join(directory, "bucket_%d.bin" % i) for i in range(nr_buckets)]
+        self.files = [open(path, 'wb') for path in self.paths]
+
+    def append(self, buckets, records):
+        order = np.argsort(buckets, kind='stable')
+        bounds = np.searchsorted(buckets[order], np.arange(len(self.files) + 1))
+        records = records[order]
+        for i in np.flatnonzero(np.diff(bounds)):
+            self.files[i].write(records[bounds[i]:bounds[i + 1]].tobytes())
+
+    def buckets(self):
+        for file in self.files:
+            file.close()
+        for path in self.paths:
+            records = np.fromfile(path, self.dtype)
+            os.remove(path)
+            yield records
+
+
+def _nr_buckets(size, chunk):
+    return int(min(max(1, -(-size // chunk)), MAX_BUCKETS))
+
+
+def _load(target, name):
+    return np.load(os.path.join(target, name + ".npy"), mmap_mode='r')
+
+
+#Function builds edge tables by external sort of edge keys of all loops
+#Buckets are ranges of the lower vertex index, so edges of following buckets follow in key order
+#and edges get the same indices as in MeshArrays
+def _edge_tables(target, mesh, scratch, chunk, progress):
+    nr_verts = max(mesh.nr_verts, 1)
+    nr_buckets = _nr_buckets(mesh.nr_loops, chunk)
+    spill = _Spill(scratch, nr_buckets, [('key', '<i8'), ('loop', '<i4')])
+    for first, last in _face_chunks(mesh, chunk):
+        part, start = _face_part(mesh, first, last)
+        a = part.face_verts
+        b = a[part.loop_next]
+        low = np.minimum(a, b).astype(np.int64)
+        records = np.empty(part.nr_loops, spill.dtype)
+        records['key'] = low * nr_verts + np.maximum(a, b)
+        records['loop'] = start + np.arange(part.nr_loops)
+        spill.append(low * nr_buckets // nr_verts, records)
+        if progress is not None:
+            progress(0.5 * last / mesh.nr_faces)
+
+    edges = _NpyWriter(os.path.join(target, "edges.npy"), np.int32, 2)
+    counts = _NpyWriter(os.path.join(target, "edge_face_count.npy"), np.int32)
+    loop_edges = np.lib.format.open_memmap(os.path.join(target, "loop_edges.npy"), 'w+', np.int32, (mesh.nr_loops,))
+    nr_edges = 0
+    for i, records in enumerate(spill.buckets()):
+        keys, inverse, count = np.unique(records['key'], return_inverse=True, return_counts=True)
+        edges.append(np.stack([keys // nr_verts, keys % nr_verts], axis=1))
+        counts.append(count)
+        loop_edges[records['loop']] = nr_edges + inverse.reshape(-1)
+        nr_edges += len(keys)
+        if progress is not None:
+            progress(0.5 + 0.5 * (i + 1) / nr_buckets)
+    edges.close()
+    counts.close()
+    loop_edges.flush()
+    return nr_edges
+
+
+#Function sums area weighted face normals in vertices like MeshArrays.vertex_normals
+#Sums are kept in a memory-mapped scratch file
+def _vertex_normals(target, mesh, scratch, chunk, progress):
+    sums = np.lib.format.open_memmap(os.path.join(scratch, "normal_sums.npy"), 'w+', np.float64, (mesh.nr_verts, 3))
+    for first, last in _face_chunks(mesh, chunk):
+        part, _ = _face_part(mesh, first, last)
+        order = np.argsort(part.face_verts, kind='stable')
+        verts = part.face_verts[order]
+        starts = np.flatnonzero(np.r_[True, verts[1:] != verts[:-1]])
+        sums[verts[starts]] += np.add.reduceat(part._face_cross[part.loop_faces[order]], starts, axis=0)
+        if progress is not None:
+            progress(0.8 * last / mesh.nr_faces)
+
+    normals = _NpyWriter(os.path.join(target, "vertex_normals.npy"), np.float32, 3)
+    for start, end in _chunks(mesh.nr_verts, chunk):
+        part = np.asarray(sums[start:end])
+        length = np.linalg.norm(part, axis=1)[:, None]
+        normals.append(np.divide(part, length, out=np.zeros_like(part), where=length > 0))
+    normals.close()
+    del sums
+    if progress is not None:
+        progress(1.0)
+
+
+#Function sorts vertices along the longest axis of the bounding box (like MeshArrays.sweep_axis)
+#by spilling them to slabs of the axis
+#Slabs are bounded by percentiles of a sample of vertices, so they hold about equal numbers
+#of vertices also when the vertices are crowded in a part of the range
+#Vertices keep their order inside a slab, so the order is the same as stable argsort
+#Returns the axis
+def _sweep_tables(target, mesh, scratch, chunk, progress):
+    nr_buckets = _nr_buckets(mesh.nr_verts, chunk)
+    step = max(1, mesh.nr_verts // (nr_buckets * SWEEP_SAMPLES))
+    lowest = np.full(3, np.inf, dtype=np.float32)
+    highest = np.full(3, -np.inf, dtype=np.float32)
+    samples = []
+    for start, end in _chunks(mesh.nr_verts, chunk):
+        part = np.asarray(mesh.verts[start:end])
+        lowest = np.minimum(lowest, part.min(axis=0))
+        highest = np.maximum(highest, part.max(axis=0))
+        samples.append(part[-start % step::step])
+    axis = int(np.argmax(highest - lowest)) if mesh.nr_verts else 0
+
+    sample = np.concatenate(samples)[:, axis] if samples else np.zeros(0, dtype=np.float32)
+    bounds = quantiles.percentiles(sample, np.linspace(0, 100, nr_buckets + 1)[1:-1]).astype(np.float32)
+    spill = _Spill(scratch, nr_buckets, [('co', '<f4'), ('vert', '<i4')])
+    for start, end in _chunks(mesh.nr_verts, chunk):
+        records = np.empty(end - start, spill.dtype)
+        records['co'] = mesh.verts[start:end, axis]
+        records['vert'] = np.arange(start, end)
+        spill.append(np.searchsorted(bounds, records['co'], side='right'), records)
+
+    order = _NpyWriter(os.path.join(target, "sweep_order.npy"), np.int32)
+    sweep_co = _NpyWriter(os.path.join(target, "sweep_co.npy"), np.float32)
+    for i, records in enumerate(spill.buckets()):
+        records = records[np.argsort(records['co'], kind='stable')]
+        order.append(records['vert'])
+        sweep_co.append(records['co'])
+        if progress is not None:
+            progress((i + 1) / nr_buckets)
+    order.close()
+    sweep_co.close()
+    return axis
+
+
+#Function computes MeshArrays.digest reading the arrays in chunks
+def _digest(mesh, chunk):
+    content = hashlib.blake2b(digest_size=16)
+    for array in (mesh.verts, mesh.face_offsets, mesh.face_verts):
+        content.update(str(array.shape).encode())
+        for start, end in _chunks(len(array), chunk):
+            content.update(np.ascontiguousarray(array[start:end]).data)
+    return content.hexdigest()
+
+
+#Function prepares empty temporary directory of the store
+def _temporary(target):
+    temporary = target + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    return temporary
+
+
+#Function builds tables of mesh arrays written to temporary directory
+#and moves the finished store in place of the target
+#info.json is written last, so a store broken by an interrupted conversion is never used
+def _finish(temporary, target, info, chunk, progress=None, tables=_TABLES):
+    mesh = MeshArrays(*[_load(temporary, name) for name in _BASE])
+    scratch = os.path.join(temporary, "scratch")
+    os.makedirs(scratch)
+    with profiling.stage("edge tables"):
+        nr_edges = _edge_tables(temporary, mesh, scratch, chunk, _part(progress, 0.0, 0.5))
+    with profiling.stage("vertex normals"):
+        _vertex_normals(temporary, mesh, scratch, chunk, _part(progress, 0.5, 0.8))
+    if 'sweep_order' in tables:
+        with profiling.stage("sweep order"):
+            axis = _sweep_tables(temporary, mesh, scratch, chunk, _part(progress, 0.8, 1.0))
+        info = dict(info or {}, sweep_axis=axis)
+    shutil.rmtree(scratch)
+
+    info = dict(info or {}, version=STORE_VERSION, digest=_digest(mesh, chunk),
+                verts=mesh.nr_verts, faces=mesh.nr_faces, loops=mesh.nr_loops, edges=nr_edges)
+    del mesh
+    with open(os.path.join(temporary, "info.json"), 'w') as file:
+        json.dump(info, file, indent=2)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(temporary, target)
+
+
+#Function writes mesh with its tables into the store directory
+#Tables of mesh in memory are computed by MeshArrays
+def save(mesh, target, info=None):
+    temporary = _temporary(target)
+    arrays = {name: getattr(mesh, name) for name in _BASE + _TABLES}
+    for name, array in arrays.items():
+        np.save(os.path.join(temporary, name + ".npy"), array)
+
+    info = dict(info or {}, version=STORE_VERSION, digest=mesh.digest, sweep_axis=mesh.sweep_axis,
+                verts=mesh.nr_verts, faces=mesh.nr_faces, loops=mesh.nr_loops, edges=mesh.nr_edges)
+    with open(os.path.join(temporary, "info.json"), 'w') as file:
+        json.dump(info, file, indent=2)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(temporary, target)
+
+
+#Function maps mesh store, arrays are read from disk when they are used
+def open_store(target):
+    info = _read_info(target)
+    if info is None or info.get("version") != STORE_VERSION:
+        raise ValueError("Not a mesh store: " + target)
+    mesh = MeshArrays(*[_load(target, name) for name in _BASE])
+    tables = {name: _load(target, name) for name in _TABLES if os.path.exists(os.path.join(target, name + ".npy"))}
+    if "sweep_axis" in info:
+        tables["sweep_axis"] = info["sweep_axis"]
+    mesh.set_tables(digest=info["digest"], **tables)
+    return mesh
+
+
+#Function streams OBJ or PLY file into .npy files of the temporary directory
+def _stream(path, temporary, chunk, progress):
+    verts = _NpyWriter(os.path.join(temporary, "verts.npy"), np.float32, 3)
+    offsets = _NpyWriter(os.path.join(temporary, "face_offsets.npy"), np.int32)
+    face_verts = _NpyWriter(os.path.join(temporary, "face_verts.npy"), np.int32)
+    offsets.append(np.zeros(1))
+    nr_loops = 0
+    for part in loaders.stream_mesh(path, chunk, progress):
+        if part[0] == "verts":
+            verts.append(part[1])
+        else:
+            _, sizes, loop_verts = part
+            offsets.append(nr_loops + np.cumsum(sizes, dtype=np.int64))
+            nr_loops += int(sizes.sum())
+            face_verts.append(loop_verts)
+    for writer in (verts, offsets, face_verts):
+        writer.close()
+
+
+#Function makes store of the mesh file and returns its directory
+#The file is converted only when the store is missing or older than the file
+#OBJ and PLY files are streamed, other formats are loaded in memory once
+def convert(path, directory=None, chunk=STORE_CHUNK, progress=None):
+    target = store_path(path, directory)
+    if is_current(target, path):
+        return target
+    with profiling.stage("convert"):
+        if path.lower().endswith(loaders.STREAM_EXTENSIONS):
+            temporary = _temporary(target)
+            with profiling.stage("read file"):
+                _stream(path, temporary, chunk, _part(progress, 0.0, 0.5))
+            _finish(temporary, target, _source_info(path), chunk, _part(progress, 0.5, 1.0))
+        else:
+            save(loaders.load_mesh(path), target, _source_info(path))
+    return target
+
+
+#Function writes store of the mesh with replicated vertices merged, like analysis.welded
+#Vertex indices are kept and merged vertices stay unused, edges get the same order
+#Store is kept inside the store of the mesh and made again for other distance
+def weld(target, clusters, distance=analysis.MERGE_DISTANCE, chunk=STORE_CHUNK, progress=None):
+    welded_target = os.path.join(target, "welded")
+    info = _read_info(welded_target)
+    if info is not None and info.get("version") == STORE_VERSION and info.get("distance") == distance:
+        return welded_target
+
+    mesh = open_store(target)
+    temporary = _temporary(welded_target)
+    try:
+        os.link(os.path.join(target, "verts.npy"), os.path.join(temporary, "verts.npy"))
+    except OSError:
+        shutil.copyfile(os.path.join(target, "verts.npy"), os.path.join(temporary, "verts.npy"))
+
+    vertices = clusters["vertices"]
+    targets = clusters["targets"]
+    offsets = _NpyWriter(os.path.join(temporary, "face_offsets.npy"), np.int32)
+    face_verts = _NpyWriter(os.path.join(temporary, "face_verts.npy"), np.int32)
+    offsets.append(np.zeros(1))
+    nr_loops = 0
+    for first, last in _face_chunks(mesh, chunk):
+        part, _ = _face_part(mesh, first, last)
+        loop_verts = part.face_verts.copy()
+        if len(vertices):
+            position = np.minimum(np.searchsorted(vertices, loop_verts), len(vertices) - 1)
+            merged = vertices[position] == loop_verts
+            loop_verts[merged] = targets[position[merged]]
+
+        keep_loop = loop_verts != loop_verts[part.loop_prev]
+        sizes = np.add.reduceat(keep_loop.astype(np.int32), part.face_offsets[:-1])
+        sizes[part.face_sizes == 0] = 0
+        keep_face = sizes >= 3
+        keep_loop &= keep_face[part.loop_faces]
+        offsets.append(nr_loops + np.cumsum(sizes[keep_face], dtype=np.int64))
+        nr_loops += int(sizes[keep_face].sum())
+        face_verts.append(loop_verts[keep_loop])
+        if progress is not None:
+            progress(0.3 * last / mesh.nr_faces)
+    offsets.close()
+    face_verts.close()
+    del mesh
+
+    _finish(temporary, welded_target, {"distance": distance}, chunk, _part(progress, 0.3, 1.0),
+            tables=('edges', 'loop_edges', 'edge_face_count', 'vertex_normals'))
+    return welded_target
+
+
+####################################################
+#Chunked analyses
+#They give the same results as functions of analysis.py,
+#but never build tables of the size of the whole mesh
+
+
+#Function finds boundary edges and vertices of edges not shared by exactly two faces
+def boundary(mesh, chunk=STORE_CHUNK, progress=None):
+    boundary_edges = []
+    non_manifold = []
+    count = mesh.edge_face_count
+    for start, end in _chunks(mesh.nr_edges, chunk):
+        part = np.asarray(count[start:end])
+        boundary_edges.append(start + np.flatnonzero(part == 1))
+        non_manifold.append(np.unique(mesh.edges[start:end][part != 2]))
+        if progress is not None:
+            progress(end / mesh.nr_edges)
+    profiling.count("edges processed", mesh.nr_edges)
+    empty = np.zeros(0, dtype=np.int32)
+    return {
+        "boundary_edges": np.concatenate(boundary_edges).astype(np.int32) if boundary_edges else empty,
+        "non_manifold": np.unique(np.concatenate(non_manifold)).astype(np.int32) if non_manifold else empty,
+    }
+
+
+#Function chains boundary edges into holes like analysis.holes
+#Only boundary loops and corners of faces at their vertices are kept in memory,
+#corners are grouped into fans and edges chained by analysis.chain_boundary
+#Faces are not turned back like in analysis.boundary_loops, it needs the whole mesh:
+#holes touching in one vertex of faces turned against their neighbours can be joined
+def holes(mesh, chunk=STORE_CHUNK, progress=None):
+    count = mesh.edge_face_count
+    half_edges = []
+    for first, last in _face_chunks(mesh, chunk):
+        part, start = _face_part(mesh, first, last)
+        boundary_loops = np.flatnonzero(count[mesh.loop_edges[start:start + part.nr_loops]] == 1)
+        half_edges.append((start + boundary_loops, start + part.loop_next[boundary_loops],
+                           part.face_verts[boundary_loops], part.face_verts[part.loop_next[boundary_loops]]))
+        if progress is not None:
+            progress(0.4 * last / mesh.nr_faces)
+    if sum(len(h[0]) for h in half_edges) == 0:
+        return analysis.hole_stats(mesh.verts, np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32))
+    loops, next_loops, start_verts, end_verts = [np.concatenate(h) for h in zip(*half_edges)]
+    verts = np.unique(np.concatenate([start_verts, end_verts]))
+
+    #Corners at vertices of boundary edges with edges on both sides of the corner
+    corners = []
+    for first, last in _face_chunks(mesh, chunk):
+        part, start = _face_part(mesh, first, last)
+        position = np.minimum(np.searchsorted(verts, part.face_verts), len(verts) - 1)
+        at_boundary = np.flatnonzero(verts[position] == part.face_verts)
+        corners.append((start + at_boundary, part.face_verts[at_boundary], mesh.loop_edges[start + at_boundary],
+                        mesh.loop_edges[start + part.loop_prev[at_boundary]]))
+        if progress is not None:
+            progress(0.4 + 0.4 * last / mesh.nr_faces)
+    corner_loops, corner_verts, corner_edges, prev_edges = [np.concatenate(c) for c in zip(*corners)]
+    fans = analysis.corner_fans(corner_verts, np.stack([corner_edges, prev_edges], axis=1), count)
+
+    ends = np.searchsorted(corner_loops, np.stack([loops, next_loops], axis=1))
+    result = analysis.hole_stats(mesh.verts, *analysis.chain_boundary(np.stack([start_verts, end_verts], axis=1),
+                                                                      fans[ends]))
+    if progress is not None:
+        progress(1.0)
+    return result
+
+
+#Function finds pairs of replicated vertices by a sweep along the longest axis of the mesh,
+#so flat meshes are not cut into slabs across their thin side
+#Vertices sorted along the axis are taken in slabs, every slab is extended by vertices
+#lying closer than distance along the axis and searched with the grid of analysis.py
+#Pair is kept when its first vertex lies in the slab, so every pair is found once
+def duplicate_pairs(mesh, distance=analysis.MERGE_DISTANCE, chunk=STORE_CHUNK, progress=None):
+    order = mesh.sweep_order
+    sweep_co = mesh.sweep_co
+    first = []
+    second = []
+    for start, end in _chunks(mesh.nr_verts, chunk):
+        extended = int(np.searchsorted(sweep_co, float(sweep_co[end - 1]) + distance, side='right'))
+        window = np.asarray(order[start:extended])
+        i, j = analysis.duplicate_pairs(mesh.verts[window], distance)
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        keep = i < end - start
+        first.append(window[i[keep]])
+        second.append(window[j[keep]])
+        if progress is not None:
+            progress(end / mesh.nr_verts)
+    empty = np.zeros(0, dtype=np.int64)
+    i = np.concatenate(first).astype(np.int64) if first else empty
+    j = np.concatenate(second).astype(np.int64) if second else empty
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+#Function describes clusters of replicated vertices like analysis.duplicate_clusters
+#Targets are given only for merged vertices ("vertices"), not for the whole mesh
+def duplicate_clusters(mesh, distance=analysis.MERGE_DISTANCE, chunk=STORE_CHUNK, progress=None):
+    i, j = duplicate_pairs(mesh, distance, chunk, progress)
+    profiling.count("vertices tested", mesh.nr_verts)
+    involved = np.unique(np.concatenate([i, j]))
+    labels = analysis._cluster_labels(len(involved), np.searchsorted(involved, i), np.searchsorted(involved, j))
+    targets = involved[labels]
+    merged = involved != targets
+    representatives, members = np.unique(targets[merged], return_counts=True)
+
+    spread = np.zeros(len(representatives))
+    if len(representatives):
+        cluster = np.searchsorted(representatives, targets)
+        co = mesh.verts[involved].astype(np.float64)
+        lowest = np.full((len(representatives), 3), np.inf)
+        highest = np.full((len(representatives), 3), -np.inf)
+        np.minimum.at(lowest, cluster, co)
+        np.maximum.at(highest, cluster, co)
+        spread = np.linalg.norm(highest - lowest, axis=1)
+
+    return {
+        "vertices": involved[merged].astype(np.int32),
+        "targets": targets[merged].astype(np.int32),
+        "representatives": representatives.astype(np.int32),
+        "sizes": (members + 1).astype(np.int32),
+        "spread": spread,
+        "removed": int(np.count_nonzero(merged)),
+    }
+
+
+#Function returns mask of vertices from start to end which are not among sorted merged vertices
+def _kept(merged, start, end):
+    keep = np.ones(end - start, dtype=bool)
+    keep[merged[np.searchsorted(merged, start):np.searchsorted(merged, end)] - start] = False
+    return keep
+
+
+#Function calculates relative mean curvature of every vertex like curvature.vertex_curvature,
+#the curvature painted by analyse_curves
+#Cotangent Laplacian and mixed areas are summed face chunk by face chunk in memory-mapped
+#scratch files, then curvature is accumulated vertex chunk by vertex chunk in a quantile sketch
+#merged are the sorted vertices merged into others by weld, they are left out like in
+#analysis.welded
+#Returns summary of the curvature
+def mean_curvature(target, merged=(), chunk=STORE_CHUNK, progress=None):
+    mesh = open_store(target)
+    merged = np.asarray(merged, dtype=np.int64)
+    scratch = _temporary(os.path.join(target, "curvature"))
+    try:
+        laplacian = np.lib.format.open_memmap(os.path.join(scratch, "laplacian.npy"), 'w+', np.float64, (mesh.nr_verts, 3))
+        area = np.lib.format.open_memmap(os.path.join(scratch, "area.npy"), 'w+', np.float64, (mesh.nr_verts,))
+        for first, last in _face_chunks(mesh, chunk):
+            #Faces of the chunk get their own vertices, sums are added to the used ones
+            part, _ = _face_part(mesh, first, last)
+            used, local = np.unique(part.face_verts, return_inverse=True)
+            compact = MeshArrays(np.asarray(mesh.verts[used]), part.face_offsets, local.astype(np.int32))
+            corners = curvature.triangle_corners(compact)
+            laplacian[used] += curvature.mean_curvature_normals(compact, corners)
+            area[used] += curvature.mixed_areas(compact, corners)
+            if progress is not None:
+                progress(0.8 * last / mesh.nr_faces)
+
+        lowest = np.full(3, np.inf, dtype=np.float32)
+        highest = np.full(3, -np.inf, dtype=np.float32)
+        for start, end in _chunks(mesh.nr_verts, chunk):
+            part = np.asarray(mesh.verts[start:end])[_kept(merged, start, end)]
+            if len(part):
+                lowest = np.minimum(lowest, part.min(axis=0))
+                highest = np.maximum(highest, part.max(axis=0))
+        diagonal = float(np.linalg.norm(highest.astype(np.float64) - lowest)) if np.all(lowest <= highest) else 0.0
+
+        sketch = quantiles.QuantileSketch()
+        for start, end in _chunks(mesh.nr_verts, chunk):
+            keep = _kept(merged, start, end)
+            part_area = np.asarray(area[start:end])[keep]
+            normals = np.asarray(mesh.vertex_normals[start:end], dtype=np.float64)[keep]
+            projected = np.einsum('ij,ij->i', laplacian[start:end][keep], normals)
+            sketch.add(np.divide(0.5 * projected, part_area, out=np.zeros(len(part_area)), where=part_area > 0) * diagonal)
+            if progress is not None:
+                progress(0.8 + 0.2 * end / mesh.nr_verts)
+        profiling.count("vertices processed", sketch.count)
+        del laplacian, area
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return sketch.summary()
+
+
+#Function runs chunked checks of the store and returns plain dictionary like analysis.mesh_report
+#Results match merge_verts (replicated vertices), gaps_on (holes) and analyse_curves
+#(relative mean curvature of vertices of the mesh with replicated vertices merged,
+#percentiles from a sketch within quantiles.SKETCH_ACCURACY)
+#Interior faces need the tree of the whole mesh, so they are not part of it
+def store_report(target, distance=analysis.MERGE_DISTANCE, chunk=STORE_CHUNK, progress=None):
+    mesh = open_store(target)
+    with profiling.stage("duplicate clusters"):
+        clusters = duplicate_clusters(mesh, distance, chunk, _part(progress, 0.0, 0.2))
+    with profiling.stage("boundary"):
+        gaps = boundary(mesh, chunk, _part(progress, 0.2, 0.3))
+    with profiling.stage("holes"):
+        hole_stats = holes(mesh, chunk, _part(progress, 0.3, 0.5))
+    with profiling.stage("weld"):
+        welded = weld(target, clusters, distance, chunk, _part(progress, 0.5, 0.9))
+    with profiling.stage("curvature"):
+        stats = mean_curvature(welded, clusters["vertices"], chunk, _part(progress, 0.9, 1.0))
+    return {
+        "verts": mesh.nr_verts,
+        "edges": mesh.nr_edges,
+        "faces": mesh.nr_faces,
+        "gaps": {
+            "boundary_edges": int(len(gaps["boundary_edges"])),
+            "non_manifold_verts": int(len(gaps["non_manifold"])),
+            "holes": int(len(hole_stats["vertex_count"])),
+            "largest_hole_verts": int(hole_stats["vertex_count"].max()) if len(hole_stats["vertex_count"]) else 0,
+            "max_perimeter": float(hole_stats["perimeter"].max()) if len(hole_stats["perimeter"]) else 0.0,
+            "total_area": float(hole_stats["area"].sum()),
+        },
+        "replicated_vertices": {
+            "removed": clusters["removed"],
+            "clusters": int(len(clusters["sizes"])),
+            "largest_cluster": int(clusters["sizes"].max()) if len(clusters["sizes"]) else 0,
+            "max_spread": float(clusters["spread"].max()) if len(clusters["spread"]) else 0.0,
+        },
+        "curvature": stats,
+    }
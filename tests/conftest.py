@@ -0,0 +1,15 @@
+import importlib.util
+import os
+import sys
+
+#Tests import the add-on as learn_computer_graphics, the name it has inside Blender
+#Root of the repository is the package, it is registered once without bpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "learn_computer_graphics" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("learn_computer_graphics", os.path.join(ROOT, "__init__.py"),
+                                                  submodule_search_locations=[ROOT])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["learn_computer_graphics"] = module
+    spec.loader.exec_module(module)
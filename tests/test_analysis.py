@@ -0,0 +1,315 @@
+import time
+
+import numpy as np
+import pytest
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import benchmark
+from learn_computer_graphics.core import MeshArrays
+
+
+def points(verts):
+    return MeshArrays(np.asarray(verts, dtype=np.float32), np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32))
+
+
+def turned(faces, which):
+    faces = [list(face) for face in faces]
+    for face in which:
+        faces[face] = faces[face][::-1]
+    return faces
+
+
+#Grid of n x n quads without the quads given by their (row, column)
+def grid(n, missing):
+    verts = np.array([[x, y, 0] for y in range(n + 1) for x in range(n + 1)], dtype=np.float32)
+    faces = [[y * (n + 1) + x, y * (n + 1) + x + 1, (y + 1) * (n + 1) + x + 1, (y + 1) * (n + 1) + x]
+             for y in range(n) for x in range(n) if (y, x) not in missing]
+    return verts, faces
+
+
+#Clusters of all pairs closer than distance, compared one by one
+def brute_force_targets(verts, distance):
+    co = verts.astype(np.float64)
+    close = ((co[:, None] - co[None]) ** 2).sum(axis=2) <= distance * distance
+    i, j = np.nonzero(np.triu(close, 1))
+    return analysis._cluster_labels(len(verts), i, j)
+
+
+####################################################
+#Replicated vertices
+
+def test_duplicates_match_brute_force():
+    rng = np.random.default_rng(0)
+    for extent in (0.002, 0.01, 0.05):
+        verts = (rng.random((600, 3)) * extent).astype(np.float32)
+        verts = np.concatenate([verts, verts[:100], verts[:40] + 3e-4])
+        targets = analysis.duplicate_vertices(points(verts), 5e-4)
+        assert np.array_equal(targets, brute_force_targets(verts, 5e-4))
+
+
+def test_pairs_are_close():
+    verts = (np.random.default_rng(1).random((2000, 3)) * 0.01).astype(np.float32)
+    i, j = analysis.duplicate_pairs(verts, 1e-3)
+    assert len(i) and np.all(i < j)
+    assert np.all(((verts[i].astype(np.float64) - verts[j]) ** 2).sum(axis=1) <= 1e-6)
+
+
+#Crowded cells are compared in batches, only pairs joining clusters are kept
+def test_crowded_cells_in_batches(monkeypatch):
+    monkeypatch.setattr(analysis, "CROWDED_CELL", 4)
+    monkeypatch.setattr(analysis, "DUPLICATE_BATCH", 256)
+    rng = np.random.default_rng(2)
+    verts = (rng.random((700, 3)) * 0.002).astype(np.float32)
+    verts = np.concatenate([verts, verts[:200]])
+    i, j = analysis.duplicate_pairs(verts, 1e-3)
+    assert len(i) < len(verts)
+    assert np.array_equal(analysis._cluster_labels(len(verts), i, j), brute_force_targets(verts, 1e-3))
+
+
+#Thousands of vertices at one position must not be paired one with another
+def test_coincident_vertices_regression():
+    verts, faces = benchmark.icosphere(3)
+    verts = np.concatenate([verts, np.zeros((8000, 3)), np.full((3000, 3), 2.0)]).astype(np.float32)
+    mesh = MeshArrays.from_faces(verts, faces)
+    start = time.perf_counter()
+    i, j = analysis.duplicate_pairs(mesh.verts)
+    clusters = analysis.duplicate_clusters(mesh)
+    assert time.perf_counter() - start < 5.0
+    assert len(i) < 20000
+    assert clusters["removed"] == 7999 + 2999
+    assert sorted(clusters["sizes"]) == [3000, 8000]
+    assert np.allclose(clusters["spread"], 0.0)
+
+
+def test_welded_removes_collapsed_faces():
+    verts = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [1, 0, 0], [1, 0, 1e-5]], dtype=np.float32)
+    mesh = MeshArrays.from_faces(verts, [[0, 1, 2, 3], [0, 4, 2], [1, 4, 5]])
+    clusters = analysis.duplicate_clusters(mesh)
+    assert clusters["removed"] == 2
+    merged = analysis.welded(mesh, clusters["targets"])
+    assert merged.nr_verts == 4
+    assert merged.nr_faces == 2
+    assert list(merged.face_sizes) == [4, 3]
+
+
+#Faces of a weld which kept other faces and started their loops elsewhere
+def test_matching_faces():
+    verts = np.zeros((6, 3), dtype=np.float32)
+    mesh = MeshArrays.from_faces(verts, [[0, 1, 2, 3], [1, 2, 4], [2, 4, 5], [3, 4, 5]])
+    other = MeshArrays.from_faces(verts, [[4, 5, 2], [5, 3, 4], [2, 3, 0, 1]])
+    assert list(analysis.matching_faces(mesh, other, [0, 1, 2])) == [0, 2]
+    assert len(analysis.matching_faces(mesh, other, [])) == 0
+
+
+####################################################
+#Gaps in mesh
+
+def loop_sets(loop_offsets, loop_verts):
+    return sorted(tuple(sorted(loop_verts[a:b])) for a, b in zip(loop_offsets[:-1], loop_offsets[1:]))
+
+
+def test_holes_of_a_grid():
+    #Two holes touching in one vertex and the outer border
+    verts, faces = grid(4, {(1, 1), (2, 2)})
+    found = analysis.holes(MeshArrays.from_faces(verts, faces))
+    assert sorted(found["vertex_count"]) == [4, 4, 16]
+    assert np.allclose(sorted(found["perimeter"]), [4, 4, 16])
+    assert np.allclose(sorted(found["area"]), [1, 1, 16])
+    assert len(analysis.boundary_edges(MeshArrays.from_faces(verts, faces))) == 24
+
+
+#Mesh stays one piece, holes touching in one vertex depend on orientation of the whole piece
+def test_holes_do_not_depend_on_orientation():
+    verts, faces = benchmark.punched_holes(5000, 0.02)
+    mesh = MeshArrays.from_faces(verts, faces)
+    assert len(analysis.topology_audit(mesh)["bowtie_verts"]) > 0
+    expected = loop_sets(*analysis.boundary_loops(mesh))
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        which = rng.choice(len(faces), rng.integers(1, len(faces)), replace=False)
+        mesh = MeshArrays.from_faces(verts, turned(faces, which))
+        assert loop_sets(*analysis.boundary_loops(mesh)) == expected
+        assert len(analysis.holes(mesh)["perimeter"]) == len(expected)
+
+
+#Loops go along most faces, also when some of them are turned
+def test_loops_go_along_their_faces():
+    verts, faces = benchmark.punched_holes(2000, 0.02)
+    mesh = MeshArrays.from_faces(verts, faces)
+    loop_offsets, loop_verts = analysis.boundary_loops(MeshArrays.from_faces(verts, turned(faces, range(0, len(faces), 7))))
+    following = np.arange(1, len(loop_verts) + 1)
+    following[loop_offsets[1:] - 1] = loop_offsets[:-1]
+    directed = set(zip(mesh.face_verts.tolist(), mesh.face_verts[mesh.loop_next].tolist()))
+    assert all(edge in directed for edge in zip(loop_verts.tolist(), loop_verts[following].tolist()))
+
+
+####################################################
+#Curvature
+
+#Colour levels of loops painted edge by edge, like analyse_curves before it was vectorized:
+#every pass paints corners of both faces of an edge at its two vertices, later passes win
+def painted_levels(mesh, thresholds):
+    co = mesh.verts.astype(np.float64)
+    normals = mesh.vertex_normals.astype(np.float64)
+    edge_faces = {}
+    for face in range(mesh.nr_faces):
+        for loop in range(mesh.face_offsets[face], mesh.face_offsets[face + 1]):
+            edge_faces.setdefault(int(mesh.loop_edges[loop]), []).append(face)
+    levels = np.zeros(mesh.nr_loops, dtype=np.int64)
+    for level in range(1, len(thresholds)):
+        for edge, (v1, v2) in enumerate(mesh.edges.tolist()):
+            curvature = (normals[v2] - normals[v1]).dot(co[v2] - co[v1]) / np.linalg.norm(co[v2] - co[v1])
+            if not thresholds[level - 1] < abs(curvature) <= thresholds[level]:
+                continue
+            for face in edge_faces[edge]:
+                for loop in range(mesh.face_offsets[face], mesh.face_offsets[face + 1]):
+                    if mesh.face_verts[loop] in (v1, v2):
+                        levels[loop] = level
+    return levels
+
+
+def test_loop_levels_match_painting_edge_by_edge():
+    verts, faces = benchmark.noisy_torus(300)
+    mesh = MeshArrays.from_faces(verts, faces)
+    curvature, levels = analysis.curvature_analysis(mesh, (0.05, 0.1, 0.2, 0.3))
+    assert set(np.unique(levels)) == {0, 1, 2, 3}
+    assert np.any(np.abs(curvature) > 0.3)
+    assert np.array_equal(levels, painted_levels(mesh, (0.05, 0.1, 0.2, 0.3)))
+
+
+#Explicit thresholds keep the rule of analyse_curves, values above the last one are green
+def test_levels_above_last_explicit_threshold_are_green():
+    levels = analysis.curvature_levels(np.array([0.1, -0.5, 1.0, 1.9, 2.5, -40.0]))
+    assert list(levels) == [0, 1, 2, 3, 0, 0]
+
+
+#Largest edges are red also when percentile 100 of a sketch is a bit below the true maximum
+def test_automatic_thresholds_keep_largest_edges_red():
+    thresholds = analysis.curvature_thresholds([0.2, 0.5, 0.9, 0.99])
+    assert thresholds == (0.2, 0.5, 0.9, np.inf)
+    assert list(analysis.curvature_levels(np.array([0.1, 0.3, 0.95, 1.0]), thresholds)) == [0, 1, 3, 3]
+    verts, faces = benchmark.noisy_torus(2000)
+    _, levels = analysis.curvature_analysis(MeshArrays.from_faces(verts, faces))
+    assert set(np.unique(levels)) == {0, 1, 2, 3}
+
+
+####################################################
+#Topology audit
+
+#Grid of 2 x 2 quads with one problem of every category added to it
+def audited_mesh():
+    verts, faces = grid(2, set())
+    verts = np.concatenate([verts, np.array([
+        [3, 2.5, 0], [2.5, 3, 0],               #9, 10 triangle touching the grid in corner 8
+        [5, 5, 0], [6, 5, 0],                   #11, 12 wire edge
+        [9, 9, 9],                              #13 isolated
+        [5, 0, 0], [5, 0, 0], [6, 0, 0],        #14 - 16 collapsed triangle
+        [0.5, 0, 1], [0.5, 0, -1],              #17, 18 two fins on grid edge (0, 1)
+    ], dtype=np.float32)])
+    faces = faces + [[8, 9, 10], [14, 15, 16], [0, 1, 17], [1, 0, 18]]
+    #Loose edge repeating edge of a face is not a wire edge
+    return MeshArrays.from_faces(verts, faces, loose_edges=np.array([[11, 12], [1, 0]]))
+
+
+def edge_set(mesh, edges):
+    return sorted(tuple(edge) for edge in mesh.edges[edges].tolist())
+
+
+def test_audit_categories():
+    mesh = audited_mesh()
+    audit = analysis.topology_audit(mesh)
+    assert edge_set(mesh, audit["multi_face_edges"]) == [(0, 1)]
+    assert list(audit["bowtie_verts"]) == [0, 1, 8]
+    assert list(mesh.loose_edges[audit["wire_edges"]].ravel()) == [11, 12]
+    assert list(audit["isolated_verts"]) == [13]
+    assert list(audit["zero_area_faces"]) == [5]
+    assert edge_set(mesh, audit["zero_length_edges"]) == [(14, 15)]
+    assert (0, 1) not in edge_set(mesh, audit["boundary_edges"])
+    assert analysis.topology_counts(audit)["boundary_edges"] == len(audit["boundary_edges"])
+
+
+def test_closed_mesh_is_clean():
+    verts, faces = benchmark.icosphere(2)
+    counts = analysis.topology_counts(analysis.topology_audit(MeshArrays.from_faces(verts, faces)))
+    assert set(counts) == set(analysis.TOPOLOGY_CATEGORIES)
+    assert not any(counts.values())
+
+
+####################################################
+#Orientation
+
+def test_turned_faces_are_flipped_back():
+    verts, faces = benchmark.icosphere(2)
+    which = list(range(0, len(faces), 5))
+    oriented = analysis.orient_faces(MeshArrays.from_faces(verts, turned(faces, which)))
+    assert list(oriented["flip"]) == which
+    assert list(oriented["component_faces"]) == [len(faces)]
+    assert len(oriented["non_orientable"]) == 0
+    assert oriented["component_volume"][0] == pytest.approx(4 / 3 * np.pi, rel=0.05)
+
+
+#Component turned inside out as a whole is flipped outwards
+def test_inside_out_component():
+    verts, faces = benchmark.nested_shells(300, shells=2)
+    inside_out = turned(faces, range(len(faces) // 2, len(faces)))
+    oriented = analysis.orient_faces(MeshArrays.from_faces(verts, inside_out))
+    assert list(oriented["flip"]) == list(range(len(faces) // 2, len(faces)))
+    assert list(oriented["component_flipped"]) == [0, len(faces) // 2]
+
+
+def test_moebius_strip_is_not_orientable():
+    n = 12
+    angle = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    verts = []
+    for a in angle:
+        for side in (-0.2, 0.2):
+            r = 1 + side * np.cos(a / 2)
+            verts.append([r * np.cos(a), r * np.sin(a), side * np.sin(a / 2)])
+    faces = [[2 * i, 2 * i + 1, 2 * i + 3, 2 * i + 2] for i in range(n - 1)] + [[2 * n - 2, 2 * n - 1, 0, 1]]
+    oriented = analysis.orient_faces(MeshArrays.from_faces(np.array(verts, dtype=np.float32), faces))
+    assert list(oriented["non_orientable"]) == [0]
+
+
+####################################################
+#Pipeline
+
+#Icosphere whose every triangle has its own vertices, like a mesh with split seams
+def triangle_soup():
+    verts, faces = benchmark.icosphere(1)
+    verts = np.asarray(verts, dtype=np.float32)[np.asarray(faces).ravel()]
+    return MeshArrays.from_faces(verts, np.arange(len(verts)).reshape(-1, 3))
+
+
+#Merge runs first, the other stages see the welded mesh
+def test_pipeline_analyses_welded_mesh():
+    mesh = triangle_soup()
+    targets, work, found = analysis.pipeline_stages(mesh, analysis.PIPELINE_STAGES, samples=8)
+    assert np.array_equal(targets, analysis.duplicate_clusters(mesh)["targets"])
+    assert work.digest == analysis.welded(mesh, targets).digest and work.nr_verts < mesh.nr_verts
+    assert len(found["holes"]["vertex_count"]) == 0 and len(found["non_manifold"]) == 0
+    assert np.array_equal(found["interior"], analysis.interior_faces(work, 8))
+    mean = analysis.vertex_curvature(work, relative=True)["mean"]
+    assert np.array_equal(found["mean_curvature"], mean)
+    assert found["curvature_stats"] == analysis.curvature_stats(mean)
+
+
+def test_pipeline_without_merge_analyses_mesh_as_it_is():
+    mesh = triangle_soup()
+    targets, work, found = analysis.pipeline_stages(mesh, ('holes', 'curvature'))
+    assert targets is None and work is mesh
+    assert len(found["holes"]["vertex_count"]) == mesh.nr_faces
+    assert "interior" not in found and len(found["mean_curvature"]) == mesh.nr_verts
+
+
+#Stages run in order, only clusters are keyed by the original mesh
+def test_pipeline_stages_are_cached_by_analysed_mesh():
+    mesh = triangle_soup()
+    calls = []
+
+    def cached(keyed, name, compute, *params):
+        calls.append((name, keyed.digest))
+        return compute()
+
+    _, work, _ = analysis.pipeline_stages(mesh, ('curvature', 'holes', 'merge'), cached=cached)
+    assert calls == [("duplicate_clusters", mesh.digest), ("holes", work.digest),
+                     ("non_manifold_vertices", work.digest), ("mean_curvature", work.digest)]
@@ -0,0 +1,92 @@
+import json
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+from learn_computer_graphics import batch
+from learn_computer_graphics import benchmark
+
+alarm = pytest.mark.skipif(not hasattr(signal, 'setitimer'), reason="timeout needs SIGALRM")
+#Workers see functions patched by the test only when they are forked
+forked = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="workers must be forked")
+
+
+def write_obj(path, verts, faces):
+    with open(path, 'w') as file:
+        for v in verts:
+            file.write("v %g %g %g\n" % tuple(v))
+        for face in faces:
+            file.write("f " + " ".join(str(i + 1) for i in face) + "\n")
+    return path
+
+
+def test_collect_files(tmp_path):
+    (tmp_path / "a").mkdir()
+    for name in ("a/one.obj", "a/two.PLY", "a/notes.txt", "three.stl"):
+        (tmp_path / name).write_text("")
+    files = batch.collect_files([str(tmp_path / "a"), str(tmp_path / "**" / "*.obj"), str(tmp_path / "three.stl")])
+    assert sorted(f.replace("\\", "/").split("/")[-1] for f in files) == ["one.obj", "three.stl", "two.PLY"]
+
+
+def test_report_of_closed_sphere(tmp_path):
+    path = write_obj(str(tmp_path / "sphere.obj"), *benchmark.icosphere(2))
+    record = batch.analyse_file(path)
+    assert record["status"] == "ok"
+    assert record["faces"] == 320
+    assert record["self_intersections"]["faces"] == 0
+    json.dumps(record)
+
+
+def test_error_is_recorded(tmp_path):
+    path = str(tmp_path / "broken.ply")
+    with open(path, 'w') as file:
+        file.write("not a ply\n")
+    records = list(batch.run([path], workers=1))
+    assert records[0]["status"] == "error"
+
+
+@alarm
+def test_timeout_is_recorded(tmp_path, monkeypatch):
+    path = write_obj(str(tmp_path / "sphere.obj"), *benchmark.icosphere(1))
+    monkeypatch.setattr(batch.loaders, "load_mesh", lambda path: time.sleep(5))
+    record = batch.analyse_file(path, timeout=0.05)
+    assert record["status"] == "timeout"
+    assert record["seconds"] < 5
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+
+#Alarm coming after the work is done, while the timer is disarmed, must not escape
+@alarm
+def test_late_alarm_does_not_escape(tmp_path, monkeypatch):
+    path = write_obj(str(tmp_path / "sphere.obj"), *benchmark.icosphere(1))
+    setitimer = signal.setitimer
+
+    def late_alarm(which, seconds, *interval):
+        result = setitimer(which, seconds, *interval)
+        if seconds == 0:
+            batch._timeout_handler(signal.SIGALRM, None)
+        return result
+    monkeypatch.setattr(batch.signal, "setitimer", late_alarm)
+    records = list(batch.run([path, path], workers=1, timeout=60))
+    assert [record["status"] for record in records] == ["timeout", "timeout"]
+
+
+#Worker killed by one file breaks the pool, only that file gets an error record
+@forked
+def test_dead_worker_fails_only_its_file(tmp_path, monkeypatch):
+    files = [write_obj(str(tmp_path / (name + ".obj")), *benchmark.icosphere(1))
+             for name in ("first", "second", "killer", "third", "fourth")]
+    load_mesh = batch.loaders.load_mesh
+
+    def killing_load(path):
+        if "killer" in path:
+            os._exit(1)
+        return load_mesh(path)
+    monkeypatch.setattr(batch.loaders, "load_mesh", killing_load)
+    records = list(batch.run(files, workers=2))
+    assert sorted(record["path"] for record in records) == sorted(files)
+    status = {os.path.basename(record["path"]): record["status"] for record in records}
+    assert status == {"first.obj": "ok", "second.obj": "ok", "killer.obj": "error", "third.obj": "ok", "fourth.obj": "ok"}
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from learn_computer_graphics import benchmark
+
+
+@pytest.mark.parametrize("name", sorted(benchmark.GENERATORS))
+def test_generators_make_about_the_size(name):
+    verts, faces = benchmark.GENERATORS[name](2000)
+    assert 500 <= len(faces) <= 8000
+    assert faces.min() >= 0 and faces.max() < len(verts)
+
+
+def test_every_stage_runs():
+    results = benchmark.run(["punched_holes"], [300], sorted(benchmark.STAGES), repeat=1)
+    assert [r["stage"] for r in results] == sorted(benchmark.STAGES)
+    assert all(r["seconds"] >= 0 for r in results)
+
+
+def test_regressions_against_baseline():
+    result = {"generator": "icosphere", "size": 1000, "stage": "holes", "seconds": 0.5}
+    baseline = [dict(result, seconds=0.2)]
+    assert benchmark.regressions([result], baseline, 1.25)[0]["ratio"] == 2.5
+    assert benchmark.regressions([result], baseline, 3.0) == []
+    assert benchmark.regressions([dict(result, seconds=5e-4)], [dict(result, seconds=1e-4)], 1.25) == []
+
+
+def test_main_writes_report(tmp_path, capsys):
+    baseline = str(tmp_path / "baseline.json")
+    arguments = ["--sizes", "200", "--generators", "icosphere", "--stages", "holes", "-r", "1"]
+    assert benchmark.main(arguments + ["-o", baseline]) == 0
+    with open(baseline) as file:
+        assert [r["stage"] for r in json.load(file)["results"]] == ["holes"]
+    assert benchmark.main(arguments + ["-b", baseline, "--max-ratio", "1000"]) == 0
+    assert json.loads(capsys.readouterr().out)["regressions"] == []
@@ -0,0 +1,72 @@
+import numpy as np
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics.bvh import BVH, intersect_rays_triangles
+from learn_computer_graphics.core import MeshArrays
+
+
+#Two boxes side by side along x with the wall between them (face 10)
+def two_boxes():
+    verts = np.array([(x, y, z) for x in (0, 1, 2) for y in (0, 1) for z in (0, 1)], dtype=np.float32)
+    index = {tuple(co): i for i, co in enumerate(verts.astype(int).tolist())}
+    quad = lambda *corners: [index[corner] for corner in corners]
+    faces = [quad((0, 0, 0), (0, 1, 0), (0, 1, 1), (0, 0, 1)), quad((2, 0, 0), (2, 0, 1), (2, 1, 1), (2, 1, 0))]
+    for x in (0, 1):
+        faces += [quad((x, 0, 0), (x, 0, 1), (x + 1, 0, 1), (x + 1, 0, 0)),
+                  quad((x, 1, 0), (x + 1, 1, 0), (x + 1, 1, 1), (x, 1, 1)),
+                  quad((x, 0, 0), (x + 1, 0, 0), (x + 1, 1, 0), (x, 1, 0)),
+                  quad((x, 0, 1), (x, 1, 1), (x + 1, 1, 1), (x + 1, 0, 1))]
+    faces.append(quad((1, 0, 0), (1, 1, 0), (1, 1, 1), (1, 0, 1)))
+    return MeshArrays.from_faces(verts, faces)
+
+
+#UV sphere of radius 1 around the origin
+def sphere(rings=16, segments=32):
+    theta = np.linspace(0, np.pi, rings + 1)[1:-1, None]
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)[None]
+    ring_co = np.stack(np.broadcast_arrays(np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)), axis=2)
+    verts = np.concatenate([[[0, 0, 1]], ring_co.reshape(-1, 3), [[0, 0, -1]]]).astype(np.float32)
+    last = len(verts) - 1
+    ring = lambda r, j: 1 + r * segments + j % segments
+    faces = [[0, ring(0, j), ring(0, j + 1)] for j in range(segments)]
+    faces += [[ring(r, j), ring(r + 1, j), ring(r + 1, j + 1), ring(r, j + 1)] for r in range(rings - 2) for j in range(segments)]
+    faces += [[last, ring(rings - 2, j + 1), ring(rings - 2, j)] for j in range(segments)]
+    return MeshArrays.from_faces(verts, faces)
+
+
+def test_ray_cast_matches_brute_force():
+    mesh = sphere()
+    tri_co = mesh.verts[mesh.triangles].astype(np.float64)
+    rng = np.random.default_rng(0)
+    origins = rng.uniform(-2, 2, (300, 3))
+    directions = rng.normal(size=(300, 3))
+    t, tri = BVH(tri_co).ray_cast(origins, directions)
+
+    pairs = np.repeat(np.arange(300), len(tri_co))
+    all_t = intersect_rays_triangles(origins[pairs], directions[pairs], np.tile(tri_co, (300, 1, 1))).reshape(300, -1)
+    all_t[all_t < 1e-9] = np.inf
+    assert np.allclose(t, all_t.min(axis=1))
+    hit = np.isfinite(t)
+    assert hit.any() and not hit.all()
+    assert np.allclose(all_t[hit, tri[hit]], t[hit])
+    assert np.all(tri[~hit] == -1)
+
+
+def test_any_hit_finds_a_hit():
+    tree = sphere().bvh
+    directions = np.random.default_rng(1).normal(size=(100, 3))
+    t, tri = tree.ray_cast(np.zeros((1, 3)), directions, any_hit=True)
+    assert np.all(tri >= 0)
+    assert np.allclose(t * np.linalg.norm(directions, axis=1), 1, atol=0.05)
+
+
+def test_wall_between_boxes_is_interior():
+    mesh = two_boxes()
+    assert list(analysis.interior_candidates(mesh)) == [10]
+    assert list(analysis.interior_faces(mesh)) == [10]
+
+
+#Candidate faces seen from outside are kept
+def test_visible_candidates_are_not_interior():
+    mesh = two_boxes()
+    assert list(analysis.interior_faces(mesh, faces=[0, 4, 10])) == [10]
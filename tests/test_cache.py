@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from learn_computer_graphics.cache import ResultCache
+from learn_computer_graphics.core import MeshArrays
+
+
+#Tetrahedron, scale changes its content
+def mesh(scale=1.0):
+    verts = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32) * scale
+    return MeshArrays.from_faces(verts, [[0, 2, 1], [0, 1, 3], [1, 2, 3], [0, 3, 2]])
+
+
+def test_same_content_hits():
+    cache = ResultCache()
+    calls = []
+    compute = lambda: calls.append(1) or np.arange(5)
+    assert np.array_equal(cache.cached(mesh(), "test", compute, 0.1), np.arange(5))
+    assert np.array_equal(cache.cached(mesh(), "test", compute, 0.1), np.arange(5))
+    assert len(calls) == 1
+    cache.cached(mesh(), "test", compute, 0.2)
+    cache.cached(mesh(scale=2.0), "test", compute, 0.1)
+    assert len(calls) == 3
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_results_keep_their_shape():
+    cache = ResultCache()
+    key = cache.key(mesh(), "test")
+    cache.put(key, {"faces": np.arange(3), "removed": 2})
+    assert cache.get(key)["removed"] == 2
+    cache.put(key, (np.zeros(2), np.ones(3)))
+    first, second = cache.get(key)
+    assert len(first) == 2 and len(second) == 3
+
+
+def test_empty_results_are_cached(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    calls = []
+    assert cache.cached(mesh(), "dict", lambda: calls.append(1) or {}) == {}
+    assert cache.cached(mesh(), "tuple", lambda: calls.append(1) or ()) == ()
+    assert cache.cached(mesh(), "dict", lambda: calls.append(1) or {}) == {}
+    assert cache.cached(mesh(), "tuple", lambda: calls.append(1) or ()) == ()
+    assert len(calls) == 2
+    assert ResultCache(directory=str(tmp_path)).get(cache.key(mesh(), "dict")) == {}
+
+
+def test_cached_arrays_cannot_be_changed():
+    cache = ResultCache()
+    key = cache.key(mesh(), "test")
+    result = {"faces": np.arange(3)}
+    cache.put(key, result)
+    #Changing the computed result does not change the cache
+    result["faces"][0] = 10
+    found = cache.get(key)["faces"]
+    assert np.array_equal(found, np.arange(3))
+    with pytest.raises(ValueError):
+        found[0] = 10
+    assert np.array_equal(cache.get(key)["faces"], np.arange(3))
+
+
+def test_least_recently_used_are_evicted():
+    cache = ResultCache(max_bytes=3 * 800)
+    keys = [cache.key(mesh(), "test", i) for i in range(4)]
+    for key in keys[:3]:
+        cache.put(key, np.zeros(100))
+    cache.get(keys[0])
+    cache.put(keys[3], np.zeros(100))
+    assert list(cache.entries) == [keys[2], keys[0], keys[3]]
+    assert cache.nbytes == 3 * 800
+    cache.put(cache.key(mesh(), "large"), np.zeros(1000))
+    assert cache.nbytes == 3 * 800
+
+
+def test_results_survive_in_directory(tmp_path):
+    key = ResultCache.key(mesh(), "test", "param with / and spaces")
+    ResultCache(directory=str(tmp_path)).put(key, {"faces": np.arange(3), "area": 1.5})
+    found = ResultCache(directory=str(tmp_path)).get(key)
+    assert np.array_equal(found["faces"], np.arange(3))
+    assert found["area"] == 1.5
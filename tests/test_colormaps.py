@@ -0,0 +1,43 @@
+import numpy as np
+
+from learn_computer_graphics import colormaps
+from learn_computer_graphics import quantiles
+
+
+def test_tables_start_and_end_at_stops():
+    for name, stops in colormaps.COLORMAPS.items():
+        table = colormaps.lookup_table(name)
+        assert table.shape == (colormaps.LUT_SIZE, 4)
+        assert np.allclose(table[0, :3], stops[0][1:])
+        assert np.allclose(table[-1, :3], stops[-1][1:])
+
+
+def test_parse_bins():
+    assert list(colormaps.parse_bins("0.7; 0.3, 1.2,")) == [0.3, 0.7, 1.2]
+
+
+def test_diverging_zero_gets_middle_colour():
+    table = colormaps.lookup_table('COOLWARM')
+    colors = colormaps.colorize([-1.0, 0.0, 3.0], 'DIVERGING', limits=(-1.0, 2.0))
+    assert np.allclose(colors[1], table[len(table) // 2], atol=0.01)
+    assert np.allclose(colors[2], table[-1])
+
+
+def test_bins_from_stats():
+    values = np.linspace(-1, 1, 1001)
+    stats = quantiles.summary(values)
+    colors = colormaps.colorize(values, 'BINS', 'TRAFFIC', edges=colormaps.stats_bins(stats))
+    assert len(np.unique(colors, axis=0)) == len(quantiles.PERCENTILES) + 1
+    assert np.array_equal(colors, colormaps.colorize(values, 'BINS', 'TRAFFIC'))
+
+
+#Range from stats of the values is the automatic range, extreme values take the end colours
+def test_range_from_stats():
+    values = np.r_[np.linspace(0, 1, 1000), 50.0]
+    stats = quantiles.summary(values)
+    low, high = colormaps.stats_range(stats)
+    assert (low, high) == (stats["p1"], stats["p99"])
+    colors = colormaps.colorize(values, limits=(low, high))
+    assert np.array_equal(colors, colormaps.colorize(values))
+    assert np.array_equal(colors[-1], colormaps.lookup_table('COOLWARM')[-1])
+    assert colormaps.stats_range(quantiles.summary([]), 'DIVERGING') == (0.0, 1.0)
@@ -0,0 +1,66 @@
+import numpy as np
+
+from learn_computer_graphics.core import MeshArrays, transformed_bounds
+
+
+#Unit cube with outward faces
+def cube():
+    verts = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float32)
+    faces = [[0, 1, 3, 2], [4, 6, 7, 5], [0, 4, 5, 1], [2, 3, 7, 6], [0, 2, 6, 4], [1, 5, 7, 3]]
+    return MeshArrays.from_faces(verts, faces)
+
+
+def test_cube_tables():
+    mesh = cube()
+    assert (mesh.nr_verts, mesh.nr_faces, mesh.nr_loops, mesh.nr_edges) == (8, 6, 24, 12)
+    assert np.all(mesh.edge_face_count == 2)
+    assert np.all(mesh.edges[:, 0] < mesh.edges[:, 1])
+    #Edge of a loop joins its vertex with the vertex of the next loop
+    ends = np.sort(np.stack([mesh.face_verts, mesh.face_verts[mesh.loop_next]], axis=1), axis=1)
+    assert np.array_equal(mesh.edges[mesh.loop_edges], ends)
+
+
+def test_loop_next_and_prev():
+    mesh = MeshArrays.from_faces(np.zeros((5, 3), dtype=np.float32), [[0, 1, 2], [1, 3, 4, 2]])
+    assert list(mesh.loop_next) == [1, 2, 0, 4, 5, 6, 3]
+    assert list(mesh.loop_prev) == [2, 0, 1, 6, 3, 4, 5]
+    assert list(mesh.loop_faces) == [0, 0, 0, 1, 1, 1, 1]
+
+
+def test_cube_normals_point_outward():
+    mesh = cube()
+    center = mesh.verts.mean(axis=0)
+    assert np.all(np.einsum('ij,ij->i', mesh.face_normals, mesh.face_centroids - center) > 0)
+    assert np.all(np.einsum('ij,ij->i', mesh.vertex_normals, mesh.verts - center) > 0)
+    assert np.allclose(mesh.face_areas, 1.0)
+
+
+def test_triangles_cover_faces():
+    mesh = cube()
+    assert mesh.triangles.shape == (12, 3)
+    assert list(np.bincount(mesh.tri_faces)) == [2] * 6
+    areas = 0.5 * np.linalg.norm(np.cross(*np.swapaxes(mesh.verts[mesh.triangles[:, 1:]] - mesh.verts[mesh.triangles[:, :1]], 0, 1)), axis=1)
+    assert np.isclose(areas.sum(), 6.0)
+
+
+def test_digest_follows_content():
+    first = cube()
+    assert first.digest == MeshArrays(first.verts.copy(), first.face_offsets, first.face_verts).digest
+    moved = first.verts.copy()
+    moved[0] += 1e-3
+    assert first.digest != MeshArrays(moved, first.face_offsets, first.face_verts).digest
+
+
+def test_bounds():
+    low, high = cube().bounds()
+    assert np.array_equal(low, [0, 0, 0]) and np.array_equal(high, [1, 1, 1])
+    low, high = MeshArrays.from_faces(np.zeros((0, 3), dtype=np.float32), []).bounds()
+    assert np.array_equal(low, high)
+
+
+#Bounds of the cube turned by 90 degrees around z, scaled by 2 and moved, like matrix_world
+def test_transformed_bounds():
+    matrix = np.array([[0, -2, 0, 1], [2, 0, 0, 2], [0, 0, 2, 3], [0, 0, 0, 1]])
+    for chunk in (1, 3, 1 << 20):
+        low, high = transformed_bounds(cube().verts, matrix, chunk)
+        assert np.allclose(low, [-1, 2, 3]) and np.allclose(high, [1, 4, 5])
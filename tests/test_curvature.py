@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from learn_computer_graphics import benchmark
+from learn_computer_graphics import curvature
+from learn_computer_graphics.core import MeshArrays
+
+
+def sphere(radius=2.0, level=4):
+    verts, faces = benchmark.icosphere(level)
+    return MeshArrays.from_faces(np.asarray(verts * radius, dtype=np.float32), faces)
+
+
+def test_sphere():
+    found = curvature.vertex_curvature(sphere())
+    assert np.allclose(found["mean"], 0.5, rtol=0.02)
+    assert np.allclose(found["gaussian"], 0.25, rtol=0.05)
+    assert found["area"].sum() == pytest.approx(4 * np.pi * 4, rel=0.01)
+    assert np.allclose(found["k1"], found["k2"], atol=0.05)
+
+
+#Relative curvature does not depend on size of the mesh
+def test_relative_curvature():
+    small = curvature.vertex_curvature(sphere(0.01), relative=True)
+    large = curvature.vertex_curvature(sphere(100.0), relative=True)
+    assert np.allclose(small["mean"], large["mean"], rtol=1e-3)
+    assert np.allclose(small["mean"], 2 * np.sqrt(3), rtol=0.02)
+
+
+#Sign follows the normals, flat parts and boundaries have no Gaussian curvature
+def test_flat_grid_with_boundary():
+    n = 6
+    verts = np.array([[x, y, 0] for y in range(n + 1) for x in range(n + 1)], dtype=np.float32)
+    faces = [[y * (n + 1) + x, y * (n + 1) + x + 1, (y + 1) * (n + 1) + x + 1, (y + 1) * (n + 1) + x]
+             for y in range(n) for x in range(n)]
+    found = curvature.vertex_curvature(MeshArrays.from_faces(verts, faces))
+    assert np.allclose(found["mean"], 0, atol=1e-9)
+    assert np.allclose(found["gaussian"], 0, atol=1e-9)
+    assert found["area"].sum() == pytest.approx(n * n)
+    inside_out = curvature.vertex_curvature(MeshArrays.from_faces(sphere().verts, sphere().triangles[:, ::-1]))
+    assert np.all(inside_out["mean"] < 0)
+
+
+def test_laplacian_rows_sum_to_zero():
+    pytest.importorskip("scipy")
+    laplacian = curvature.cotangent_laplacian(sphere(level=2))
+    assert np.allclose(np.asarray(laplacian.sum(axis=1)).ravel(), 0)
+    assert abs(laplacian - laplacian.T).max() < 1e-9
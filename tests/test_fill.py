@@ -0,0 +1,57 @@
+import numpy as np
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import benchmark
+from learn_computer_graphics import fill
+from learn_computer_graphics.core import MeshArrays
+
+
+#C-shaped n-gon in the xy plane: outer arc there, inner arc back
+def c_shape(nr_verts):
+    angles = np.radians(np.linspace(30, 330, nr_verts // 2))
+    outer = np.stack([2 * np.cos(angles), 2 * np.sin(angles), np.zeros_like(angles)], axis=1)
+    inner = np.stack([np.cos(angles), np.sin(angles), np.zeros_like(angles)], axis=1)[::-1]
+    return np.concatenate([outer, inner]).astype(np.float32)
+
+
+def signed_areas(verts, triangles):
+    p = verts[triangles].astype(np.float64)
+    return 0.5 * np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])[:, 2]
+
+
+#Hole of the only face is its own loop, filling it gives the face turned over
+def check_c_shape(nr_verts, limit):
+    verts = c_shape(nr_verts)
+    mesh = MeshArrays.from_faces(verts, [list(range(nr_verts))])
+    new_verts, triangles, nr_holes = fill.fill_holes(mesh, ear_clipping_limit=limit)
+    assert nr_holes == 1 and len(new_verts) == 0
+    assert len(triangles) == nr_verts - 2
+    areas = signed_areas(verts, triangles)
+    #Triangles continue the winding of faces around the hole and do not overlap
+    assert np.all(areas < 0)
+    assert np.isclose(-areas.sum(), mesh.face_areas[0], rtol=1e-4)
+
+
+def test_small_concave_hole():
+    check_c_shape(20, fill.EAR_CLIPPING_LIMIT)
+
+
+def test_large_concave_hole():
+    check_c_shape(110, fill.EAR_CLIPPING_LIMIT)
+    check_c_shape(110, 200)
+
+
+def test_filled_sphere_is_closed():
+    verts, faces = benchmark.punched_holes(5000, 0.02)
+    new_verts, triangles, nr_holes = fill.fill_holes(MeshArrays.from_faces(verts, faces))
+    assert nr_holes == len(analysis.holes(MeshArrays.from_faces(verts, faces))["perimeter"])
+    closed = MeshArrays.from_faces(verts, np.concatenate([faces, triangles]))
+    assert np.all(closed.edge_face_count == 2)
+    #Orientation continues over the new faces
+    assert len(analysis.orient_faces(closed)["flip"]) == 0
+
+
+def test_max_verts_skips_large_loops():
+    verts = c_shape(40)
+    mesh = MeshArrays.from_faces(verts, [list(range(40))])
+    assert fill.fill_holes(mesh, max_verts=39)[2] == 0
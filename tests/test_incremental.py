@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import benchmark
+from learn_computer_graphics import curvature
+from learn_computer_graphics import incremental
+from learn_computer_graphics.core import MeshArrays
+from learn_computer_graphics.incremental import IncrementalAnalysis
+
+
+#Mesh with holes and replicated vertices, as the live analysis sees it
+def start():
+    verts, faces = benchmark.punched_holes(3000, 0.03)
+    verts = np.asarray(verts, dtype=np.float32)
+    verts[10:20] = verts[0]
+    return verts, faces, IncrementalAnalysis(MeshArrays.from_faces(verts, faces))
+
+
+#Every result of the live analysis equals the analysis of the whole mesh
+def assert_fresh(live, verts, faces):
+    mesh = MeshArrays.from_faces(verts, faces)
+    mean = curvature.vertex_curvature(mesh)["mean"] * live.scale
+    assert np.allclose(live.mean, mean, atol=1e-6 * np.abs(mean).max())
+    clusters = analysis.duplicate_clusters(mesh, live.distance)
+    assert live.summary()["replicated_vertices"] == clusters["removed"] + len(clusters["sizes"])
+    holes = analysis.holes(mesh)
+    assert np.allclose(np.sort(live.holes["perimeter"]), np.sort(holes["perimeter"]))
+    assert np.allclose(np.sort(live.holes["area"]), np.sort(holes["area"]))
+
+
+def test_nothing_moved():
+    verts, faces, live = start()
+    assert live.update(verts.copy()) is None
+    assert_fresh(live, verts, faces)
+
+
+#Grid of replicated vertices is built again after enough moves with the small limit
+@pytest.mark.parametrize("rebuild_moved", [incremental.REBUILD_MOVED, 60])
+def test_moves_match_fresh_analysis(monkeypatch, rebuild_moved):
+    monkeypatch.setattr(incremental, "REBUILD_MOVED", rebuild_moved)
+    monkeypatch.setattr(incremental, "REBUILD_PART", 0.0)
+    verts, faces, live = start()
+    rng = np.random.default_rng(0)
+    for step in range(5):
+        moved = rng.choice(len(verts), 50, replace=False)
+        verts[moved] += rng.normal(0, 0.01, (50, 3)).astype(np.float32)
+        #Some vertices are dropped on others and some replicated ones are pulled apart
+        verts[moved[:5]] = verts[rng.choice(len(verts), 5)]
+        verts[10 + step] += 0.05
+        found = live.update(verts)
+        assert set(moved) <= set(found["verts"]) and set(found["verts"]) <= set(found["ring"])
+        assert_fresh(live, verts, faces)
+
+
+#Curvature follows the diagonal of the bounding box when the mesh grows
+def test_curvature_is_relative_to_current_size():
+    verts, faces, live = start()
+    scale = live.scale
+    far = np.argmax(verts[:, 0])
+    verts[far, 0] += 0.1 * incremental.RESCALE_PART * scale
+    assert not live.update(verts)["rescaled"]
+    assert live.scale == scale
+    verts *= 2
+    assert live.update(verts)["rescaled"]
+    mean = curvature.vertex_curvature(MeshArrays.from_faces(verts, faces), relative=True)["mean"]
+    assert np.isclose(live.scale, 2 * scale, rtol=0.01)
+    assert np.allclose(live.mean, mean, atol=1e-6 * np.abs(mean).max())
+    assert_fresh(live, verts, faces)
+
+
+def test_topology_must_not_change():
+    verts, _, live = start()
+    with pytest.raises(ValueError):
+        live.update(verts[:-1])
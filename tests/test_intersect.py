@@ -0,0 +1,57 @@
+import numpy as np
+
+from learn_computer_graphics import benchmark
+from learn_computer_graphics import intersect
+from learn_computer_graphics.core import MeshArrays
+
+
+def sphere(level, offset=(0, 0, 0)):
+    verts, faces = benchmark.icosphere(level)
+    return verts + offset, faces
+
+
+#Two spheres overlapping each other, each is a clean closed surface
+def overlapping_spheres(level=2):
+    verts_a, faces_a = sphere(level)
+    verts_b, faces_b = sphere(level, (1.1, 0.2, 0.1))
+    return MeshArrays.from_faces(np.concatenate([verts_a, verts_b]).astype(np.float32),
+                                 np.concatenate([faces_a, faces_b + len(verts_a)]))
+
+
+#All pairs of triangles not sharing a vertex, tested one by one
+def brute_force(mesh):
+    triangles = mesh.triangles
+    a, b = np.triu_indices(len(triangles), 1)
+    shared = (triangles[a][:, :, None] == triangles[b][:, None, :]).any(axis=(1, 2))
+    a, b = a[~shared], b[~shared]
+    tri_co = mesh.verts[triangles].astype(np.float64)
+    mask, _ = intersect.triangle_intersections(tri_co[a], tri_co[b])
+    pairs = np.sort(np.stack([mesh.tri_faces[a[mask]], mesh.tri_faces[b[mask]]], axis=1), axis=1)
+    return sorted(map(tuple, pairs.tolist()))
+
+
+def test_crossing_triangles():
+    tri_a = np.array([[[0, 0, 0], [2, 0, 0], [0, 2, 0]]], dtype=np.float64)
+    tri_b = np.array([[[0.5, 0.5, -1], [0.5, 0.5, 1], [3, 3, 0]]], dtype=np.float64)
+    mask, segments = intersect.triangle_intersections(tri_a, tri_b)
+    assert mask.tolist() == [True]
+    assert np.allclose(sorted(segments[0].tolist()), [[0.5, 0.5, 0], [1, 1, 0]])
+    mask, _ = intersect.triangle_intersections(tri_a, tri_b + [0, 0, 2])
+    assert mask.tolist() == [False]
+
+
+def test_matches_brute_force():
+    mesh = overlapping_spheres()
+    found = intersect.self_intersections(mesh, chunks=5)
+    assert sorted(map(tuple, found["pairs"].tolist())) == brute_force(mesh)
+    assert len(found["pairs"]) == len(found["segments"]) > 0
+    #Segments lie on both spheres
+    ends = found["segments"].reshape(-1, 3)
+    assert np.allclose(np.linalg.norm(ends, axis=1), 1, atol=0.05)
+    assert np.allclose(np.linalg.norm(ends - [1.1, 0.2, 0.1], axis=1), 1, atol=0.05)
+
+
+def test_clean_sphere_has_none():
+    verts, faces = sphere(3)
+    found = intersect.self_intersections(MeshArrays.from_faces(verts, faces))
+    assert len(found["faces"]) == 0 and len(found["pairs"]) == 0
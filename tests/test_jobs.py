@@ -0,0 +1,72 @@
+import threading
+
+import numpy as np
+import pytest
+
+from learn_computer_graphics.jobs import BackgroundJob
+
+
+#Job painting the mesh like the analyses of mesh.py: compute works on a copy of the arrays
+#in chunks, finish writes the result back
+def paint_job(colors, chunks=10, started=None, proceed=None):
+    threads = {}
+
+    def compute(progress):
+        threads["compute"] = threading.current_thread()
+        result = colors.copy()
+        for chunk, part in enumerate(np.array_split(np.arange(len(result)), chunks)):
+            result[part] = 1.0
+            if started is not None:
+                started.set()
+                proceed.wait()
+            progress((chunk + 1) / chunks)
+        return result
+
+    def finish(result):
+        threads["finish"] = threading.current_thread()
+        colors[:] = result
+        return len(result)
+
+    return BackgroundJob(compute, finish), threads
+
+
+def test_compute_runs_in_background_and_finish_in_caller():
+    colors = np.zeros(100)
+    job, threads = paint_job(colors)
+    job.start()
+    job.wait()
+    assert not job.running and job.progress == 1.0
+    #Nothing is written before finish
+    assert not colors.any()
+    assert job.finish() == 100
+    assert threads["compute"] is not threading.current_thread()
+    assert threads["finish"] is threading.current_thread()
+    assert np.all(colors == 1.0)
+
+
+def test_cancel_drops_partial_result():
+    colors = np.zeros(100)
+    started, proceed = threading.Event(), threading.Event()
+    job, threads = paint_job(colors, started=started, proceed=proceed)
+    job.start()
+    started.wait()
+    #Cancel is seen by the next progress call, after the current chunk
+    threading.Timer(0.05, proceed.set).start()
+    job.cancel()
+    assert 0.0 <= job.progress < 1.0
+    assert job.result is None and job.error is None
+    with pytest.raises(RuntimeError):
+        job.finish()
+    assert "finish" not in threads
+    assert not colors.any()
+
+
+def test_error_of_compute_is_raised_by_finish():
+    def compute(progress):
+        raise ValueError("broken mesh")
+    job = BackgroundJob(compute, lambda result: pytest.fail("finish must not run"))
+    job.start()
+    job.wait()
+    assert isinstance(job.error, ValueError)
+    with pytest.raises(ValueError):
+        job.finish()
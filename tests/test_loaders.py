@@ -0,0 +1,99 @@
+import struct
+
+import numpy as np
+import pytest
+
+from learn_computer_graphics import loaders
+from learn_computer_graphics.core import MeshArrays
+
+VERTS = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0.5, 0.5, 1]], dtype=np.float32)
+FACES = [[0, 3, 2, 1], [0, 1, 4], [1, 2, 4], [2, 3, 4], [3, 0, 4]]
+
+
+def assert_same(mesh, verts=VERTS, faces=FACES):
+    expected = MeshArrays.from_faces(verts, faces)
+    assert np.allclose(mesh.verts, expected.verts)
+    assert np.array_equal(mesh.face_offsets, expected.face_offsets)
+    assert np.array_equal(mesh.face_verts, expected.face_verts)
+
+
+#Function collects parts of stream_mesh into one mesh
+def streamed(path, chunk):
+    verts, sizes, face_verts = [], [], []
+    for part in loaders.stream_mesh(path, chunk):
+        if part[0] == "verts":
+            verts.append(part[1])
+        else:
+            sizes.append(part[1])
+            face_verts.append(part[2])
+    offsets = np.r_[0, np.cumsum(np.concatenate(sizes))].astype(np.int32)
+    return MeshArrays(np.concatenate(verts), offsets, np.concatenate(face_verts))
+
+
+def write_ply(path, ply_format):
+    header = ["ply", "format " + ply_format + " 1.0", "element vertex %d" % len(VERTS),
+              "property float x", "property float y", "property float z", "property uchar red",
+              "element face %d" % len(FACES), "property list uchar int vertex_indices", "end_header"]
+    with open(path, 'wb') as file:
+        file.write(("\n".join(header) + "\n").encode())
+        if ply_format == 'ascii':
+            for v in VERTS:
+                file.write(("%g %g %g 255\n" % tuple(v)).encode())
+            for face in FACES:
+                file.write((" ".join(map(str, [len(face)] + face)) + "\n").encode())
+        else:
+            for v in VERTS:
+                file.write(struct.pack('<3fB', *v, 255))
+            for face in FACES:
+                file.write(struct.pack('<B%di' % len(face), len(face), *face))
+
+
+def test_obj_corners_negative_indices_and_lines(tmp_path):
+    path = str(tmp_path / "pyramid.obj")
+    with open(path, 'w') as file:
+        file.write("# pyramid\no pyramid\n")
+        for v in VERTS:
+            file.write("v %g %g %g\n" % tuple(v))
+        file.write("vt 0 0\nvn 0 0 1\n")
+        file.write("f 1/1/1 4/1/1 3/1/1 2/1/1\nf 1//1 2//1 5//1\nf 2/1 3/1 5/1\nf -3 -2 -1\nf 4 1 5\n")
+        file.write("l 1 2 3\n")
+    mesh = loaders.load_mesh(path)
+    assert_same(mesh)
+    assert np.array_equal(mesh.loose_edges, [[0, 1], [1, 2]])
+    assert_same(streamed(path, 2))
+
+
+def test_ply_ascii_and_binary(tmp_path):
+    for ply_format in ('ascii', 'binary_little_endian'):
+        path = str(tmp_path / (ply_format + ".ply"))
+        write_ply(path, ply_format)
+        assert_same(loaders.load_mesh(path))
+        assert_same(streamed(path, 2))
+
+
+def test_stl_joins_identical_corners(tmp_path):
+    triangles = MeshArrays.from_faces(VERTS, FACES).triangles
+    corners = VERTS[triangles]
+    binary = str(tmp_path / "binary.stl")
+    with open(binary, 'wb') as file:
+        file.write(b"\0" * 80 + struct.pack('<I', len(corners)))
+        for triangle in corners:
+            file.write(struct.pack('<12fH', 0, 0, 0, *triangle.ravel(), 0))
+    ascii_path = str(tmp_path / "ascii.stl")
+    with open(ascii_path, 'w') as file:
+        file.write("solid pyramid\n")
+        for triangle in corners:
+            file.write("facet normal 0 0 0\nouter loop\n")
+            for corner in triangle:
+                file.write("vertex %g %g %g\n" % tuple(corner))
+            file.write("endloop\nendfacet\n")
+        file.write("endsolid pyramid\n")
+    for path in (binary, ascii_path):
+        mesh = loaders.load_mesh(path)
+        assert mesh.nr_verts == len(VERTS) and mesh.nr_faces == len(triangles)
+        assert np.allclose(mesh.verts[mesh.face_verts].reshape(-1, 3, 3), corners)
+
+
+def test_unsupported_extension(tmp_path):
+    with pytest.raises(ValueError):
+        loaders.load_mesh(str(tmp_path / "mesh.fbx"))
@@ -0,0 +1,70 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import benchmark
+from learn_computer_graphics import parallel
+from learn_computer_graphics.core import MeshArrays
+
+
+def meshes():
+    found = []
+    for verts, faces in (benchmark.icosphere(2), benchmark.punched_holes(2000, 0.05), benchmark.nested_shells(600)):
+        found.append(MeshArrays.from_faces(np.asarray(verts, dtype=np.float32), faces))
+    return found
+
+
+def test_shared_arrays_are_equal():
+    mesh = meshes()[1]
+    description, blocks = parallel.share(mesh)
+    try:
+        attached, attached_blocks = parallel._attach(description)
+        assert attached.digest == mesh.digest
+        del attached
+        for block in attached_blocks:
+            block.close()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def test_results_match_analysis_in_order():
+    all_meshes = meshes()
+    done = []
+    found = parallel.analyse_meshes(all_meshes, ('merge', 'holes', 'curvature'), workers=1, progress=done.append)
+    assert done == [1 / 3, 2 / 3, 1.0]
+    for mesh, result in zip(all_meshes, found):
+        assert result["faces"] == mesh.nr_faces
+        assert result["holes"] == len(analysis.holes(mesh)["vertex_count"])
+        assert np.array_equal(result["non_manifold"], analysis.non_manifold_vertices(mesh))
+        assert len(result["mean_curvature"]) == mesh.nr_verts
+        assert result["curvature_sketch"].count == mesh.nr_verts
+    assert found[0]["holes"] == 0
+    assert found[1]["holes"] > 0
+
+
+#Error of an analysis keeps arrays of the shared mesh in its traceback, it is raised as it is
+def test_error_of_analysis_is_raised(monkeypatch):
+    def broken(mesh):
+        raise ValueError("broken mesh")
+    monkeypatch.setattr(analysis, "holes", broken)
+    with pytest.raises(ValueError, match="broken mesh") as error:
+        parallel.analyse_meshes(meshes(), ('holes',), workers=1)
+    #Shared arrays are not kept by frames of the error after the blocks are closed
+    frame = error.value.__traceback__
+    while frame.tb_next is not None:
+        frame = frame.tb_next
+    assert "mesh" not in frame.tb_frame.f_locals
+
+
+#Blender 2.91 removed bpy.app.binary_path_python, its Python is sys.executable since then
+def test_python_executable_of_blender(monkeypatch):
+    app = types.SimpleNamespace(version=(2, 90, 1), binary_path_python="/blender/2.90/python/bin/python3.7m")
+    monkeypatch.setitem(sys.modules, "bpy", types.SimpleNamespace(app=app))
+    assert parallel._python_executable() == app.binary_path_python
+    monkeypatch.setitem(sys.modules, "bpy", types.SimpleNamespace(app=types.SimpleNamespace(version=(2, 91, 0))))
+    assert parallel._python_executable() == sys.executable
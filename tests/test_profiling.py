@@ -0,0 +1,33 @@
+import csv
+import json
+
+from learn_computer_graphics import profiling
+
+
+def test_off_by_default():
+    assert profiling.begin("run") is None
+    with profiling.stage("stage") as measured:
+        assert measured is None
+    profiling.count("items", 3)
+
+
+def test_stages_and_counters(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    with profiling.run("analysis") as profile:
+        for _ in range(2):
+            with profiling.stage("part"):
+                sum(range(1000))
+        profiling.count("items", 3)
+        profiling.count("items", 4)
+    assert profiling.CURRENT is None and profiling.LAST is profile
+    assert profile.stages["part"]["calls"] == 2
+    assert profile.counters == {"items": 7}
+    assert profile.wall >= profile.stages["part"]["wall"]
+
+    profile.write(str(tmp_path / "report.json"))
+    with open(str(tmp_path / "report.json")) as file:
+        assert json.load(file)["stages"][0]["stage"] == "part"
+    profile.write(str(tmp_path / "report.csv"))
+    with open(str(tmp_path / "report.csv")) as file:
+        rows = list(csv.reader(file))
+    assert [row[:2] for row in rows[1:]] == [["run", "analysis"], ["stage", "part"], ["counter", "items"]]
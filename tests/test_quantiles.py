@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from learn_computer_graphics import quantiles
+
+
+def values():
+    rng = np.random.default_rng(0)
+    return np.concatenate([rng.lognormal(0, 2, 20000), -rng.lognormal(-1, 1, 5000), np.zeros(100)])
+
+
+def test_percentiles_match_numpy():
+    data = values()
+    q = (0, 1, 12.5, 50, 99, 100)
+    assert np.allclose(quantiles.percentiles(data, q), np.percentile(data, q))
+    assert np.array_equal(quantiles.percentiles([], q), np.zeros(len(q)))
+
+
+def test_summary():
+    stats = quantiles.summary([3.0, 1.0, 2.0])
+    assert stats == {"count": 3, "mean": 2.0, "min": 1.0, "max": 3.0,
+                     "p1": 1.02, "p5": 1.1, "p50": 2.0, "p95": 2.9, "p99": 2.98}
+    assert quantiles.summary([])["count"] == 0
+
+
+#Percentiles of the sketch are within its accuracy of exact ranks, without interpolation
+def test_sketch_accuracy():
+    data = values()
+    sketch = quantiles.QuantileSketch().add(data)
+    q = np.array([1, 5, 20, 50, 80, 95, 99])
+    exact = np.sort(data)[np.round(q / 100 * (len(data) - 1)).astype(np.int64)]
+    assert np.allclose(sketch.percentiles(q), exact, rtol=quantiles.SKETCH_ACCURACY, atol=1e-12)
+    assert (sketch.min, sketch.max, sketch.count) == (data.min(), data.max(), len(data))
+
+
+def test_merged_sketches_equal_one_sketch():
+    data = values()
+    merged = quantiles.QuantileSketch()
+    for part in np.array_split(data, 7):
+        merged.merge(quantiles.QuantileSketch().add(part))
+    whole = quantiles.QuantileSketch().add(np.r_[data, np.nan, np.inf])
+    assert merged.summary() == pytest.approx(whole.summary())
+    with pytest.raises(ValueError):
+        merged.merge(quantiles.QuantileSketch(0.05))
+
+
+def test_magnitude_sketch():
+    data = values()
+    magnitude = quantiles.QuantileSketch().add(data).magnitude()
+    assert magnitude.max == np.abs(data).max()
+    assert magnitude.percentiles((50,))[0] == pytest.approx(np.median(np.abs(data)), rel=quantiles.SKETCH_ACCURACY)
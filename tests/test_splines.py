@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from learn_computer_graphics import splines
+
+
+#Spline (t, t^2, t^3) as one cubic Bezier segment, its parameter is the x coordinate
+def twisted_cubic(limit=np.inf):
+    co = np.array([[0, 0, 0], [1, 1, 1]], dtype=np.float64)
+    left = np.array([[0, 0, 0], [2 / 3, 1 / 3, 0]])
+    right = np.array([[1 / 3, 0, 0], [1, 1, 1]])
+    return splines.bezier_analysis(co, left, right, [0, 2], [False], limit)
+
+
+def test_curvature_and_torsion_of_twisted_cubic():
+    result = twisted_cubic()
+    t = result["points"][:, 0].astype(np.float64)
+    assert np.allclose(result["points"][:, 1:], np.stack([t ** 2, t ** 3], axis=1), atol=1e-6)
+    cross = np.sqrt(36 * t ** 4 + 36 * t ** 2 + 4)
+    assert np.allclose(result["curvature"], cross / (1 + 4 * t ** 2 + 9 * t ** 4) ** 1.5, rtol=1e-4)
+    assert np.allclose(result["torsion"], 3 / (9 * t ** 4 + 9 * t ** 2 + 1), rtol=1e-4)
+    assert result["max_curvature"][0] == result["curvature"].max()
+
+
+def test_segments_above_limit_are_flagged():
+    assert len(twisted_cubic(1.0)["flagged"]) == 1
+    assert len(twisted_cubic(3.0)["flagged"]) == 0
+
+
+#Circle of four Bezier segments, the last one closes the cyclic spline
+#The segments only approximate the circle, their curvature is within a few percent
+def test_bezier_circle():
+    radius = 2.0
+    handle = radius * 4 / 3 * (np.sqrt(2) - 1)
+    angles = np.arange(4) * np.pi / 2
+    co = radius * np.stack([np.cos(angles), np.sin(angles), np.zeros(4)], axis=1)
+    tangent = np.stack([-np.sin(angles), np.cos(angles), np.zeros(4)], axis=1) * handle
+    result = splines.bezier_analysis(co, co - tangent, co + tangent, [0, 4], [True])
+    assert list(result["segment_index"]) == [0, 1, 2, 3]
+    assert list(result["segment_first"]) == [0, 1, 2, 3]
+    assert np.allclose(result["curvature"], 1 / radius, rtol=0.03)
+    assert np.allclose(result["torsion"], 0, atol=1e-9)
+
+
+#Rational quadratic circle of nine points with Bezier knots is exact
+def test_nurbs_circle():
+    corners = np.array([[1, 0], [1, 1], [0, 1], [-1, 1], [-1, 0], [-1, -1], [0, -1], [1, -1], [1, 0]])
+    weights = np.where(np.arange(9) % 2, np.sqrt(0.5), 1.0)
+    co = np.concatenate([3 * corners, np.zeros((9, 1)), weights[:, None]], axis=1)
+    result = splines.nurbs_analysis(co, [0, 9], [3], [False], [True], [True])
+    assert len(result["max_curvature"]) == 4
+    assert np.allclose(np.linalg.norm(result["points"], axis=1), 3, rtol=1e-5)
+    assert np.allclose(result["curvature"], 1 / 3, rtol=1e-4)
+
+
+#Cubic NURBS with end knots is one Bezier segment, weights of all points do not matter
+def test_nurbs_matches_bezier():
+    expected = twisted_cubic()
+    ctrl = np.array([[0, 0, 0], [1 / 3, 0, 0], [2 / 3, 1 / 3, 0], [1, 1, 1]])
+    for weight in (1.0, 2.5):
+        co = np.concatenate([ctrl, np.full((4, 1), weight)], axis=1)
+        result = splines.nurbs_analysis(co, [0, 4], [4], [False], [True], [False])
+        t = result["points"][:, 0].astype(np.float64)
+        assert np.allclose(result["torsion"], 3 / (9 * t ** 4 + 9 * t ** 2 + 1), rtol=1e-4)
+        assert result["max_curvature"][0] == pytest.approx(expected["max_curvature"][0], rel=0.01)
+
+
+def test_short_splines_give_nothing():
+    result = splines.nurbs_analysis(np.ones((1, 4)), [0, 1], [4], [False], [False], [False])
+    assert len(result["curvature"]) == 0 and len(result["flagged"]) == 0
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from learn_computer_graphics import analysis
+from learn_computer_graphics import benchmark
+from learn_computer_graphics import store
+from learn_computer_graphics.core import MeshArrays
+
+#Small chunks, so chunked analyses go through many parts
+CHUNK = 500
+
+
+@pytest.fixture
+def saved(tmp_path):
+    def save(verts, faces):
+        mesh = MeshArrays.from_faces(np.asarray(verts, dtype=np.float32), faces)
+        store.save(mesh, str(tmp_path / "mesh.store"))
+        return mesh, store.open_store(str(tmp_path / "mesh.store"))
+    return save
+
+
+def loop_sets(found):
+    offsets, verts = found["loop_offsets"], found["loop_verts"]
+    return sorted(tuple(sorted(verts[a:b])) for a, b in zip(offsets[:-1], offsets[1:]))
+
+
+def test_holes_match_memory(saved):
+    verts, faces = benchmark.punched_holes(5000, 0.02)
+    mesh, mapped = saved(verts, faces)
+    expected = analysis.holes(mesh)
+    found = store.holes(mapped, CHUNK)
+    assert loop_sets(found) == loop_sets(expected)
+    assert np.allclose(np.sort(found["perimeter"]), np.sort(expected["perimeter"]))
+    assert np.allclose(np.sort(found["area"]), np.sort(expected["area"]))
+
+
+#Holes not touching other holes are found whatever orientation faces have
+def test_holes_with_turned_faces(saved):
+    verts, faces = benchmark.icosphere(3)
+    centers = verts[faces].mean(axis=1)
+    faces = faces[(np.linalg.norm(centers - verts[0], axis=1) > 0.3) & (np.linalg.norm(centers - verts[3], axis=1) > 0.3)]
+    expected = loop_sets(analysis.holes(MeshArrays.from_faces(verts, faces)))
+    assert len(expected) == 2
+    faces = [face[::-1] if i % 3 == 0 else face for i, face in enumerate(faces.tolist())]
+    mesh, mapped = saved(verts, faces)
+    assert loop_sets(store.holes(mapped, CHUNK)) == expected
+
+
+#Flat soup along z, written as OBJ and converted out of core in many buckets
+def flat_soup(path):
+    verts, faces = benchmark.vertex_soup(3000)
+    verts = np.asarray(verts, dtype=np.float32) * [0.01, 1.0, 5.0]
+    with open(path, 'w') as file:
+        file.writelines("v %r %r %r\n" % tuple(co) for co in verts.tolist())
+        file.writelines("f %d %d %d\n" % tuple(face) for face in (np.asarray(faces) + 1).tolist())
+    return MeshArrays.from_faces(verts, faces)
+
+
+def test_sweep_along_longest_axis(tmp_path):
+    mesh = flat_soup(str(tmp_path / "soup.obj"))
+    mapped = store.open_store(store.convert(str(tmp_path / "soup.obj"), chunk=CHUNK))
+    assert mesh.sweep_axis == mapped.sweep_axis == 2
+    assert np.array_equal(mapped.sweep_order, mesh.sweep_order)
+    assert np.array_equal(mapped.sweep_co, mesh.verts[mesh.sweep_order, 2])
+
+
+def test_duplicate_pairs_match_memory(tmp_path):
+    mesh = flat_soup(str(tmp_path / "soup.obj"))
+    mapped = store.open_store(store.convert(str(tmp_path / "soup.obj"), chunk=CHUNK))
+    expected = analysis.duplicate_clusters(mesh)
+    found = store.duplicate_clusters(mapped, chunk=CHUNK)
+    assert found["removed"] == expected["removed"] > 0
+    merged = expected["targets"] != np.arange(mesh.nr_verts)
+    assert np.array_equal(found["vertices"], np.flatnonzero(merged))
+    assert np.array_equal(found["targets"], expected["targets"][merged])
+
+
+#Most vertices in a small part of the range, slabs still hold similar numbers of them
+def test_sweep_slabs_follow_percentiles(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    verts = np.concatenate([rng.uniform(0, 0.01, (9000, 3)), rng.uniform(0, 100, (1000, 3))]).astype(np.float32)
+    faces = np.arange(len(verts)).reshape(-1, 2)[:, [0, 1, 1]] + [0, 0, 1]
+    faces = faces[faces[:, 2] < len(verts)]
+    path = str(tmp_path / "crowded.obj")
+    with open(path, 'w') as file:
+        file.writelines("v %r %r %r\n" % tuple(co) for co in verts.tolist())
+        file.writelines("f %d %d %d\n" % tuple(face) for face in (faces + 1).tolist())
+
+    sizes = []
+    buckets = store._Spill.buckets
+
+    def counted(spill):
+        for records in buckets(spill):
+            if records.dtype.names == ('co', 'vert'):
+                sizes.append(len(records))
+            yield records
+    monkeypatch.setattr(store._Spill, "buckets", counted)
+    mapped = store.open_store(store.convert(path, chunk=CHUNK))
+    mesh = MeshArrays.from_faces(verts, faces)
+    assert np.array_equal(mapped.sweep_order, mesh.sweep_order)
+    assert len(sizes) == 20
+    assert max(sizes) < 2 * CHUNK
+
+
+#Both reports measure the curvature painted by the pipeline: relative mean curvature
+#of vertices after replicated vertices are merged
+def test_report_matches_memory(tmp_path):
+    verts, faces = benchmark.vertex_soup(2000)
+    path = str(tmp_path / "soup.ply")
+    mesh = MeshArrays.from_faces(np.asarray(verts, dtype=np.float32), faces)
+    store.save(mesh, store.store_path(path))
+    found = store.store_report(store.store_path(path), chunk=CHUNK)
+    expected = analysis.mesh_report(mesh)
+    for name in ("verts", "edges", "faces", "gaps", "replicated_vertices"):
+        assert found[name] == pytest.approx(expected[name])
+
+    painted = analysis.pipeline_stages(mesh, ('merge', 'curvature'))[2]["curvature_stats"]
+    assert expected["curvature"] == pytest.approx(painted)
+    assert found["curvature"]["count"] == painted["count"]
+    for name in ("min", "max", "mean"):
+        assert found["curvature"][name] == pytest.approx(painted[name], rel=1e-4, abs=1e-6)
+    for name in ("p5", "p50", "p95"):
+        assert found["curvature"][name] == pytest.approx(painted[name], rel=0.03, abs=1e-6)
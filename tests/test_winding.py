@@ -0,0 +1,43 @@
+import numpy as np
+
+from learn_computer_graphics import benchmark
+from learn_computer_graphics import winding
+from learn_computer_graphics.core import MeshArrays
+
+
+def sphere(level=3, scale=1.0):
+    verts, faces = benchmark.icosphere(level)
+    return MeshArrays.from_faces(np.asarray(verts, dtype=np.float32) * scale, faces)
+
+
+def test_solid_angle_of_octant():
+    tri_co = np.array([[[1.0, 0, 0], [0, 1.0, 0], [0, 0, 1.0]]])
+    assert np.allclose(winding.solid_angles(np.zeros((1, 3)), tri_co), np.pi / 2)
+
+
+def test_winding_numbers_of_sphere():
+    mesh = sphere()
+    points = np.array([[0, 0, 0], [0.3, -0.2, 0.1], [2, 0, 0], [0, -3, 1]])
+    numbers = winding.winding_numbers(mesh.bvh, points)
+    assert np.allclose(numbers, [1, 1, 0, 0], atol=0.02)
+
+
+def test_approximation_matches_exact_sum():
+    mesh = sphere()
+    points = np.random.default_rng(0).uniform(-1.5, 1.5, (200, 3))
+    tri_co = mesh.verts[mesh.triangles].astype(np.float64)
+    exact = np.array([winding.solid_angles(np.repeat(p[None], len(tri_co), axis=0), tri_co).sum() for p in points])
+    assert np.allclose(winding.winding_numbers(mesh.bvh, points), exact / (4 * np.pi), atol=0.02)
+
+
+def test_interior_faces_of_nested_shells():
+    verts, faces = benchmark.nested_shells(3000)
+    mesh = MeshArrays.from_faces(np.asarray(verts, dtype=np.float32), faces)
+    inner = winding.interior_faces(mesh, chunk_size=256)
+    assert np.array_equal(inner, np.arange(len(faces) // 3, len(faces)))
+
+
+def test_more_accuracy_is_closer():
+    mesh = sphere()
+    points = np.array([[0, 0, 0], [0.3, -0.2, 0.1]])
+    assert np.allclose(winding.winding_numbers(mesh.bvh, points, accuracy=8.0), 1, atol=0.002)
@@ -0,0 +1,178 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from learn_computer_graphics import profiling
+
+#Generalized winding number of points with respect to the mesh, without bpy
+#Winding number is about 1 inside a closed surface, 0 outside and 1/2 on the surface
+#and it degrades gracefully for open and leaky meshes
+#Far clusters of triangles are replaced by their dipole (Barnes-Hut approximation)
+#using nodes of the mesh's BVH
+
+#Faces with winding number above the threshold are inside the object
+WINDING_THRESHOLD = 0.75
+
+#Cluster is approximated when the point is further than accuracy * cluster radius
+WINDING_ACCURACY = 2.0
+
+
+#Function calculates solid angles of triangles seen from points, pairwise
+#(Van Oosterom and Strackee formula), points lying in the plane of a triangle get 0
+def solid_angles(points, tri_co):
+    a = tri_co[:, 0] - points
+    b = tri_co[:, 1] - points
+    c = tri_co[:, 2] - points
+    la = np.linalg.norm(a, axis=1)
+    lb = np.linalg.norm(b, axis=1)
+    lc = np.linalg.norm(c, axis=1)
+    det = np.einsum('ij,ij->i', a, np.cross(b, c))
+    divisor = la * lb * lc + np.einsum('ij,ij->i', a, b) * lc + np.einsum('ij,ij->i', a, c) * lb \
+        + np.einsum('ij,ij->i', b, c) * la
+    angle = 2 * np.arctan2(det, divisor)
+    return np.where(np.abs(det) > 1e-12 * la * lb * lc, angle, 0.0)
+
+
+#Function calculates dipole of every BVH node
+#Returns per level: vector area, area weighted center and radius of the node
+def _node_dipoles(tree):
+    tri_co = tree.tri_co
+    normal = 0.5 * np.cross(tri_co[:, 1] - tri_co[:, 0], tri_co[:, 2] - tri_co[:, 0])
+    area = np.linalg.norm(normal, axis=1)
+    centroid = tri_co.mean(axis=1)
+
+    nr_leaves = len(tree.levels[-1][0])
+    leaf = np.arange(tree.nr_triangles) // tree.leaf_size
+    vector_area = np.zeros((nr_leaves, 3))
+    moment = np.zeros((nr_leaves, 3))
+    for axis in range(3):
+        vector_area[:, axis] = np.bincount(leaf, normal[:, axis], nr_leaves)
+        moment[:, axis] = np.bincount(leaf, centroid[:, axis] * area, nr_leaves)
+    weight = np.bincount(leaf, area, nr_leaves)
+
+    dipoles = []
+    span = tree.leaf_size
+    while True:
+        center = np.divide(moment, weight[:, None], out=np.zeros_like(moment), where=weight[:, None] > 0)
+        #Node holds consecutive triangles, so its radius is the furthest corner of them
+        starts = np.arange(0, tree.nr_triangles, span)
+        corner_distance = np.linalg.norm(tri_co - center[np.arange(tree.nr_triangles) // span][:, None, :], axis=2).max(axis=1)
+        radius = np.zeros(len(center))
+        radius[:len(starts)] = np.maximum.reduceat(corner_distance, starts)
+        dipoles.append((vector_area, center, radius))
+        if len(vector_area) == 1:
+            break
+        if len(vector_area) % 2:
+            vector_area = np.vstack([vector_area, np.zeros((1, 3))])
+            moment = np.vstack([moment, np.zeros((1, 3))])
+            weight = np.r_[weight, 0.0]
+        vector_area = vector_area[0::2] + vector_area[1::2]
+        moment = moment[0::2] + moment[1::2]
+        weight = weight[0::2] + weight[1::2]
+        span *= 2
+    dipoles.reverse()
+    return dipoles
+
+
+#Function calculates winding numbers of points with Barnes-Hut traversal of the tree
+def winding_numbers(tree, points, accuracy=WINDING_ACCURACY, dipoles=None):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    total = np.zeros(len(points))
+    if tree.nr_triangles == 0 or len(points) == 0:
+        return total
+    if dipoles is None:
+        dipoles = _node_dipoles(tree)
+
+    query = np.arange(len(points))
+    node = np.zeros(len(points), dtype=np.int64)
+    for depth, (vector_area, center, radius) in enumerate(dipoles):
+        if depth:
+            query = np.repeat(query, 2)
+            node = (node[:, None] * 2 + np.arange(2)).ravel()
+            inside = node < len(center)
+            query = query[inside]
+            node = node[inside]
+
+        #Far nodes: solid angle of the dipole
+        offset = center[node] - points[query]
+        distance = np.linalg.norm(offset, axis=1)
+        #Near leaves are left for the exact evaluation
+        far = distance > accuracy * radius[node]
+        if depth == len(dipoles) - 1:
+            far[:] = False
+        angle = np.einsum('ij,ij->i', vector_area[node[far]], offset[far]) / distance[far] ** 3
+        total += np.bincount(query[far], angle, len(points))
+        query = query[~far]
+        node = node[~far]
+
+    #Near leaves: exact solid angles of their triangles
+    first = node * tree.leaf_size
+    count = np.minimum(first + tree.leaf_size, tree.nr_triangles) - first
+    query = np.repeat(query, count)
+    triangle = np.repeat(first - np.cumsum(count) + count, count) + np.arange(int(count.sum()))
+    total += np.bincount(query, solid_angles(points[query], tree.tri_co[triangle]), len(points))
+    return total / (4 * np.pi)
+
+
+#Function returns for every face a point lying exactly on it: center of its largest triangle
+#Center of non-planar face can be slightly inside or outside, there winding number jumps
+#between 0 and 1, on the surface itself it is 1/2
+def face_points(mesh):
+    points = mesh.face_centroids.astype(np.float64)
+    tri_co = mesh.verts[mesh.triangles].astype(np.float64)
+    if len(tri_co) == 0:
+        return points
+    area = np.linalg.norm(np.cross(tri_co[:, 1] - tri_co[:, 0], tri_co[:, 2] - tri_co[:, 0]), axis=1)
+    order = np.lexsort((-area, mesh.tri_faces))
+    faces = mesh.tri_faces[order]
+    largest = order[np.r_[True, faces[1:] != faces[:-1]]]
+    points[mesh.tri_faces[largest]] = tri_co[largest].mean(axis=1)
+    return points
+
+
+def _start_worker(tree, dipoles):
+    global _worker_tree
+    _worker_tree = tree, dipoles
+
+
+def _winding_chunk(arguments):
+    tree, dipoles = _worker_tree
+    points, accuracy = arguments
+    return winding_numbers(tree, points, accuracy, dipoles)
+
+
+#Function finds faces lying inside the object by winding number of points on them
+#With workers > 1 points are split between worker processes, the tree is sent to every
+#worker once when it starts
+#progress(done_part) is called after every chunk of points
+def interior_faces(mesh, threshold=WINDING_THRESHOLD, accuracy=WINDING_ACCURACY, workers=1, chunk_size=2048,
+                   progress=None):
+    tree = mesh.bvh
+    dipoles = _node_dipoles(tree)
+    points = face_points(mesh)
+    chunks = [points[i:i + chunk_size] for i in range(0, len(points), chunk_size)]
+    parts = []
+    if workers > 1 and len(chunks) > 1:
+        #Worker processes are started fresh (spawn), like in parallel.py (it imports this module)
+        from learn_computer_graphics import parallel
+        context = multiprocessing.get_context('spawn')
+        executable = parallel._python_executable()
+        if executable:
+            context.set_executable(executable)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_start_worker,
+                                 initargs=(tree, dipoles)) as pool:
+            for part in pool.map(_winding_chunk, [(chunk, accuracy) for chunk in chunks]):
+                parts.append(part)
+                if progress is not None:
+                    progress(len(parts) / len(chunks))
+    else:
+        for chunk in chunks:
+            parts.append(winding_numbers(tree, chunk, accuracy, dipoles))
+            if progress is not None:
+                progress(len(parts) / len(chunks))
+    winding = np.concatenate(parts) if parts else np.zeros(0)
+    profiling.count("points evaluated", len(winding))
+
+    #Orientation of the whole mesh can be reversed, then inside is about -1
+    return np.flatnonzero(np.abs(winding) >= threshold).astype(np.int32)